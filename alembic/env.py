@@ -6,10 +6,12 @@ from sqlalchemy import pool
 from alembic import context
 
 from src.models.category import Category
+from src.models.daily_revenue import DailyRevenue
 from src.models.inventory import Inventory
 from src.models.product import Product
 from src.models.sales import Sales
 from src.models.sale_items import SaleItems
+from src.models.sales_version import SalesVersion
 
 from src.database import SQLALCHEMY_DATABASE_URL, Base
 
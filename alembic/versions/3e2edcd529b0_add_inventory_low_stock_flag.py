@@ -0,0 +1,38 @@
+"""add inventory low stock flag
+
+Revision ID: 3e2edcd529b0
+Revises: f23ca9f0d38f
+Create Date: 2026-10-18 16:13:22.016880
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3e2edcd529b0'
+down_revision: Union[str, None] = 'f23ca9f0d38f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "inventory",
+        sa.Column(
+            "is_low_stock",
+            sa.Boolean(),
+            sa.Computed("current_stock <= low_stock_alert_threshold", persisted=True),
+            nullable=False,
+        ),
+    )
+    op.create_index(
+        "ix_inventory_is_low_stock", "inventory", ["is_low_stock"], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_inventory_is_low_stock", table_name="inventory")
+    op.drop_column("inventory", "is_low_stock")
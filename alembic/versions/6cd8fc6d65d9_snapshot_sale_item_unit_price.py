@@ -0,0 +1,96 @@
+"""snapshot sale item unit price
+
+Revision ID: 6cd8fc6d65d9
+Revises: e37e8e831cb6
+Create Date: 2026-10-18 16:31:48.946730
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6cd8fc6d65d9'
+down_revision: Union[str, None] = 'e37e8e831cb6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# sale items backfilled per UPDATE, keeps each transaction and its locks short
+BACKFILL_BATCH_SIZE = 50000
+
+
+def upgrade() -> None:
+    op.add_column("sale_items", sa.Column("unit_price", sa.Float(), nullable=True))
+
+    # past prices weren't recorded, existing items get the current price, which
+    # is what revenue has been computed with so far
+    connection = op.get_bind()
+    last_id = connection.scalar(sa.text("SELECT MAX(id) FROM sale_items")) or 0
+    with op.get_context().autocommit_block():
+        for low in range(0, last_id, BACKFILL_BATCH_SIZE):
+            connection.execute(
+                sa.text(
+                    "UPDATE sale_items "
+                    "JOIN product ON product.id = sale_items.product_id "
+                    "SET sale_items.unit_price = product.price "
+                    "WHERE sale_items.id > :low AND sale_items.id <= :high"
+                ),
+                {"low": low, "high": low + BACKFILL_BATCH_SIZE},
+            )
+
+    op.alter_column(
+        "sale_items", "unit_price", existing_type=sa.Float(), nullable=False
+    )
+    op.add_column(
+        "sale_items",
+        sa.Column(
+            "line_total",
+            sa.Double(),
+            sa.Computed("quantity * unit_price", persisted=True),
+            nullable=False,
+        ),
+    )
+    # create the covering indexes before dropping the old ones, the foreign
+    # keys always need an index starting with their column
+    op.create_index(
+        "ix_sale_items_sales_id_product_id_quantity_line_total",
+        "sale_items",
+        ["sales_id", "product_id", "quantity", "line_total"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_sale_items_product_id_sales_id_quantity_line_total",
+        "sale_items",
+        ["product_id", "sales_id", "quantity", "line_total"],
+        unique=False,
+    )
+    op.drop_index("ix_sale_items_sales_id_product_id_quantity", table_name="sale_items")
+    op.drop_index("ix_sale_items_product_id_sales_id_quantity", table_name="sale_items")
+
+
+def downgrade() -> None:
+    op.create_index(
+        "ix_sale_items_product_id_sales_id_quantity",
+        "sale_items",
+        ["product_id", "sales_id", "quantity"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_sale_items_sales_id_product_id_quantity",
+        "sale_items",
+        ["sales_id", "product_id", "quantity"],
+        unique=False,
+    )
+    op.drop_index(
+        "ix_sale_items_product_id_sales_id_quantity_line_total",
+        table_name="sale_items",
+    )
+    op.drop_index(
+        "ix_sale_items_sales_id_product_id_quantity_line_total",
+        table_name="sale_items",
+    )
+    op.drop_column("sale_items", "line_total")
+    op.drop_column("sale_items", "unit_price")
@@ -0,0 +1,37 @@
+"""add sales versions
+
+Revision ID: a41c7e2b9d53
+Revises: f9dda2d18493
+Create Date: 2026-10-18 17:02:41.518204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a41c7e2b9d53'
+down_revision: Union[str, None] = 'f9dda2d18493'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "sales_versions",
+        sa.Column("month", sa.Date(), nullable=False),
+        sa.Column("version", sa.BigInteger(), nullable=False),
+        sa.Column(
+            "updated_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.PrimaryKeyConstraint("month"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("sales_versions")
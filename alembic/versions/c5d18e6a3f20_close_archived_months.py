@@ -0,0 +1,29 @@
+"""close archived months
+
+Revision ID: c5d18e6a3f20
+Revises: a41c7e2b9d53
+Create Date: 2026-10-18 17:24:09.331875
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5d18e6a3f20'
+down_revision: Union[str, None] = 'a41c7e2b9d53'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "sales_versions",
+        sa.Column("closed_at", sa.DateTime(timezone=True), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("sales_versions", "closed_at")
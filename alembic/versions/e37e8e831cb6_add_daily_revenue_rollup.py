@@ -0,0 +1,49 @@
+"""add daily revenue rollup
+
+Revision ID: e37e8e831cb6
+Revises: 3e2edcd529b0
+Create Date: 2026-10-18 16:14:03.461314
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e37e8e831cb6'
+down_revision: Union[str, None] = '3e2edcd529b0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "daily_revenue",
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("product_id", sa.Integer(), nullable=False),
+        sa.Column("category_id", sa.Integer(), nullable=False),
+        sa.Column("revenue", sa.Float(), nullable=False),
+        sa.Column("units", sa.Integer(), nullable=False),
+        sa.Column(
+            "updated_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.ForeignKeyConstraint(["category_id"], ["category.id"]),
+        sa.ForeignKeyConstraint(["product_id"], ["product.id"]),
+        sa.PrimaryKeyConstraint("day", "product_id"),
+    )
+    op.create_index(
+        "ix_daily_revenue_category_id_day",
+        "daily_revenue",
+        ["category_id", "day"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_daily_revenue_category_id_day", table_name="daily_revenue")
+    op.drop_table("daily_revenue")
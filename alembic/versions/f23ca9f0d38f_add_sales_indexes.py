@@ -0,0 +1,57 @@
+"""add sales indexes
+
+Revision ID: f23ca9f0d38f
+Revises: b7c68638760e
+Create Date: 2026-10-18 16:08:04.427117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f23ca9f0d38f'
+down_revision: Union[str, None] = 'b7c68638760e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_sales_created_at_id", "sales", ["created_at", "id"], unique=False
+    )
+    op.create_index(
+        "ix_sale_items_sales_id_product_id_quantity",
+        "sale_items",
+        ["sales_id", "product_id", "quantity"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_sale_items_product_id_sales_id_quantity",
+        "sale_items",
+        ["product_id", "sales_id", "quantity"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_product_category_id_price",
+        "product",
+        ["category_id", "price"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    # MySQL silently drops the implicit foreign key indexes once the composite
+    # indexes above can serve the constraints, so restore them before dropping
+    op.create_index("category_id", "product", ["category_id"], unique=False)
+    op.create_index("product_id", "sale_items", ["product_id"], unique=False)
+    op.create_index("sales_id", "sale_items", ["sales_id"], unique=False)
+    op.drop_index("ix_product_category_id_price", table_name="product")
+    op.drop_index(
+        "ix_sale_items_product_id_sales_id_quantity", table_name="sale_items"
+    )
+    op.drop_index(
+        "ix_sale_items_sales_id_product_id_quantity", table_name="sale_items"
+    )
+    op.drop_index("ix_sales_created_at_id", table_name="sales")
@@ -0,0 +1,101 @@
+"""partition sales by month
+
+Revision ID: f9dda2d18493
+Revises: 6cd8fc6d65d9
+Create Date: 2026-10-18 16:36:28.312666
+
+"""
+from datetime import date, datetime, timedelta
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f9dda2d18493'
+down_revision: Union[str, None] = '6cd8fc6d65d9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# sale items backfilled per UPDATE, keeps each transaction and its locks short
+BACKFILL_BATCH_SIZE = 50000
+# empty monthly partitions created ahead of the current month
+MONTHS_AHEAD = 3
+PARTITIONED_TABLES = ("sales", "sale_items")
+
+
+def _next_month(month: date) -> date:
+    return (month + timedelta(days=32)).replace(day=1)
+
+
+def _partition_clause(first_month: date, last_month: date) -> str:
+    """
+    PARTITION BY clause with one partition per month in [first_month,
+    last_month] and a catch-all for later rows. The first partition also holds
+    anything older.
+    """
+    partitions = []
+    month = first_month
+    while month <= last_month:
+        partitions.append(
+            f"PARTITION p{month:%Y%m} "
+            f"VALUES LESS THAN ('{_next_month(month):%Y-%m-%d}')"
+        )
+        month = _next_month(month)
+    partitions.append("PARTITION pfuture VALUES LESS THAN (MAXVALUE)")
+    return f"PARTITION BY RANGE COLUMNS(created_at) ({', '.join(partitions)})"
+
+
+def upgrade() -> None:
+    connection = op.get_bind()
+    # MySQL doesn't support foreign keys on partitioned tables
+    for foreign_key in sa.inspect(connection).get_foreign_keys("sale_items"):
+        op.drop_constraint(foreign_key["name"], "sale_items", type_="foreignkey")
+
+    # sale items carry their sale's created_at to be partitioned like sales
+    op.add_column(
+        "sale_items",
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    last_id = connection.scalar(sa.text("SELECT MAX(id) FROM sale_items")) or 0
+    with op.get_context().autocommit_block():
+        for low in range(0, last_id, BACKFILL_BATCH_SIZE):
+            connection.execute(
+                sa.text(
+                    "UPDATE sale_items "
+                    "JOIN sales ON sales.id = sale_items.sales_id "
+                    "SET sale_items.created_at = sales.created_at "
+                    "WHERE sale_items.id > :low AND sale_items.id <= :high"
+                ),
+                {"low": low, "high": low + BACKFILL_BATCH_SIZE},
+            )
+    op.alter_column(
+        "sale_items",
+        "created_at",
+        existing_type=sa.DateTime(timezone=True),
+        nullable=False,
+    )
+
+    # every unique key of a partitioned table must include the partitioning
+    # column, id stays first for AUTO_INCREMENT
+    first_sale = connection.scalar(sa.text("SELECT MIN(created_at) FROM sales"))
+    first_month = (first_sale or datetime.now()).date().replace(day=1)
+    last_month = datetime.now().date().replace(day=1)
+    for _ in range(MONTHS_AHEAD):
+        last_month = _next_month(last_month)
+    for table in PARTITIONED_TABLES:
+        op.execute(
+            f"ALTER TABLE {table} DROP PRIMARY KEY, ADD PRIMARY KEY (id, created_at)"
+        )
+        op.execute(f"ALTER TABLE {table} {_partition_clause(first_month, last_month)}")
+
+
+def downgrade() -> None:
+    for table in PARTITIONED_TABLES:
+        op.execute(f"ALTER TABLE {table} REMOVE PARTITIONING")
+        op.execute(f"ALTER TABLE {table} DROP PRIMARY KEY, ADD PRIMARY KEY (id)")
+    op.drop_column("sale_items", "created_at")
+    op.create_foreign_key(None, "sale_items", "product", ["product_id"], ["id"])
+    op.create_foreign_key(None, "sale_items", "sales", ["sales_id"], ["id"])
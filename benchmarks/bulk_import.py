@@ -0,0 +1,87 @@
+"""
+Compares catalog loading through the single-row endpoints against the bulk
+import endpoints.
+
+Products are created under an existing category, with names prefixed by a
+per-run tag so repeated runs don't collide.
+
+Usage:
+    uvicorn src.main:app
+    python -m benchmarks.bulk_import --rows 2000 --category-id 1
+"""
+
+import argparse
+import json
+import sys
+import time
+import urllib.parse
+import urllib.request
+
+
+def post(url: str, body: bytes = b"", content_type: str = "application/json") -> dict:
+    request = urllib.request.Request(
+        url, data=body, method="POST", headers={"Content-Type": content_type}
+    )
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read())
+
+
+def product_rows(tag: str, count: int, category_id: int) -> list[dict]:
+    return [
+        {
+            "name": f"{tag}-{index}",
+            "description": "benchmark product",
+            "price": 1 + index % 500,
+            "category_id": category_id,
+        }
+        for index in range(count)
+    ]
+
+
+def single_row(base_url: str, rows: list[dict]) -> float:
+    started = time.perf_counter()
+    for row in rows:
+        post(f"{base_url}/products/add-product?{urllib.parse.urlencode(row)}")
+    return time.perf_counter() - started
+
+
+def bulk(base_url: str, rows: list[dict], chunk_size: int) -> float:
+    started = time.perf_counter()
+    result = post(
+        f"{base_url}/products/bulk-add-products?chunk_size={chunk_size}",
+        json.dumps(rows).encode(),
+    )
+    if result["failed"]:
+        print(f"bulk import reported {result['failed']} failed rows", file=sys.stderr)
+    return time.perf_counter() - started
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--category-id", type=int, default=1)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    tag = f"bench-{int(time.time())}"
+    single_elapsed = single_row(
+        args.base_url, product_rows(f"{tag}-single", args.rows, args.category_id)
+    )
+    bulk_elapsed = bulk(
+        args.base_url,
+        product_rows(f"{tag}-bulk", args.rows, args.category_id),
+        args.chunk_size,
+    )
+
+    for label, elapsed in (("single-row", single_elapsed), ("bulk", bulk_elapsed)):
+        print(
+            f"{label:<12} {args.rows} rows in {elapsed:8.3f}s "
+            f"{args.rows / elapsed:10.1f} rows/s"
+        )
+    print(f"speedup      {single_elapsed / bulk_elapsed:8.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+"""
+Compares answering sales data and revenue queries from the in-memory NumPy
+column store against running them in SQL.
+
+The store is loaded once from the configured database, then every query shape
+runs --repeat times through ProductRepository (SQL, with the store disabled)
+and through the store, and the median latencies are reported. Both paths must
+return the same rows, the run exits non-zero when they differ. Needs the
+optional numpy package (pip install numpy).
+
+The target database must be migrated (alembic upgrade head). Pass --seed-sales
+to fill an empty database with the data_seed.py generator first.
+
+Usage:
+    python -m benchmarks.column_store --seed-sales 1000000 --repeat 20
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+from data_seed import seed_database
+from src.column_store import SalesColumnStore, np
+from src.database import SessionLocal
+from src.models.product import Product
+from src.models.sale_items import SaleItems
+from src.models.sales import Sales
+from src.repositories.product_repository import ProductRepository
+
+
+def _normalize(rows: list) -> list[tuple]:
+    normalized = []
+    for row in rows:
+        values = row.values() if isinstance(row, dict) else tuple(row)
+        normalized.append(
+            tuple(
+                round(value, 6) if isinstance(value, float) else value
+                for value in values
+            )
+        )
+    return sorted(normalized, key=repr)
+
+
+def timed(function, repeat: int) -> tuple[float, list]:
+    """
+    Run the function repeat times, return the median milliseconds and the result
+    """
+    durations = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        durations.append((time.perf_counter() - started) * 1000)
+    return statistics.median(durations), result
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--seed-sales", type=int, default=0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    if np is None:
+        print("numpy is not installed", file=sys.stderr)
+        return 1
+    if args.seed_sales:
+        seed_database(args.seed_sales, seed=args.seed)
+
+    db = SessionLocal()
+    try:
+        store = SalesColumnStore(enabled=True, refresh_interval=float("inf"))
+        started = time.perf_counter()
+        store.refresh(db, force=True)
+        stats = store.stats()
+        print(
+            f"loaded {stats['rows']} sale items in {time.perf_counter() - started:.2f}s, "
+            f"{stats['memory_bytes'] / 1e6:.1f}MB "
+            f"({stats['memory_bytes'] / max(stats['rows'], 1):.0f} bytes per item)"
+        )
+
+        repository = ProductRepository(db)
+        end_date = db.query(Sales.created_at).order_by(Sales.created_at.desc()).first()
+        end_date = end_date[0].replace(tzinfo=None) if end_date else datetime.now()
+        week, month, year = (end_date - timedelta(days=days) for days in (7, 30, 365))
+        product_id, category_id = (
+            db.query(Product.id, Product.category_id)
+            .join(Product.sale_items)
+            .order_by(SaleItems.id.desc())
+            .first()
+        ) or (1, 1)
+        queries = {
+            "sales data, week": (
+                lambda: repository.get_sales_data(week, end_date, None, None),
+                lambda: store.sales_data(week, end_date, None, None),
+            ),
+            "sales data, year, product": (
+                lambda: repository.get_sales_data(year, end_date, product_id, None),
+                lambda: store.sales_data(year, end_date, product_id, None),
+            ),
+            "sales data, year, category": (
+                lambda: repository.get_sales_data(year, end_date, None, category_id),
+                lambda: store.sales_data(year, end_date, None, category_id),
+            ),
+            "sales data, year, page of 1000": (
+                lambda: repository.get_sales_data(
+                    year, end_date, None, None, limit=1000
+                ),
+                lambda: store.sales_data(year, end_date, None, None, limit=1000),
+            ),
+            "revenue, week": (
+                lambda: repository.get_revenue_from_sales(week, end_date, None),
+                lambda: store.revenue(week, end_date, None),
+            ),
+            "revenue, month": (
+                lambda: repository.get_revenue_from_sales(month, end_date, None),
+                lambda: store.revenue(month, end_date, None),
+            ),
+            "revenue, year, category": (
+                lambda: repository.get_revenue_from_sales(year, end_date, category_id),
+                lambda: store.revenue(year, end_date, category_id),
+            ),
+            "revenue, year, page of 1000": (
+                lambda: repository.get_revenue_from_sales(
+                    year, end_date, None, limit=1000
+                ),
+                lambda: store.revenue(year, end_date, None, limit=1000),
+            ),
+        }
+
+        mismatches = []
+        for label, (sql_query, store_query) in queries.items():
+            sql_ms, sql_rows = timed(sql_query, args.repeat)
+            store_ms, store_rows = timed(store_query, args.repeat)
+            matches = _normalize(sql_rows) == _normalize(store_rows)
+            print(
+                f"{label:<32} rows={len(sql_rows):<8} sql={sql_ms:9.2f}ms "
+                f"store={store_ms:9.2f}ms speedup={sql_ms / max(store_ms, 1e-6):7.1f}x"
+                f"{'' if matches else '  MISMATCH'}"
+            )
+            if not matches:
+                mismatches.append(label)
+    finally:
+        db.close()
+
+    for label in mismatches:
+        print(f"MISMATCH {label}", file=sys.stderr)
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
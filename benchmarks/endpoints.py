@@ -0,0 +1,316 @@
+"""
+Measures throughput and latency percentiles of every products and sales
+route at several concurrency levels, and flags regressions against a baseline.
+
+The app runs in-process behind an httpx ASGI transport, so no server is
+needed and results exclude network time. Every route is driven by
+--requests requests per concurrency level, spread over that many concurrent
+clients. Results are written to --output as JSON; pass a previous result file
+as --baseline to fail the run when a route's p95 latency rises, or its
+throughput drops, by more than --threshold.
+
+The target database must be migrated (alembic upgrade head). Pass --seed-sales
+to fill an empty database with the data_seed.py generator first. Requires the
+development requirements (pip install -r requirements-dev.txt).
+
+Usage:
+    python -m benchmarks.endpoints --seed-sales 100000 --output baseline.json
+    python -m benchmarks.endpoints --output current.json --baseline baseline.json
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Callable
+
+import httpx
+
+from benchmarks.load_test import percentile
+from benchmarks.query_budget import create_fixture, date_range
+from data_seed import seed_database
+from src.main import app
+
+Request = tuple[str, str, dict]
+
+
+def routes(fixture: dict) -> dict[str, Callable[[int], Request]]:
+    """
+    The request to send per route, built from a running request number so
+    writes use unique names
+    """
+    tag = fixture["tag"]
+    category_id = fixture["category_id"]
+    product_id = fixture["product_id"]
+    inventory_id = fixture["inventory_id"]
+    end_date = fixture["end_date"]
+    week = date_range(end_date - timedelta(days=7), end_date)
+    month = date_range(end_date - timedelta(days=30), end_date)
+    year = date_range(end_date - timedelta(days=365), end_date)
+    return {
+        "GET /products/get-category/{category_id}": lambda n: (
+            "GET",
+            f"/products/get-category/{category_id}",
+            {},
+        ),
+        "GET /products/get-product/{product_id}": lambda n: (
+            "GET",
+            f"/products/get-product/{product_id}",
+            {},
+        ),
+        "GET /products/get-low-stock-inventory": lambda n: (
+            "GET",
+            "/products/get-low-stock-inventory",
+            {},
+        ),
+        "POST /products/add-category": lambda n: (
+            "POST",
+            f"/products/add-category?name={tag}-{n}&description=benchmark",
+            {},
+        ),
+        "POST /products/add-product": lambda n: (
+            "POST",
+            f"/products/add-product?name={tag}-{n}&description=benchmark&price=1"
+            f"&category_id={category_id}",
+            {},
+        ),
+        "POST /products/add-inventory": lambda n: (
+            "POST",
+            f"/products/add-inventory?product_id={product_id}&current_stock=5"
+            "&low_stock_alert_threshold=1",
+            {},
+        ),
+        "PATCH /products/update-inventory/{inventory_id}": lambda n: (
+            "PATCH",
+            f"/products/update-inventory/{inventory_id}?current_stock=1000000"
+            "&low_stock_alert_threshold=1",
+            {},
+        ),
+        "POST /products/bulk-add-categories": lambda n: (
+            "POST",
+            "/products/bulk-add-categories",
+            {
+                "json": [
+                    {"name": f"{tag}-bulk-{n}-{index}", "description": "benchmark"}
+                    for index in range(100)
+                ]
+            },
+        ),
+        "POST /products/bulk-add-products": lambda n: (
+            "POST",
+            "/products/bulk-add-products",
+            {
+                "json": [
+                    {
+                        "name": f"{tag}-bulk-{n}-{index}",
+                        "description": "benchmark",
+                        "price": 1,
+                        "category_id": category_id,
+                    }
+                    for index in range(100)
+                ]
+            },
+        ),
+        "POST /products/bulk-add-inventory": lambda n: (
+            "POST",
+            "/products/bulk-add-inventory",
+            {
+                "json": [
+                    {
+                        "product_id": product_id,
+                        "current_stock": 5,
+                        "low_stock_alert_threshold": 1,
+                    }
+                    for _ in range(100)
+                ]
+            },
+        ),
+        "POST /sales": lambda n: (
+            "POST",
+            "/sales",
+            {"json": [{"items": [{"product_id": product_id, "quantity": 1}]}] * 10},
+        ),
+        "GET /sales/data": lambda n: ("GET", f"/sales/data?{week}", {}),
+        "GET /sales/data?limit": lambda n: (
+            "GET",
+            f"/sales/data?{month}&limit=1000",
+            {},
+        ),
+        "GET /sales/data?format=ndjson": lambda n: (
+            "GET",
+            f"/sales/data?{week}&format=ndjson",
+            {},
+        ),
+        "GET /sales/get-revenue": lambda n: ("GET", f"/sales/get-revenue?{week}", {}),
+        "GET /sales/get-revenue?limit": lambda n: (
+            "GET",
+            f"/sales/get-revenue?{month}&limit=1000",
+            {},
+        ),
+        "GET /sales/revenue-summary": lambda n: (
+            "GET",
+            f"/sales/revenue-summary?{year}",
+            {},
+        ),
+        "GET /sales/revenue-series": lambda n: (
+            "GET",
+            f"/sales/revenue-series?{year}&granularity=week",
+            {},
+        ),
+        "GET /sales/top-products": lambda n: (
+            "GET",
+            f"/sales/top-products?{month}",
+            {},
+        ),
+        "GET /sales/top-categories": lambda n: (
+            "GET",
+            f"/sales/top-categories?{month}",
+            {},
+        ),
+    }
+
+
+async def measure(
+    client: httpx.AsyncClient,
+    build: Callable[[int], Request],
+    numbers: itertools.count,
+    requests: int,
+    concurrency: int,
+) -> dict:
+    """
+    Send the requests from concurrency clients and summarize their latencies
+    """
+    latencies, errors = [], 0
+    remaining = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            method, url, kwargs = build(next(numbers))
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, url, **kwargs)
+                failed = response.status_code >= 400
+            except Exception:
+                failed = True
+            latencies.append((time.perf_counter() - started) * 1000)
+            errors += failed
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": requests,
+        "errors": errors,
+        "throughput_rps": round(requests / elapsed, 2),
+        "p50_ms": round(statistics.median(latencies), 3),
+        "p95_ms": round(percentile(latencies, 0.95), 3),
+        "p99_ms": round(percentile(latencies, 0.99), 3),
+    }
+
+
+async def run(args: argparse.Namespace) -> dict:
+    await app.router.startup()
+    fixture = create_fixture(f"endpoints-{int(time.time())}")
+    numbers = itertools.count()
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench"
+    ) as client:
+        for route, build in routes(fixture).items():
+            if args.routes and not any(name in route for name in args.routes):
+                continue
+            results[route] = {}
+            for concurrency in args.concurrency:
+                # warm up caches and connections before measuring
+                await measure(client, build, numbers, args.warmup, concurrency)
+                summary = await measure(
+                    client, build, numbers, args.requests, concurrency
+                )
+                results[route][str(concurrency)] = summary
+                print(
+                    f"{route:<48} c={concurrency:<3} "
+                    f"{summary['throughput_rps']:9.1f} req/s "
+                    f"p50={summary['p50_ms']:8.2f}ms p95={summary['p95_ms']:8.2f}ms "
+                    f"p99={summary['p99_ms']:8.2f}ms errors={summary['errors']}"
+                )
+    await app.router.shutdown()
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """
+    List the routes and concurrency levels whose p95 latency rose, or whose
+    throughput fell, by more than the threshold against the baseline, or that
+    failed more requests
+    """
+    regressions = []
+    for route, levels in results.items():
+        for concurrency, summary in levels.items():
+            before = baseline.get(route, {}).get(concurrency)
+            if before is None:
+                continue
+            p95 = summary["p95_ms"] / before["p95_ms"] - 1
+            throughput = 1 - summary["throughput_rps"] / before["throughput_rps"]
+            more_errors = summary["errors"] > before["errors"]
+            if p95 > threshold or throughput > threshold or more_errors:
+                regressions.append(
+                    f"{route} c={concurrency}: p95 {before['p95_ms']}ms -> "
+                    f"{summary['p95_ms']}ms, throughput {before['throughput_rps']} -> "
+                    f"{summary['throughput_rps']} req/s, errors {before['errors']} -> "
+                    f"{summary['errors']}"
+                )
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--seed-sales", type=int, default=0)
+    parser.add_argument("--seed-products", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument(
+        "--routes", nargs="*", default=None, help="only run routes containing these"
+    )
+    parser.add_argument("--output", default="benchmark-results.json")
+    parser.add_argument("--baseline", default=None)
+    parser.add_argument("--threshold", type=float, default=0.2)
+    args = parser.parse_args()
+
+    if args.seed_sales:
+        seed_database(args.seed_sales, products=args.seed_products, seed=args.seed)
+
+    results = asyncio.run(run(args))
+    with open(args.output, "w") as file:
+        json.dump(
+            {
+                "created_at": datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "requests": args.requests,
+                "results": results,
+            },
+            file,
+            indent=2,
+        )
+    print(f"results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,158 @@
+"""
+Runs EXPLAIN on the ProductRepository sales queries and fails if any of them
+falls back to a full table scan, if the per sale revenue queries read
+sale_items from the table instead of a covering index, or if a date filtered
+query reads sales or sale_items partitions of months outside its range.
+
+The target database must be migrated (alembic upgrade head). Pass --seed-sales
+to fill an empty database with synthetic sales first, the optimizer only prefers
+indexes once the tables hold a realistic number of rows. Seeding uses the
+data_seed.py generator.
+
+Usage:
+    python -m benchmarks.explain_plans --seed-sales 50000
+"""
+
+import argparse
+import sys
+from datetime import datetime, timedelta
+
+from sqlalchemy.orm import Query
+
+from data_seed import seed_database
+from src.commands.partitions import (
+    FUTURE_PARTITION,
+    get_partitions,
+    month_range,
+    partition_month,
+)
+from src.database import SessionLocal, engine
+from src.models.sale_items import SaleItems
+from src.models.sales import Sales
+from src.repositories.product_repository import ProductRepository
+
+FULL_SCAN = "ALL"
+# revenue is summed from sale_items.line_total, these must not touch the rows
+COVERED = ("revenue(date)", "revenue(date, cursor)")
+PARTITIONED = ("sales", "sale_items")
+
+
+def explain(query: Query) -> list[dict]:
+    """
+    Run EXPLAIN on a query and return one dict per plan row
+    """
+    with engine.connect() as connection:
+        compiled = query.statement.compile(
+            dialect=connection.dialect,
+            compile_kwargs={"render_postcompile": True},
+        )
+        # the driver takes positional parameters in the dialect's paramstyle
+        parameters = tuple(compiled.params[name] for name in compiled.positiontup)
+        result = connection.exec_driver_sql("EXPLAIN " + compiled.string, parameters)
+        return [dict(row._mapping) for row in result]
+
+
+def date_range() -> tuple[datetime, datetime]:
+    end_date = datetime.now()
+    return end_date - timedelta(days=7), end_date
+
+
+def pruned_partitions(partitions: list[str]) -> set[str]:
+    """
+    The partitions a query filtered on the date range may read: the months it
+    overlaps, or the first partition for months older than it
+    """
+    start_date, end_date = date_range()
+    months = month_range(start_date.date(), end_date.date())
+    named = [name for name in partitions if name != FUTURE_PARTITION]
+    allowed = {name for name in named if partition_month(name) in months}
+    if named and months[0] < partition_month(named[0]):
+        allowed.add(named[0])
+    return allowed
+
+
+def repository_queries(repository: ProductRepository) -> dict[str, Query]:
+    """
+    The repository queries, for every filter combination that should be
+    answered through an index
+    """
+    start_date, end_date = date_range()
+    after = (start_date, 0)
+    return {
+        "sales_data(date)": repository.sales_data_query(
+            start_date, end_date, None, None
+        ),
+        "sales_data(date, product)": repository.sales_data_query(
+            start_date, end_date, 1, None
+        ),
+        "sales_data(date, category)": repository.sales_data_query(
+            start_date, end_date, None, 1
+        ),
+        "sales_data(product)": repository.sales_data_query(None, None, 1, None),
+        "sales_data(date, cursor)": repository.sales_data_query(
+            start_date, end_date, None, None, (start_date, 0, 0)
+        )
+        .order_by(Sales.created_at, Sales.id, SaleItems.id)
+        .limit(100),
+        "revenue(date)": repository.revenue_query(start_date, end_date, None),
+        "revenue(date, category)": repository.revenue_query(start_date, end_date, 1),
+        "revenue(date, cursor)": repository.revenue_query(
+            start_date, end_date, None, after
+        )
+        .order_by(Sales.created_at, Sales.id)
+        .limit(100),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--seed-sales", type=int, default=0)
+    parser.add_argument("--seed-products", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    if args.seed_sales:
+        seed_database(args.seed_sales, products=args.seed_products, seed=args.seed)
+
+    with engine.connect() as connection:
+        partitions = {table: get_partitions(connection, table) for table in PARTITIONED}
+    db = SessionLocal()
+    failures = []
+    try:
+        for name, query in repository_queries(ProductRepository(db)).items():
+            print(name)
+            for row in explain(query):
+                extra = (row["Extra"] or "").split("; ")
+                read = set((row.get("partitions") or "").split(",")) - {""}
+                print(
+                    f"    {row['table'] or '-':<12} type={row['type'] or '-':<7} "
+                    f"key={row['key'] or '-':<55} rows={row['rows']:<8} "
+                    f"partitions={len(read) or '-'}/"
+                    f"{len(partitions.get(row['table']) or []) or '-'} "
+                    f"{'; '.join(extra)}"
+                )
+                if "date" in name and partitions.get(row["table"]):
+                    outside = read - pruned_partitions(partitions[row["table"]])
+                    if outside:
+                        failures.append(
+                            f"{name}: {row['table']} partitions "
+                            f"{', '.join(sorted(outside))} not pruned"
+                        )
+                if row["type"] == FULL_SCAN:
+                    failures.append(f"{name}: full scan of {row['table']}")
+                if (
+                    name in COVERED
+                    and row["table"] == "sale_items"
+                    and "Using index" not in extra
+                ):
+                    failures.append(f"{name}: sale_items not read from an index")
+    finally:
+        db.close()
+
+    for failure in failures:
+        print(f"FAIL {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,116 @@
+"""
+Measures latency of cheap endpoints while heavy sales queries run.
+
+The cheap endpoints are first sampled on an idle server, then again while
+--heavy-workers threads hammer the sales analytics endpoints. With route
+handlers running off the event loop the cheap p99 should stay flat.
+
+Usage:
+    uvicorn src.main:app
+    python -m benchmarks.load_test --base-url http://127.0.0.1:8000
+"""
+
+import argparse
+import statistics
+import sys
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+CHEAP_PATHS = ("/healthcheck", "/products/get-product/1", "/products/get-category/1")
+HEAVY_PATHS = ("/sales/get-revenue", "/sales/data")
+
+
+def timed_get(url: str) -> float:
+    """
+    GET a url and return the elapsed time in milliseconds
+    """
+    started = time.perf_counter()
+    with urllib.request.urlopen(url) as response:
+        response.read()
+    return (time.perf_counter() - started) * 1000
+
+
+def percentile(samples: list[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def sample_cheap(
+    base_url: str, requests: int, concurrency: int
+) -> dict[str, list[float]]:
+    """
+    Fire requests at every cheap endpoint and collect latencies per path
+    """
+    samples = {}
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for path in CHEAP_PATHS:
+            samples[path] = list(executor.map(timed_get, [base_url + path] * requests))
+    return samples
+
+
+def run_heavy(base_url: str, stop: threading.Event, completed: list[float]) -> None:
+    while not stop.is_set():
+        for path in HEAVY_PATHS:
+            completed.append(timed_get(base_url + path))
+
+
+def report(label: str, samples: dict[str, list[float]]) -> dict[str, float]:
+    print(label)
+    p99s = {}
+    for path, latencies in samples.items():
+        p99s[path] = percentile(latencies, 0.99)
+        print(
+            f"    {path:<28} p50={statistics.median(latencies):8.2f}ms "
+            f"p99={p99s[path]:8.2f}ms"
+        )
+    return p99s
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--heavy-workers", type=int, default=4)
+    parser.add_argument(
+        "--max-ratio",
+        type=float,
+        default=None,
+        help="fail if a cheap endpoint's p99 under load exceeds its idle p99 by this factor",
+    )
+    args = parser.parse_args()
+
+    idle = report("idle", sample_cheap(args.base_url, args.requests, args.concurrency))
+
+    stop = threading.Event()
+    heavy_latencies = []
+    heavy_threads = [
+        threading.Thread(target=run_heavy, args=(args.base_url, stop, heavy_latencies))
+        for _ in range(args.heavy_workers)
+    ]
+    for thread in heavy_threads:
+        thread.start()
+    try:
+        loaded = report(
+            f"under load ({args.heavy_workers} heavy workers)",
+            sample_cheap(args.base_url, args.requests, args.concurrency),
+        )
+    finally:
+        stop.set()
+        for thread in heavy_threads:
+            thread.join()
+    print(f"    heavy requests completed: {len(heavy_latencies)}")
+
+    failed = False
+    for path, p99 in loaded.items():
+        ratio = p99 / idle[path]
+        print(f"p99 ratio {path:<28} {ratio:6.2f}x")
+        if args.max_ratio and ratio > args.max_ratio:
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,311 @@
+"""
+Runs every endpoint against seeded data and fails if any request executes
+more database queries than its budget.
+
+Budgets are fixed per request and don't grow with the number of rows, so a
+change that adds a lazy relationship load per row (an N+1) pushes the
+affected endpoint over budget. Queries sent to the read replica count as
+well. Requests go straight to the ASGI app through httpx's ASGITransport, no
+server is needed. Caches are cleared before every request so cached reads are
+measured on a miss. tests/test_query_budget.py runs the same check under
+pytest.
+
+The target database must be migrated (alembic upgrade head). Pass --seed-sales
+to fill an empty database with synthetic sales first, the check creates its
+own category, product and inventory to write against and removes them, with
+every row the write requests added, when it is done.
+
+Usage:
+    python -m benchmarks.query_budget --seed-sales 2000
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit
+
+import httpx
+from sqlalchemy import delete, event, select
+from sqlalchemy.sql import functions
+
+from data_seed import seed_database
+from src.cache import category_cache, product_cache
+from src.database import SessionLocal, engine, replica_engine
+from src.main import app
+from src.models.category import Category
+from src.models.daily_revenue import DailyRevenue
+from src.models.inventory import Inventory
+from src.models.product import Product
+from src.models.sale_items import SaleItems
+from src.models.sales import Sales
+
+
+class QueryCounter:
+    def __init__(self):
+        self.queries = 0
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.queries += 1
+
+
+def create_fixture(tag: str) -> dict:
+    """
+    Create the category, product and inventory the write endpoints use, and
+    pick the end of the read windows: the last sale, so the same seeded data
+    is read whatever the current date
+    """
+    db = SessionLocal()
+    try:
+        last_sale = db.scalar(select(functions.max(Sales.created_at)))
+        category = Category(name=f"{tag}-category", desc="query budget")
+        db.add(category)
+        db.flush()
+        product = Product(
+            name=f"{tag}-product",
+            desc="query budget",
+            category_id=category.id,
+            price=10,
+        )
+        db.add(product)
+        db.flush()
+        inventory = Inventory(
+            product_id=product.id, current_stock=1000000, low_stock_alert_threshold=1
+        )
+        db.add(inventory)
+        db.commit()
+        return {
+            "tag": tag,
+            "category_id": category.id,
+            "product_id": product.id,
+            "inventory_id": inventory.id,
+            "end_date": (last_sale or datetime.now()).replace(
+                tzinfo=None, microsecond=0
+            ),
+        }
+    finally:
+        db.close()
+
+
+def remove_fixture(fixture: dict) -> None:
+    """
+    Remove the fixture and everything the requests created, all named after
+    its tag: categories, products with their inventories, and the sales of
+    those products with their rollup rows. The sales_versions counters the
+    sales bumped are kept, versions only ever grow.
+    """
+    pattern = f"{fixture['tag']}-%"
+    db = SessionLocal()
+    try:
+        product_ids = db.scalars(
+            select(Product.id).where(Product.name.like(pattern))
+        ).all()
+        sale_ids = db.scalars(
+            select(SaleItems.sales_id)
+            .where(SaleItems.product_id.in_(product_ids))
+            .distinct()
+        ).all()
+        for statement in (
+            delete(SaleItems).where(SaleItems.sales_id.in_(sale_ids)),
+            delete(Sales).where(Sales.id.in_(sale_ids)),
+            delete(DailyRevenue).where(DailyRevenue.product_id.in_(product_ids)),
+            delete(Inventory).where(Inventory.product_id.in_(product_ids)),
+            delete(Product).where(Product.id.in_(product_ids)),
+            delete(Category).where(Category.name.like(pattern)),
+        ):
+            db.execute(statement.execution_options(synchronize_session=False))
+        db.commit()
+    finally:
+        db.close()
+
+
+def date_range(start_date: datetime, end_date: datetime) -> str:
+    return f"start_date={start_date.isoformat()}&end_date={end_date.isoformat()}"
+
+
+def cases(fixture: dict) -> list[tuple[str, str, object, str, int]]:
+    """
+    The requests to check as (method, url, body, content type, query budget)
+    """
+    tag = fixture["tag"]
+    category_id = fixture["category_id"]
+    product_id = fixture["product_id"]
+    inventory_id = fixture["inventory_id"]
+    end_date = fixture["end_date"]
+    week = date_range(end_date - timedelta(days=7), end_date)
+    year = date_range(end_date - timedelta(days=365), end_date)
+    return [
+        ("GET", f"/products/get-category/{category_id}", None, None, 1),
+        ("GET", f"/products/get-product/{product_id}", None, None, 1),
+        ("GET", "/products/get-low-stock-inventory", None, None, 1),
+        (
+            "POST",
+            f"/products/add-category?name={tag}-added&description=x",
+            None,
+            None,
+            2,
+        ),
+        (
+            "POST",
+            f"/products/add-product?name={tag}-added&description=x&price=1"
+            f"&category_id={category_id}",
+            None,
+            None,
+            2,
+        ),
+        (
+            "POST",
+            f"/products/add-inventory?product_id={product_id}&current_stock=5"
+            "&low_stock_alert_threshold=1",
+            None,
+            None,
+            2,
+        ),
+        (
+            "PATCH",
+            f"/products/update-inventory/{inventory_id}?current_stock=1000000"
+            "&low_stock_alert_threshold=1",
+            None,
+            None,
+            3,
+        ),
+        (
+            "POST",
+            "/products/bulk-add-categories",
+            [
+                {"name": f"{tag}-bulk-{index}", "description": "x"}
+                for index in range(50)
+            ],
+            "application/json",
+            1,
+        ),
+        (
+            "POST",
+            "/products/bulk-add-products",
+            [
+                {
+                    "name": f"{tag}-bulk-{index}",
+                    "description": "x",
+                    "price": 1,
+                    "category_id": category_id,
+                }
+                for index in range(50)
+            ],
+            "application/json",
+            1,
+        ),
+        (
+            "POST",
+            "/products/bulk-add-inventory",
+            [
+                {
+                    "product_id": product_id,
+                    "current_stock": 0,
+                    "low_stock_alert_threshold": 1,
+                }
+                for _ in range(50)
+            ],
+            "application/json",
+            1,
+        ),
+        (
+            "POST",
+            "/sales",
+            [{"items": [{"product_id": product_id, "quantity": 1}]} for _ in range(20)],
+            "application/json",
+            9,
+        ),
+        ("GET", f"/sales/data?{week}", None, None, 1),
+        ("GET", f"/sales/data?{week}&limit=100", None, None, 1),
+        ("GET", f"/sales/data?{year}&category_id={category_id}", None, None, 1),
+        ("GET", f"/sales/data?{year}&format=ndjson", None, None, 1),
+        ("GET", f"/sales/data?{year}&format=csv", None, None, 1),
+        ("GET", f"/sales/get-revenue?{year}", None, None, 2),
+        ("GET", f"/sales/get-revenue?{year}&limit=100", None, None, 2),
+        ("GET", f"/sales/revenue-summary?{year}", None, None, 4),
+        ("GET", f"/sales/revenue-series?{year}", None, None, 4),
+        ("GET", f"/sales/revenue-series?{year}&granularity=hour", None, None, 2),
+        ("GET", f"/sales/revenue-series?{year}&group_by=product", None, None, 4),
+        ("GET", f"/sales/top-products?{year}", None, None, 2),
+        ("GET", f"/sales/top-categories?{year}", None, None, 2),
+        ("GET", "/metrics", None, None, 0),
+        ("GET", "/metrics/pool", None, None, 0),
+        ("GET", "/metrics/cache", None, None, 0),
+        ("GET", "/metrics/column-store", None, None, 0),
+    ]
+
+
+def count_queries(counter: QueryCounter) -> None:
+    """
+    Count the queries sent to the primary and to the read replica, which is
+    the primary itself when none is configured
+    """
+    for bound in {engine, replica_engine}:
+        event.listen(bound, "before_cursor_execute", counter)
+
+
+async def check(fixture: dict, counter: QueryCounter) -> list[str]:
+    """
+    Send every request to the ASGI app and return the ones that failed or
+    went over their query budget
+    """
+    failures = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://testserver"
+    ) as client:
+        for method, url, body, content_type, budget in cases(fixture):
+            product_cache.clear()
+            category_cache.clear()
+            counter.queries = 0
+            try:
+                response = await client.request(
+                    method,
+                    url,
+                    content=json.dumps(body).encode() if body is not None else None,
+                    headers={"content-type": content_type} if content_type else None,
+                )
+                status = response.status_code
+            except Exception as error:
+                print(f"{method} {url} raised {error!r}", file=sys.stderr)
+                status = 500
+            verdict = "ok" if counter.queries <= budget and status < 400 else "FAIL"
+            print(
+                f"{verdict:<4} {method:<5} {urlsplit(url).path:<40} status={status} "
+                f"queries={counter.queries}/{budget}"
+            )
+            if verdict != "ok":
+                failures.append(
+                    f"{method} {url}: status {status}, {counter.queries} queries, "
+                    f"budget {budget}"
+                )
+    return failures
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--seed-sales", type=int, default=0)
+    parser.add_argument("--seed-products", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    if args.seed_sales:
+        seed_database(args.seed_sales, products=args.seed_products, seed=args.seed)
+
+    fixture = create_fixture(f"budget-{int(time.time())}")
+    counter = QueryCounter()
+    count_queries(counter)
+    try:
+        failures = asyncio.run(check(fixture, counter))
+    finally:
+        remove_fixture(fixture)
+
+    for failure in failures:
+        print(f"FAIL {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
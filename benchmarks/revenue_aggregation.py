@@ -0,0 +1,122 @@
+"""
+Compares aggregating revenue from the sale items' stored line totals against
+the previous shape that joined product to multiply by its current price.
+
+Both shapes sum the revenue per sale and in total over date ranges of growing
+length, --repeat times each, and the median latencies are reported with the
+speedup. The results must agree while no product price has changed since the
+sales were recorded, which holds for freshly seeded data.
+
+The target database must be migrated (alembic upgrade head). Pass --seed-sales
+to fill an empty database with the data_seed.py generator first.
+
+Usage:
+    python -m benchmarks.revenue_aggregation --seed-sales 1000000 --repeat 5
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+from sqlalchemy.sql import functions
+
+from data_seed import seed_database
+from src.database import engine
+from src.models.product import Product
+from src.models.sale_items import SaleItems
+from src.models.sales import Sales
+
+
+def statements(start_date: datetime, end_date: datetime) -> dict:
+    """
+    The (joined, join free) pair of every aggregation over the range
+    """
+    in_range = (
+        Sales.created_at >= start_date,
+        Sales.created_at <= end_date,
+        SaleItems.created_at >= start_date,
+        SaleItems.created_at <= end_date,
+    )
+    joined_total = functions.sum(SaleItems.quantity * Product.price)
+    line_total = functions.sum(SaleItems.line_total)
+    return {
+        "per sale": (
+            select(Sales.id, joined_total)
+            .join_from(Sales, Sales.sale_items)
+            .join(SaleItems.product)
+            .where(*in_range)
+            .group_by(Sales.id),
+            select(Sales.id, line_total)
+            .join_from(Sales, Sales.sale_items)
+            .where(*in_range)
+            .group_by(Sales.id),
+        ),
+        "total": (
+            select(joined_total)
+            .join_from(Sales, Sales.sale_items)
+            .join(SaleItems.product)
+            .where(*in_range),
+            select(line_total).join_from(Sales, Sales.sale_items).where(*in_range),
+        ),
+    }
+
+
+def timed(connection, statement, repeat: int) -> tuple[float, list]:
+    """
+    Run the statement repeat times, return the median milliseconds and the rows
+    """
+    durations = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        rows = connection.execute(statement).all()
+        durations.append((time.perf_counter() - started) * 1000)
+    return statistics.median(durations), rows
+
+
+def _rounded(rows: list) -> list:
+    return sorted(
+        tuple(round(value, 4) if isinstance(value, float) else value for value in row)
+        for row in rows
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--seed-sales", type=int, default=0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--days", type=int, nargs="+", default=[7, 30, 90, 365])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.seed_sales:
+        seed_database(args.seed_sales, seed=args.seed)
+
+    mismatches = []
+    with engine.connect() as connection:
+        end_date = connection.scalar(select(functions.max(Sales.created_at)))
+        end_date = end_date or datetime.now()
+        for days in args.days:
+            start_date = end_date - timedelta(days=days)
+            for label, (joined, join_free) in statements(start_date, end_date).items():
+                joined_ms, joined_rows = timed(connection, joined, args.repeat)
+                free_ms, free_rows = timed(connection, join_free, args.repeat)
+                matches = _rounded(joined_rows) == _rounded(free_rows)
+                print(
+                    f"{days:>4} days {label:<9} rows={len(free_rows):<8} "
+                    f"joined={joined_ms:9.2f}ms line_total={free_ms:9.2f}ms "
+                    f"speedup={joined_ms / max(free_ms, 1e-6):5.2f}x"
+                    f"{'' if matches else '  MISMATCH'}"
+                )
+                if not matches:
+                    mismatches.append(f"{days} days {label}")
+
+    for mismatch in mismatches:
+        print(f"MISMATCH {mismatch}", file=sys.stderr)
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
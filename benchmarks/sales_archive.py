@@ -0,0 +1,201 @@
+"""
+Archives the closed months before --before and checks that the sales data
+and revenue queries return the same rows afterwards.
+
+Every query shape, from sales data and revenue pages to top sellers and
+revenue series, runs through ProductRepository before and after the months
+are moved to the sales archive, paged ones are walked to the end with their
+keyset cursors and streamed ones read completely. The median latencies and
+the size of the hot tables and of the archive are reported, and the run exits
+non-zero when any result changed. Archiving removes the months from the
+database, so run it against a disposable copy. Needs the optional numpy
+package (pip install numpy).
+
+The target database must be migrated (alembic upgrade head). Pass --seed-sales
+to fill an empty database with the data_seed.py generator first.
+
+Usage:
+    python -m benchmarks.sales_archive --seed-sales 1000000 --before 2025-01
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import select
+from sqlalchemy.sql import functions
+
+from data_seed import seed_database
+from src.column_store import np
+from src.commands.archive_sales import archive_month, table_bytes
+from src.commands.partitions import next_month
+from src.database import SessionLocal, engine
+from src.models.sales import Sales
+from src.repositories.product_repository import ProductRepository
+from src.sales_archive import sales_archive
+
+
+def _normalize(rows: list) -> list[tuple]:
+    normalized = []
+    for row in rows:
+        values = row.values() if isinstance(row, dict) else tuple(row)
+        normalized.append(
+            tuple(
+                round(value, 6) if isinstance(value, float) else value
+                for value in values
+            )
+        )
+    return sorted(normalized, key=repr)
+
+
+def _walk(page, limit: int, position) -> list:
+    """
+    Read every page of a keyset paginated query
+    """
+    rows, after = [], None
+    while True:
+        batch = page(limit, after)
+        rows += batch
+        if len(batch) < limit:
+            return rows
+        after = position(batch[-1])
+
+
+def queries(repository: ProductRepository, year: datetime, end_date: datetime):
+    sales_data = repository.get_sales_data
+    # starts mid-day so the first day is read from raw sales
+    partial_year = year + timedelta(hours=13, minutes=30)
+    revenue = repository.get_revenue_from_sales
+    return {
+        "sales data, all": lambda: sales_data(None, None, None, None),
+        "sales data, year": lambda: sales_data(year, end_date, None, None),
+        "sales data, category 1": lambda: sales_data(None, None, None, 1),
+        "sales data, product 1": lambda: sales_data(None, None, 1, None),
+        "sales data, pages of 1000": lambda: _walk(
+            lambda limit, after: sales_data(None, None, None, None, limit, after),
+            1000,
+            lambda row: (row.created_at, row.id, row.sale_item_id),
+        ),
+        "sales data, stream": lambda: list(
+            repository.stream_sales_data(None, None, None, None)
+        ),
+        "revenue, all": lambda: revenue(None, None, None),
+        "revenue, year, category 1": lambda: revenue(year, end_date, 1),
+        "revenue, pages of 1000": lambda: _walk(
+            lambda limit, after: revenue(None, None, None, limit, after),
+            1000,
+            lambda sale: (sale["created_at"], sale["id"]),
+        ),
+        "top products, year": lambda: repository.get_top_sellers(
+            "product", "revenue", 20, year, end_date
+        ),
+        "top categories, quantity": lambda: repository.get_top_sellers(
+            "category", "quantity", 10, None, None
+        ),
+        "summary, partial days": lambda: [
+            repository.get_revenue_summary(partial_year, end_date, None)
+        ],
+        "series, hours": lambda: repository.get_revenue_series(
+            "hour", year, end_date, None, None
+        ),
+        "series, days per category": lambda: repository.get_revenue_series(
+            "day", partial_year, end_date, None, None, "category"
+        ),
+    }
+
+
+def run(repeat: int) -> dict:
+    """
+    Run every query shape repeat times, return the median milliseconds and the
+    rows of each
+    """
+    db = SessionLocal()
+    try:
+        repository = ProductRepository(db)
+        end_date = db.query(Sales.created_at).order_by(Sales.created_at.desc()).first()
+        end_date = end_date[0].replace(tzinfo=None) if end_date else datetime.now()
+        year = end_date - timedelta(days=365)
+        results = {}
+        for label, query in queries(repository, year, end_date).items():
+            durations = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                rows = query()
+                durations.append((time.perf_counter() - started) * 1000)
+            results[label] = (statistics.median(durations), _normalize(rows))
+        return results
+    finally:
+        db.close()
+
+
+def _month(value: str) -> date:
+    return datetime.strptime(value, "%Y-%m").date()
+
+
+def _archive_bytes() -> int:
+    return sum(
+        os.path.getsize(os.path.join(directory, name))
+        for directory, _, names in os.walk(sales_archive.directory)
+        for name in names
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--seed-sales", type=int, default=0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--before", type=_month, required=True)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if np is None:
+        print("numpy is not installed", file=sys.stderr)
+        return 1
+    if args.seed_sales:
+        seed_database(args.seed_sales, seed=args.seed)
+
+    before = run(args.repeat)
+    os.makedirs(sales_archive.directory, exist_ok=True)
+    sales_archive.refresh()
+    with engine.connect() as connection:
+        sizes = table_bytes(connection)
+        first_sale = connection.scalar(select(functions.min(Sales.created_at)))
+        connection.commit()
+        month = first_sale.date().replace(day=1) if first_sale else args.before
+        started = time.perf_counter()
+        while month < args.before:
+            if not archive_month(connection, sales_archive, month):
+                print(f"{month:%Y-%m} could not be archived", file=sys.stderr)
+                return 1
+            sales_archive.refresh()
+            month = next_month(month)
+        archived_in = time.perf_counter() - started
+        archived_sizes = table_bytes(connection)
+    after = run(args.repeat)
+
+    print(f"archived in {archived_in:.1f}s, archive {_archive_bytes() / 1e6:.1f}MB")
+    for table, size in sizes.items():
+        print(
+            f"{table:<12} {size / 1e6:9.1f}MB -> {archived_sizes[table] / 1e6:9.1f}MB"
+        )
+    mismatches = []
+    for label, (before_ms, before_rows) in before.items():
+        after_ms, after_rows = after[label]
+        matches = before_rows == after_rows
+        print(
+            f"{label:<28} rows={len(after_rows):<8} before={before_ms:9.2f}ms "
+            f"after={after_ms:9.2f}ms{'' if matches else '  MISMATCH'}"
+        )
+        if not matches:
+            mismatches.append(label)
+
+    for label in mismatches:
+        print(f"MISMATCH {label}", file=sys.stderr)
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,127 @@
+"""
+Measures per-response serialization time of ORM objects and sales rows.
+
+"before" is FastAPI's fallback path without a response model: jsonable_encoder
+walks every object reflectively and the stdlib json module renders the body.
+"after" is the response model path: pydantic-core validates the objects with
+from_attributes, dumps them in json mode and orjson renders the body.
+
+No database is needed, rows are built in memory.
+
+Usage:
+    python -m benchmarks.serialization --rows 1 1000 100000
+"""
+
+import argparse
+import sys
+import time
+from datetime import datetime
+from typing import Callable, List, NamedTuple
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+from pydantic import TypeAdapter
+
+from src.models.category import Category  # noqa: F401, registers the mapper
+from src.models.product import Product
+from src.schemas import ProductResponse, SaleDataRow
+
+
+class SaleRow(NamedTuple):
+    id: int
+    sale_item_id: int
+    product_id: int
+    created_at: datetime
+    quantity: int
+
+
+def products(count: int) -> list[Product]:
+    now = datetime(2024, 1, 1, 12, 30)
+    return [
+        Product(
+            id=index,
+            name=f"product-{index}",
+            desc="benchmark product",
+            price=1.5 + index % 500,
+            category_id=1 + index % 20,
+            created_at=now,
+            updated_at=now,
+        )
+        for index in range(count)
+    ]
+
+
+def sale_rows(count: int) -> list[SaleRow]:
+    now = datetime(2024, 1, 1, 12, 30)
+    return [
+        SaleRow(index // 3, index, 1 + index % 1000, now, 1 + index % 5)
+        for index in range(count)
+    ]
+
+
+def sale_dict(sale: SaleRow) -> dict:
+    return {
+        "sale_id": sale.id,
+        "product_id": sale.product_id,
+        "quantity": sale.quantity,
+        "date": sale.created_at,
+    }
+
+
+def before_products(rows: list) -> bytes:
+    return JSONResponse(jsonable_encoder(rows)).body
+
+
+def before_sales(rows: list) -> bytes:
+    return JSONResponse(jsonable_encoder([sale_dict(sale) for sale in rows])).body
+
+
+def after(adapter: TypeAdapter) -> Callable[[list], bytes]:
+    def render(rows: list) -> bytes:
+        content = adapter.dump_python(adapter.validate_python(rows), mode="json")
+        return ORJSONResponse(content).body
+
+    return render
+
+
+def timed(render: Callable[[list], bytes], rows: list, repeat: int) -> float:
+    """
+    Render the rows repeat times and return the best time in milliseconds
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        render(rows)
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1, 1000, 100000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    cases = (
+        (
+            "products",
+            products,
+            before_products,
+            after(TypeAdapter(List[ProductResponse])),
+        ),
+        ("sales data", sale_rows, before_sales, after(TypeAdapter(List[SaleDataRow]))),
+    )
+    for label, build, before, optimized in cases:
+        for count in args.rows:
+            rows = build(count)
+            before_ms = timed(before, rows, args.repeat)
+            after_ms = timed(optimized, rows, args.repeat)
+            print(
+                f"{label:<10} {count:>7} rows  before={before_ms:10.3f}ms "
+                f"after={after_ms:10.3f}ms  speedup={before_ms / after_ms:6.1f}x"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
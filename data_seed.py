@@ -1,86 +1,452 @@
-from sqlalchemy import create_engine, text
-import pandas as pd
+"""
+Generates a deterministic, production shaped dataset for benchmarks.
 
-SQLALCHEMY_DATABASE_URL = "mysql://root:    @localhost:3306/ecommerce_db"
+Product popularity follows a Zipf distribution, sales follow yearly
+seasonality, a weekly cycle, an evening peak and steady growth, and baskets
+hold a skewed number of items and units. The same --seed always produces the
+same rows: sales end on --end-day, a fixed END_DAY unless given, never on a
+day relative to today. Sales are generated day by day in time order, so
+memory stays flat however many rows are generated.
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
-con = engine.connect()
+Rows are loaded with multi-row INSERTs in --batch-size batches, or with
+--method load-data through CSV files and LOAD DATA LOCAL INFILE, which needs
+local_infile enabled on the MySQL server. Monthly partitions are added for the
+generated range before loading and the daily_revenue rollup is rebuilt
+afterwards. The target database must be migrated (alembic upgrade head) and
+its catalog and sales tables empty, since rows are loaded with explicit ids,
+pass --truncate to clear them first.
 
-category_insert_statement = text(
-    """
-INSERT INTO category (id, name, `desc`)
-VALUES
-  (1, 'cat1', 'test desc'),
-  (2, 'cat2', 'test desc'),
-  (3, 'cat3', 'test desc'),
-  (4, 'cat4', 'test desc');
+Usage:
+    python data_seed.py --sales 1000000 --products 5000
+    python data_seed.py --sales 4000000 --method load-data --truncate
 """
-)
 
-con.execute(category_insert_statement)
-con.commit()
+import argparse
+import csv
+import logging
+import math
+import os
+import random
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from itertools import accumulate
+from typing import Iterator
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Connection
+
+from src import config
+from src.commands.backfill_daily_revenue import month_ranges
+from src.commands.partitions import TABLES as PARTITIONED_TABLES
+from src.commands.partitions import add_partitions, get_partitions
+from src.database import SessionLocal, engine
+from src.repositories.product_repository import ProductRepository
+
+# last day with sales unless --end-day is given, fixed so a seed always
+# generates the same rows and benchmark baselines stay comparable
+END_DAY = date(2025, 12, 31)
+# load order, referenced tables first
+TABLES = ("category", "product", "inventory", "sales", "sale_items")
+COLUMNS = {
+    "category": ("id", "name", "desc", "created_at", "updated_at"),
+    "product": (
+        "id",
+        "name",
+        "desc",
+        "category_id",
+        "price",
+        "created_at",
+        "updated_at",
+    ),
+    "inventory": (
+        "id",
+        "product_id",
+        "current_stock",
+        "low_stock_alert_threshold",
+        "created_at",
+        "updated_at",
+    ),
+    "sales": ("id", "created_at", "updated_at"),
+    "sale_items": (
+        "id",
+        "sales_id",
+        "created_at",
+        "product_id",
+        "quantity",
+        "unit_price",
+    ),
+}
+
+# relative number of sales per hour of the day, peaking in the evening
+# fmt: off
+HOUR_WEIGHTS = (3, 2, 1, 1, 1, 2, 3, 5, 7, 8, 9, 10, 11, 10, 9, 9, 10, 11, 13, 14, 13, 10, 7, 5)
+# fmt: on
+# relative number of sales per weekday, Monday first
+WEEKDAY_WEIGHTS = (1.0, 0.95, 0.95, 1.0, 1.15, 1.35, 1.25)
+# relative frequency of baskets with 1, 2, 3... items and of 1, 2, 3... units
+ITEM_COUNT_WEIGHTS = (50, 25, 12, 7, 4, 2)
+QUANTITY_WEIGHTS = (60, 20, 10, 6, 4)
+# share of inventories generated at or below their low stock threshold
+LOW_STOCK_SHARE = 0.05
+# yearly sales growth
+GROWTH = 0.3
 
 
-product_insert_statement = text(
+def day_weight(day: date, start_day: date) -> float:
     """
-INSERT INTO product (id, name, `desc`, category_id, price)
-VALUES
-  (1, 'prod1', 'test desc', 1, 10.0),
-  (2, 'prod2', 'test desc', 2, 20.0),
-  (3, 'prod3', 'test desc', 3, 30.0),
-  (4, 'prod4', 'test desc', 4, 40.0);
-"""
-)
-con.execute(product_insert_statement)
-con.commit()
+    Relative number of sales on a day: a yearly cycle peaking before
+    Christmas, the weekly cycle and linear growth over the generated range
+    """
+    season = 1 + 0.3 * math.cos(2 * math.pi * (day.timetuple().tm_yday - 355) / 365.25)
+    growth = 1 + GROWTH * (day - start_day).days / 365.25
+    return season * growth * WEEKDAY_WEIGHTS[day.weekday()]
 
 
-inventory_insert_statement = text(
+def sales_per_day(start_day: date, days: int, total: int) -> list[int]:
     """
-INSERT INTO inventory (id, product_id, current_stock, low_stock_alert_threshold)
-VALUES
-    (1, 1, 10, 1),
-    (2, 2, 20, 2),
-    (3, 3, 30, 3),
-    (4, 4, 40, 4);
-"""
-)
-con.execute(inventory_insert_statement)
-con.commit()
+    Split the total number of sales over the days in proportion to their
+    weights, handing the rounding remainder to the days with the largest
+    fractions so the counts add up exactly
+    """
+    weights = [
+        day_weight(start_day + timedelta(days=offset), start_day)
+        for offset in range(days)
+    ]
+    scale = total / sum(weights)
+    expected = [weight * scale for weight in weights]
+    counts = [int(value) for value in expected]
+    by_remainder = sorted(
+        range(days), key=lambda offset: counts[offset] - expected[offset]
+    )
+    for offset in by_remainder[: total - sum(counts)]:
+        counts[offset] += 1
+    return counts
 
 
-sales_insert_statement = text(
+def catalog(
+    rng: random.Random, categories: int, products: int, created_at: datetime
+) -> dict[str, list[tuple]]:
     """
-INSERT INTO sales (id)
-VALUES
-    (1),
-    (2),
-    (3),
-    (4);
-"""
-)
-con.execute(sales_insert_statement)
-con.commit()
+    Generate the categories, products with log-normal prices and one
+    inventory per product
+    """
+    category_rows = [
+        (category_id, f"category-{category_id}", "generated", created_at, created_at)
+        for category_id in range(1, categories + 1)
+    ]
+    product_rows = [
+        (
+            product_id,
+            f"product-{product_id}",
+            "generated",
+            rng.randint(1, categories),
+            round(min(max(math.exp(rng.gauss(3.5, 1.0)), 0.5), 5000), 2),
+            created_at,
+            created_at,
+        )
+        for product_id in range(1, products + 1)
+    ]
+    inventory_rows = []
+    for product_id in range(1, products + 1):
+        threshold = rng.randint(5, 50)
+        if rng.random() < LOW_STOCK_SHARE:
+            stock = rng.randint(0, threshold)
+        else:
+            stock = rng.randint(threshold + 1, threshold * 100)
+        inventory_rows.append(
+            (product_id, product_id, stock, threshold, created_at, created_at)
+        )
+    return {
+        "category": category_rows,
+        "product": product_rows,
+        "inventory": inventory_rows,
+    }
 
 
-sale_items_insert_statement = text(
+def sales(
+    rng: random.Random,
+    start_day: date,
+    days: int,
+    total: int,
+    prices: list[float],
+    zipf_exponent: float,
+    max_items: int,
+    batch_size: int,
+) -> Iterator[tuple[list[tuple], list[tuple]]]:
     """
-INSERT INTO sale_items (id, sales_id, product_id, quantity)
-VALUES
-    (1, 1, 1, 3),
-    (2, 1, 4, 1),
-    (3, 2, 1, 3),
-    (4, 2, 3, 6),
-    (5, 2, 2, 5),
-    (6, 2, 4, 2),
-    (7, 3, 4, 6),
-    (8, 3, 1, 2),
-    (9, 3, 3, 5),
-    (10, 4, 2, 4),
-    (11, 4, 1, 3);
-"""
-)
-con.execute(sale_items_insert_statement)
-con.commit()
+    Generate sales and their items in time order, in batches of batch_size
+    sales. Products are drawn from a Zipf distribution over a
+    shuffled ranking, so popularity doesn't follow the product id. Items are
+    sold at their product's price, prices[product_id - 1].
+    """
+    products = len(prices)
+    ranking = list(range(1, products + 1))
+    rng.shuffle(ranking)
+    product_weights = list(
+        accumulate(1 / rank**zipf_exponent for rank in range(1, products + 1))
+    )
+    item_count_weights = list(accumulate(ITEM_COUNT_WEIGHTS[:max_items]))
+    item_counts = range(1, len(item_count_weights) + 1)
+    quantity_weights = list(accumulate(QUANTITY_WEIGHTS))
+    quantities = range(1, len(QUANTITY_WEIGHTS) + 1)
+    hour_weights = list(accumulate(HOUR_WEIGHTS))
+
+    sale_id = 0
+    item_id = 0
+    sale_rows, item_rows = [], []
+    for offset, count in enumerate(sales_per_day(start_day, days, total)):
+        midnight = datetime.combine(
+            start_day + timedelta(days=offset), datetime.min.time()
+        )
+        hours = rng.choices(range(24), cum_weights=hour_weights, k=count)
+        seconds = sorted(hour * 3600 + rng.randrange(3600) for hour in hours)
+        for second in seconds:
+            sale_id += 1
+            created_at = midnight + timedelta(seconds=second)
+            sale_rows.append((sale_id, created_at, created_at))
+            basket = rng.choices(item_counts, cum_weights=item_count_weights)[0]
+            for product_rank in rng.choices(
+                range(products), cum_weights=product_weights, k=basket
+            ):
+                item_id += 1
+                quantity = rng.choices(quantities, cum_weights=quantity_weights)[0]
+                product_id = ranking[product_rank]
+                item_rows.append(
+                    (
+                        item_id,
+                        sale_id,
+                        created_at,
+                        product_id,
+                        quantity,
+                        prices[product_id - 1],
+                    )
+                )
+            if len(sale_rows) >= batch_size:
+                yield sale_rows, item_rows
+                sale_rows, item_rows = [], []
+    if sale_rows:
+        yield sale_rows, item_rows
+
+
+class InsertLoader:
+    """
+    Loads rows with multi-row INSERTs, one transaction per batch
+    """
+
+    def __init__(self, connection: Connection):
+        self.connection = connection
+
+    def add(self, table: str, rows: list[tuple]) -> None:
+        columns = COLUMNS[table]
+        # the driver rewrites an executemany INSERT into multi-row INSERTs
+        self.connection.exec_driver_sql(
+            f"INSERT INTO {table} ({', '.join(f'`{column}`' for column in columns)}) "
+            f"VALUES ({', '.join(['%s'] * len(columns))})",
+            rows,
+        )
+        self.connection.commit()
+
+    def finish(self) -> None:
+        pass
+
+
+class LoadDataLoader:
+    """
+    Writes rows to one CSV file per table and loads them with LOAD DATA LOCAL
+    INFILE, the fastest way into MySQL
+    """
+
+    def __init__(self, connection: Connection, directory: str):
+        self.connection = connection
+        self.paths = {
+            table: os.path.join(directory, f"{table}.csv") for table in TABLES
+        }
+        self.files = {
+            table: open(path, "w", newline="") for table, path in self.paths.items()
+        }
+        self.writers = {
+            table: csv.writer(file, lineterminator="\n")
+            for table, file in self.files.items()
+        }
+
+    def add(self, table: str, rows: list[tuple]) -> None:
+        self.writers[table].writerows(rows)
+
+    def finish(self) -> None:
+        for file in self.files.values():
+            file.close()
+        for table in TABLES:
+            columns = ", ".join(f"`{column}`" for column in COLUMNS[table])
+            self.connection.exec_driver_sql(
+                f"LOAD DATA LOCAL INFILE '{self.paths[table]}' INTO TABLE {table} "
+                "FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' "
+                f"LINES TERMINATED BY '\\n' ({columns})"
+            )
+            self.connection.commit()
+            logging.info(f"Loaded {table}")
+
+
+def truncate(connection: Connection) -> None:
+    connection.exec_driver_sql("SET foreign_key_checks = 0")
+    for table in ("daily_revenue",) + TABLES:
+        connection.exec_driver_sql(f"TRUNCATE TABLE {table}")
+    connection.exec_driver_sql("SET foreign_key_checks = 1")
+    connection.commit()
+
+
+def rebuild_rollup(start_day: date, end_day: date) -> None:
+    db = SessionLocal()
+    try:
+        repository = ProductRepository(db)
+        for first_day, last_day in month_ranges(start_day, end_day):
+            rows = repository.rebuild_daily_revenue(first_day, last_day)
+            logging.info(
+                f"Rebuilt {rows} daily revenue rows for {first_day} to {last_day}"
+            )
+    finally:
+        db.close()
+
+
+def seed_database(
+    sales_count: int,
+    products: int = 5000,
+    categories: int = 50,
+    days: int = 365,
+    end_day: date = None,
+    seed: int = 42,
+    zipf_exponent: float = 1.1,
+    max_items: int = 4,
+    batch_size: int = 10000,
+    method: str = "insert",
+    truncate_first: bool = False,
+) -> bool:
+    """
+    Generate and load the dataset, then rebuild the daily revenue rollup
+
+    Parameters:
+        sales_count (int): The number of sales
+        products (int): The number of products
+        categories (int): The number of categories
+        days (int): The number of days the sales are spread over
+        end_day (date): The last day with sales, END_DAY by default
+        seed (int): The random seed
+        zipf_exponent (float): The skew of product popularity
+        max_items (int): The most items in a sale
+        batch_size (int): The number of sales per INSERT batch
+        method (str): Load with "insert" or "load-data"
+        truncate_first (bool): Clear the tables before loading
+
+    Returns:
+        bool: False when the database already holds rows and nothing was loaded
+    """
+    end_day = end_day or END_DAY
+    start_day = end_day - timedelta(days=days - 1)
+    rng = random.Random(seed)
+    load_engine = engine
+    if method == "load-data":
+        load_engine = create_engine(
+            config.DATABASE_URL, connect_args={"local_infile": True}
+        )
+
+    started = time.perf_counter()
+    with load_engine.connect() as connection, tempfile.TemporaryDirectory() as directory:
+        if truncate_first:
+            truncate(connection)
+        else:
+            filled = [
+                table
+                for table in TABLES
+                if connection.exec_driver_sql(f"SELECT 1 FROM {table} LIMIT 1").first()
+            ]
+            connection.commit()
+            if filled:
+                logging.info(
+                    f"{', '.join(filled)} not empty, skipping seed, pass --truncate"
+                )
+                return False
+
+        # give every generated month its own partition before loading
+        for table in PARTITIONED_TABLES:
+            if get_partitions(connection, table):
+                add_partitions(connection, table, start_day, end_day)
+
+        # rows are generated consistent, skip the per row constraint checks
+        connection.exec_driver_sql("SET foreign_key_checks = 0, unique_checks = 0")
+        loader = (
+            LoadDataLoader(connection, directory)
+            if method == "load-data"
+            else InsertLoader(connection)
+        )
+        created_at = datetime.combine(start_day, datetime.min.time())
+        catalog_rows = catalog(rng, categories, products, created_at)
+        for table, rows in catalog_rows.items():
+            loader.add(table, rows)
+        prices = [row[4] for row in catalog_rows["product"]]
+
+        sales_total, items_total = 0, 0
+        for sale_rows, item_rows in sales(
+            rng,
+            start_day,
+            days,
+            sales_count,
+            prices,
+            zipf_exponent,
+            max_items,
+            batch_size,
+        ):
+            loader.add("sales", sale_rows)
+            loader.add("sale_items", item_rows)
+            sales_total += len(sale_rows)
+            items_total += len(item_rows)
+            logging.info(f"Generated {sales_total} sales with {items_total} items")
+        loader.finish()
+        connection.exec_driver_sql("SET foreign_key_checks = 1, unique_checks = 1")
+        for table in TABLES:
+            connection.exec_driver_sql(f"ANALYZE TABLE {table}")
+
+    logging.info(
+        f"Loaded {sales_total} sales and {items_total} items in {time.perf_counter() - started:.1f}s"
+    )
+    rebuild_rollup(start_day, end_day)
+    return True
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sales", type=int, default=1000000)
+    parser.add_argument("--products", type=int, default=5000)
+    parser.add_argument("--categories", type=int, default=50)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--end-day", type=date.fromisoformat, default=None)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--zipf-exponent", type=float, default=1.1)
+    parser.add_argument(
+        "--max-items",
+        type=int,
+        default=4,
+        choices=range(1, len(ITEM_COUNT_WEIGHTS) + 1),
+    )
+    parser.add_argument("--batch-size", type=int, default=10000)
+    parser.add_argument("--method", choices=("insert", "load-data"), default="insert")
+    parser.add_argument("--truncate", action="store_true")
+    args = parser.parse_args()
+
+    seed_database(
+        args.sales,
+        products=args.products,
+        categories=args.categories,
+        days=args.days,
+        end_day=args.end_day,
+        seed=args.seed,
+        zipf_exponent=args.zipf_exponent,
+        max_items=args.max_items,
+        batch_size=args.batch_size,
+        method=args.method,
+        truncate_first=args.truncate,
+    )
+
 
-con.close()
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    main()
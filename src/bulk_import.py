@@ -0,0 +1,70 @@
+import csv
+import io
+import json
+from typing import Type, TypeVar
+
+from pydantic import BaseModel, ValidationError
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+CSV_MEDIA_TYPE = "text/csv"
+
+Schema = TypeVar("Schema", bound=BaseModel)
+
+
+def parse_rows(body: bytes, content_type: str) -> list[dict]:
+    """
+    Parse an uploaded bulk import body into rows. CSV files must have a header
+    line with the field names, NDJSON files hold one json object per line and
+    anything else is read as a json array of objects.
+
+    Parameters:
+        body (bytes): The request body
+        content_type (str): The request Content-Type header
+
+    Returns:
+        list[dict]: The rows
+
+    Raises:
+        ValueError: If the body can't be parsed
+    """
+    text = body.decode("utf-8-sig")
+    if CSV_MEDIA_TYPE in content_type:
+        return list(csv.DictReader(io.StringIO(text)))
+    if NDJSON_MEDIA_TYPE in content_type:
+        return [json.loads(line) for line in text.splitlines() if line.strip()]
+    rows = json.loads(text)
+    if not isinstance(rows, list):
+        raise ValueError("Expected a json array of rows")
+    return rows
+
+
+def validate_rows(
+    rows: list[dict], schema: Type[Schema]
+) -> tuple[list[Schema], list[int], list[dict]]:
+    """
+    Validate every row against a request schema, keeping the valid ones
+
+    Parameters:
+        rows (list[dict]): The parsed rows
+        schema (Type[BaseModel]): The request schema of a single row
+
+    Returns:
+        tuple: The valid rows, their 1-based row numbers and the errors of the
+        invalid rows
+    """
+    valid, row_numbers, errors = [], [], []
+    for row_number, row in enumerate(rows, start=1):
+        try:
+            valid.append(schema.model_validate(row))
+            row_numbers.append(row_number)
+        except ValidationError as error:
+            errors.append(
+                {
+                    "row": row_number,
+                    "error": "; ".join(
+                        f"{'.'.join(map(str, detail['loc']))}: {detail['msg']}"
+                        for detail in error.errors()
+                    ),
+                }
+            )
+    return valid, row_numbers, errors
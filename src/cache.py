@@ -0,0 +1,101 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+from src import config
+
+
+class TTLCache:
+    """
+    Thread safe, size bounded LRU cache whose entries expire after a TTL.
+    Caches are per worker process, invalidation doesn't reach other workers,
+    so entries there stay stale for at most ttl seconds.
+    """
+
+    def __init__(self, name: str, max_size: int, ttl: float, enabled: bool = True):
+        self.name = name
+        self.max_size = max_size
+        self.ttl = ttl
+        self.enabled = enabled
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Get a cached value, or None on a miss
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """
+        Cache a value, evicting the least recently used entry when full
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """
+        Get the cache counters
+
+        Returns:
+            dict: The hit, miss, eviction and expiration counts and the cache size
+        """
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+product_cache = TTLCache(
+    "product",
+    config.CATALOG_CACHE_MAX_SIZE,
+    config.CATALOG_CACHE_TTL,
+    config.CATALOG_CACHE_ENABLED,
+)
+category_cache = TTLCache(
+    "category",
+    config.CATALOG_CACHE_MAX_SIZE,
+    config.CATALOG_CACHE_TTL,
+    config.CATALOG_CACHE_ENABLED,
+)
@@ -0,0 +1,512 @@
+import logging
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+from typing import Callable, Optional
+
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import functions
+
+from src import config
+from src.models.product import Product
+from src.models.sale_items import SaleItems
+
+try:
+    import numpy as np
+except ImportError:  # optional, the store stays disabled without it
+    np = None
+
+# Same attributes as the rows of ProductRepository.sales_data_query
+SaleDataRecord = namedtuple(
+    "SaleDataRecord", ("id", "sale_item_id", "product_id", "created_at", "quantity")
+)
+
+COLUMNS = (
+    ("sale_item_id", "int64"),
+    ("sale_id", "int64"),
+    ("product_id", "int32"),
+    ("category_id", "int32"),
+    ("quantity", "int32"),
+    ("line_total", "float64"),
+    ("created_at", "datetime64[us]"),
+)
+
+
+def _datetime64(value: datetime):
+    # MySQL DATETIME columns are naive, compare against the wall clock value
+    return np.datetime64(value.replace(tzinfo=None), "us")
+
+
+def _range(
+    columns: dict,
+    start_date: Optional[datetime],
+    end_date: Optional[datetime],
+    before: Optional[datetime] = None,
+) -> tuple[int, int]:
+    created_at = columns["created_at"]
+    low = (
+        int(np.searchsorted(created_at, _datetime64(start_date), "left"))
+        if start_date
+        else 0
+    )
+    high = (
+        int(np.searchsorted(created_at, _datetime64(end_date), "right"))
+        if end_date
+        else len(created_at)
+    )
+    if before:
+        high = min(high, int(np.searchsorted(created_at, _datetime64(before), "left")))
+    return low, max(low, high)
+
+
+def _seek(columns: dict, low: int, high: int, after: tuple) -> int:
+    """
+    Get the first position in [low, high) sorting after the keyset position
+    (created_at, sale id[, sale item id])
+    """
+    created_at = _datetime64(after[0])
+    first = low + int(np.searchsorted(columns["created_at"][low:high], created_at))
+    last = low + int(
+        np.searchsorted(columns["created_at"][low:high], created_at, "right")
+    )
+    sale_ids = columns["sale_id"][first:last]
+    later = sale_ids > after[1]
+    if len(after) > 2:
+        later |= (sale_ids == after[1]) & (
+            columns["sale_item_id"][first:last] > after[2]
+        )
+    # rows sharing created_at are ordered by id, the first later one starts
+    return first + int(np.argmax(later)) if later.any() else last
+
+
+def filter_mask(
+    product_id: Optional[int],
+    category_id: Optional[int],
+    product_ids: Optional[list[int]] = None,
+) -> Callable:
+    """
+    Get the function masking the sale items in [low, stop) that match the
+    filters. Categories are matched on the category_id column, or on the ids
+    of the category's products for columns without one.
+
+    Parameters:
+        product_id (int): The product id
+        category_id (int): The category id
+        product_ids (list[int]): The ids of the category's products
+
+    Returns:
+        Callable: The mask function of (columns, low, stop)
+    """
+
+    def mask(columns: dict, low: int, stop: int):
+        matches = np.ones(stop - low, dtype=bool)
+        if product_id:
+            matches &= columns["product_id"][low:stop] == product_id
+        if product_ids is not None:
+            matches &= np.isin(columns["product_id"][low:stop], product_ids)
+        elif category_id:
+            matches &= columns["category_id"][low:stop] == category_id
+        return matches
+
+    return mask
+
+
+def select_sales_data(
+    columns: dict,
+    start_date: Optional[datetime],
+    end_date: Optional[datetime],
+    mask: Callable,
+    limit: Optional[int] = None,
+    after: Optional[tuple[datetime, int, int]] = None,
+) -> list[SaleDataRecord]:
+    """
+    Get the sale items of sorted columns in the date range matching the mask,
+    in (created_at, sale id, sale item id) order
+
+    Parameters:
+        columns (dict): The column arrays
+        start_date (datetime): The start date
+        end_date (datetime): The end date
+        mask (Callable): The filter_mask of the filters
+        limit (int): The maximum number of rows to return
+        after (tuple): The (created_at, sale id, sale item id) keyset position
+            to resume after
+
+    Returns:
+        list[SaleDataRecord]: The sales data rows
+    """
+    low, high = _range(columns, start_date, end_date)
+    if after:
+        low = _seek(columns, low, high, after)
+    window = limit or high - low
+    while True:
+        # widen the scanned window until it holds a full page
+        stop = min(high, low + window)
+        positions = low + np.flatnonzero(mask(columns, low, stop))
+        if not limit or len(positions) >= limit or stop == high:
+            break
+        window *= 4
+    positions = positions[:limit] if limit else positions
+    return [
+        SaleDataRecord(*row)
+        for row in zip(
+            columns["sale_id"][positions].tolist(),
+            columns["sale_item_id"][positions].tolist(),
+            columns["product_id"][positions].tolist(),
+            columns["created_at"][positions].astype(object).tolist(),
+            columns["quantity"][positions].tolist(),
+        )
+    ]
+
+
+def select_items(
+    columns: dict,
+    start_date: Optional[datetime],
+    end_date: Optional[datetime],
+    mask: Callable,
+    before: Optional[datetime] = None,
+) -> dict:
+    """
+    Get the sale items of sorted columns in [start_date, end_date], or before
+    the given datetime, matching the mask as column arrays to aggregate
+
+    Parameters:
+        columns (dict): The column arrays
+        start_date (datetime): The start date
+        end_date (datetime): The end date
+        mask (Callable): The filter_mask of the filters
+        before (datetime): The exclusive end of the range
+
+    Returns:
+        dict: The matching rows of every column
+    """
+    low, high = _range(columns, start_date, end_date, before)
+    positions = low + np.flatnonzero(mask(columns, low, high))
+    return {name: column[positions] for name, column in columns.items()}
+
+
+def select_revenue(
+    columns: dict,
+    start_date: Optional[datetime],
+    end_date: Optional[datetime],
+    mask: Callable,
+    limit: Optional[int] = None,
+    after: Optional[tuple[datetime, int]] = None,
+) -> list[dict]:
+    """
+    Get the revenue of every sale of sorted columns in the date range, summed
+    over its items matching the mask. Items of a sale are adjacent in the sort
+    order, so per sale totals are a reduceat over the boundaries between sale
+    ids.
+
+    Parameters:
+        columns (dict): The column arrays
+        start_date (datetime): The start date
+        end_date (datetime): The end date
+        mask (Callable): The filter_mask of the filters
+        limit (int): The maximum number of sales to return
+        after (tuple): The (created_at, sale id) keyset position to resume after
+
+    Returns:
+        list[dict]: The id, total price and created_at of each sale
+    """
+    low, high = _range(columns, start_date, end_date)
+    if after:
+        low = _seek(columns, low, high, after)
+    window = limit or high - low
+    while True:
+        stop = min(high, low + window)
+        positions = low + np.flatnonzero(mask(columns, low, stop))
+        sale_ids = columns["sale_id"][positions]
+        starts = np.flatnonzero(np.concatenate(([True], sale_ids[1:] != sale_ids[:-1])))
+        # the last sale in a partial window may be cut off, so it needs one
+        # sale more than the page
+        if not limit or len(starts) > limit or stop == high:
+            break
+        window *= 4
+    if not len(positions):
+        return []
+    totals = np.add.reduceat(columns["line_total"][positions], starts)
+    first_items = positions[starts]
+    if limit:
+        totals, first_items = totals[:limit], first_items[:limit]
+    return [
+        {"id": sale_id, "total_price": total, "created_at": created_at}
+        for sale_id, total, created_at in zip(
+            columns["sale_id"][first_items].tolist(),
+            totals.tolist(),
+            columns["created_at"][first_items].astype(object).tolist(),
+        )
+    ]
+
+
+class SalesColumnStore:
+    """
+    In-memory copy of sale_items with their product's category, held as NumPy
+    column arrays sorted by (created_at, sale id, sale item id). Sales are
+    append only, so a refresh only loads the items above the highest loaded id,
+    minus a trailing window of reload_window ids that is read again every time:
+    ids are handed out when a transaction inserts, not when it commits, so a
+    slow transaction can commit items below ids already loaded. Once per
+    verify_interval the count and sum of the loaded ids are compared with the
+    database, and the store is loaded again from scratch when they differ,
+    e.g. after a commit later than the window or a removal. Date ranges
+    become binary searches on created_at and the remaining filters and sums
+    run vectorized. Arrays are replaced, never mutated, so readers work on a
+    consistent snapshot without locking.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = False,
+        refresh_interval: float = 5.0,
+        reload_window: int = 10000,
+        verify_interval: float = 300.0,
+        batch_size: int = 100000,
+    ):
+        self.enabled = enabled and np is not None
+        self.refresh_interval = refresh_interval
+        self.reload_window = reload_window
+        self.verify_interval = verify_interval
+        self.batch_size = batch_size
+        self._columns: Optional[dict] = None
+        self._last_item_id = 0
+        self._refreshed_at = 0.0
+        self._verified_at = 0.0
+        self._lock = threading.Lock()
+        # bumped whenever the arrays are replaced, versions what the store answers
+        self.generation = 0
+        self.refreshes = 0
+        self.refresh_seconds_total = 0.0
+        self.drifts = 0
+        self.last_drift_rows = 0
+
+    def _load_batch(self, db: Session, after_id: int) -> Optional[dict]:
+        rows = (
+            db.query(SaleItems)
+            .join(SaleItems.product)
+            .filter(SaleItems.id > after_id)
+            .with_entities(
+                SaleItems.id,
+                SaleItems.sales_id,
+                SaleItems.product_id,
+                Product.category_id,
+                SaleItems.quantity,
+                SaleItems.line_total,
+                SaleItems.created_at,
+            )
+            .order_by(SaleItems.id)
+            .limit(self.batch_size)
+            .all()
+        )
+        if not rows:
+            return None
+        values = list(zip(*rows))
+        values[6] = [created_at.replace(tzinfo=None) for created_at in values[6]]
+        return {
+            name: np.array(column, dtype=dtype)
+            for (name, dtype), column in zip(COLUMNS, values)
+        }
+
+    def _load(self, db: Session) -> None:
+        """
+        Load the sale items above the trailing reload window and merge them in
+        """
+        columns = self._columns
+        window_start = max(self._last_item_id - self.reload_window, 0)
+        last_item_id = window_start
+        batches = []
+        while True:
+            batch = self._load_batch(db, last_item_id)
+            if batch is None:
+                break
+            batches.append(batch)
+            last_item_id = int(batch["sale_item_id"][-1])
+        reloaded = np.concatenate(
+            [batch["sale_item_id"] for batch in batches] or [np.empty(0, dtype="int64")]
+        )
+        if columns is not None:
+            kept = columns["sale_item_id"] <= window_start
+            # nothing new when the window holds the ids already loaded
+            if np.array_equal(np.sort(columns["sale_item_id"][~kept]), reloaded):
+                return
+            columns = {name: column[kept] for name, column in columns.items()}
+        parts = ([columns] if columns is not None else []) + batches
+        columns = {
+            name: np.concatenate(
+                [part[name] for part in parts] or [np.empty(0, dtype=dtype)]
+            )
+            for name, dtype in COLUMNS
+        }
+        order = np.lexsort(
+            (columns["sale_item_id"], columns["sale_id"], columns["created_at"])
+        )
+        # new sales usually arrive in time order, skip the reshuffle
+        if not np.array_equal(order, np.arange(len(order))):
+            columns = {name: column[order] for name, column in columns.items()}
+        self._columns = columns
+        self._last_item_id = max(last_item_id, self._last_item_id)
+        self.generation += 1
+
+    def _drift(self, db: Session) -> Optional[int]:
+        """
+        Compare the count and sum of the loaded ids with the sale items up to
+        the highest loaded id in the database
+
+        Returns:
+            int: The database rows minus the loaded rows, None when both match
+        """
+        count, id_sum = (
+            db.query(SaleItems)
+            .join(SaleItems.product)
+            .filter(SaleItems.id <= self._last_item_id)
+            .with_entities(
+                functions.count(SaleItems.id),
+                functions.coalesce(functions.sum(SaleItems.id), 0),
+            )
+            .one()
+        )
+        ids = self._columns["sale_item_id"]
+        if count == len(ids) and int(id_sum) == int(ids.sum()):
+            return None
+        return count - len(ids)
+
+    def refresh(self, db: Session, force: bool = False) -> None:
+        """
+        Load the sale items added since the last refresh, and those committed
+        late within the trailing reload window, at most once per refresh
+        interval unless forced. Once per verify interval the store is checked
+        against the database and loaded again when it drifted.
+
+        Parameters:
+            db (Session): The database session
+            force (bool): Refresh even within the refresh interval
+        """
+        if not self.enabled:
+            return
+        if not force and time.monotonic() - self._refreshed_at < self.refresh_interval:
+            return
+        with self._lock:
+            if not force and (
+                time.monotonic() - self._refreshed_at < self.refresh_interval
+            ):
+                return
+            started = time.perf_counter()
+            if self._columns is None:
+                self._verified_at = time.monotonic()
+            self._load(db)
+            if time.monotonic() - self._verified_at >= self.verify_interval:
+                drift = self._drift(db)
+                if drift is not None:
+                    self.drifts += 1
+                    self.last_drift_rows = drift
+                    logging.warning(
+                        f"Sales column store drifted by {drift} rows from the "
+                        "database, loading it again"
+                    )
+                    self._columns, self._last_item_id = None, 0
+                    self._load(db)
+                self._verified_at = time.monotonic()
+            self._refreshed_at = time.monotonic()
+            self.refreshes += 1
+            self.refresh_seconds_total += time.perf_counter() - started
+
+    def sales_data(
+        self,
+        start_date: Optional[datetime],
+        end_date: Optional[datetime],
+        product_id: Optional[int],
+        category_id: Optional[int],
+        limit: Optional[int] = None,
+        after: Optional[tuple[datetime, int, int]] = None,
+    ) -> list[SaleDataRecord]:
+        """
+        Get the sale items matching the filters, the in-memory equivalent of
+        ProductRepository.get_sales_data
+
+        Parameters:
+            start_date (datetime): The start date
+            end_date (datetime): The end date
+            product_id (int): The product id
+            category_id (int): The category id
+            limit (int): The maximum number of rows to return
+            after (tuple): The (created_at, sale id, sale item id) keyset position
+                to resume after
+
+        Returns:
+            list[SaleDataRecord]: The sales data rows
+        """
+        return select_sales_data(
+            self._columns,
+            start_date,
+            end_date,
+            filter_mask(product_id, category_id),
+            limit,
+            after,
+        )
+
+    def revenue(
+        self,
+        start_date: Optional[datetime],
+        end_date: Optional[datetime],
+        category_id: Optional[int],
+        limit: Optional[int] = None,
+        after: Optional[tuple[datetime, int]] = None,
+    ) -> list[dict]:
+        """
+        Get the revenue of every sale matching the filters, the in-memory
+        equivalent of ProductRepository.get_revenue_from_sales
+
+        Parameters:
+            start_date (datetime): The start date
+            end_date (datetime): The end date
+            category_id (int): The category id
+            limit (int): The maximum number of sales to return
+            after (tuple): The (created_at, sale id) keyset position to resume after
+
+        Returns:
+            list[dict]: The id, total price and created_at of each sale
+        """
+        return select_revenue(
+            self._columns,
+            start_date,
+            end_date,
+            filter_mask(None, category_id),
+            limit,
+            after,
+        )
+
+    def stats(self) -> dict:
+        """
+        Get the size and memory footprint of the store
+
+        Returns:
+            dict: The loaded rows, bytes held by the column arrays and refresh
+            counters
+        """
+        columns = self._columns
+        return {
+            "enabled": self.enabled,
+            "loaded": columns is not None,
+            "rows": len(columns["sale_item_id"]) if columns else 0,
+            "memory_bytes": (
+                sum(column.nbytes for column in columns.values()) if columns else 0
+            ),
+            "last_sale_item_id": self._last_item_id,
+            "generation": self.generation,
+            "verify_interval_seconds": self.verify_interval,
+            "drifts": self.drifts,
+            "last_drift_rows": self.last_drift_rows,
+            "refresh_interval_seconds": self.refresh_interval,
+            "refreshes": self.refreshes,
+            "refresh_seconds_total": self.refresh_seconds_total,
+        }
+
+
+sales_column_store = SalesColumnStore(
+    config.SALES_COLUMN_STORE_ENABLED,
+    config.SALES_COLUMN_STORE_REFRESH_INTERVAL,
+    config.SALES_COLUMN_STORE_RELOAD_WINDOW,
+    config.SALES_COLUMN_STORE_VERIFY_INTERVAL,
+)
@@ -0,0 +1,423 @@
+"""
+Moves closed months of sales and sale_items out of MySQL into the sales archive.
+
+Every month before --before, by default all but the last --keep-months
+months, is read in (created_at, sale id, sale item id) order and written to
+SALES_ARCHIVE_DIR/sales-YYYYMM as one .npy file per column. A month is closed
+in sales_versions before it is read, POST /sales rejects sales dated into a
+closed month, and waits for the transactions already writing to it. The files
+are checked against the database before the month's rows are removed, by
+dropping its partitions when it has its own and otherwise with batched
+DELETEs of the archived ids only. A month that still received rows while being
+archived, written around the API, is left in the database, reopened and its
+files are removed. A month already in the archive that still has rows in the
+database, because its removal was interrupted or rows were written into it
+directly, is written again with those rows merged in, then they are removed.
+Months archived before closing existed are closed on every run.
+
+The sales endpoints read archived months from the files through memory maps,
+so every worker needs SALES_ARCHIVE_DIR and the optional numpy package. The
+daily_revenue rollup is kept, revenue summaries and series of whole days are
+still read from it.
+
+Usage:
+    python -m src.commands.archive_sales [--keep-months 12 | --before 2023-01] [--dry-run]
+"""
+
+import argparse
+import logging
+import os
+import sys
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import bindparam, select, text, update
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.engine import Connection
+from sqlalchemy.sql import functions
+
+from src.column_store import np
+from src.commands.partitions import get_partitions, next_month, partition_name
+from src.database import engine
+from src.models.sale_items import SaleItems
+from src.models.sales import Sales
+from src.models.sales_version import SalesVersion
+from src.sales_archive import ITEM_COLUMNS, SALE_COLUMNS, SalesArchive, sales_archive
+
+# rows fetched per round trip while reading a month
+FETCH_SIZE = 100000
+# rows removed per DELETE, keeps each transaction and its locks short
+DELETE_BATCH_SIZE = 10000
+# children first, so no sale ever loses its items while it is still live
+TABLES = ("sale_items", "sales")
+
+
+def _bounds(month: date) -> tuple[datetime, datetime]:
+    return (
+        datetime.combine(month, datetime.min.time()),
+        datetime.combine(next_month(month), datetime.min.time()),
+    )
+
+
+def _fetch_columns(connection: Connection, statement, columns: tuple) -> dict:
+    """
+    Run the statement and collect its rows into column arrays, FETCH_SIZE rows
+    at a time
+    """
+    chunks = {name: [] for name, _ in columns}
+    result = connection.execute(statement.execution_options(yield_per=FETCH_SIZE))
+    for rows in result.partitions():
+        for (name, dtype), values in zip(columns, zip(*rows)):
+            if dtype.startswith("datetime64"):
+                # MySQL DATETIME columns are naive, keep the wall clock value
+                values = [value.replace(tzinfo=None) for value in values]
+            chunks[name].append(np.array(values, dtype=dtype))
+    return {
+        name: np.concatenate(chunks[name] or [np.empty(0, dtype=dtype)])
+        for name, dtype in columns
+    }
+
+
+def read_month(connection: Connection, month: date) -> tuple[dict, dict]:
+    """
+    Read a month of sale items, sorted like the column store, and sales
+
+    Parameters:
+        connection (Connection): The database connection
+        month (date): The first day of the month
+
+    Returns:
+        tuple[dict, dict]: The ITEM_COLUMNS and SALE_COLUMNS arrays
+    """
+    start, end = _bounds(month)
+    items = _fetch_columns(
+        connection,
+        select(
+            SaleItems.id,
+            SaleItems.sales_id,
+            SaleItems.product_id,
+            SaleItems.quantity,
+            SaleItems.line_total,
+            SaleItems.created_at,
+        )
+        .where(SaleItems.created_at >= start, SaleItems.created_at < end)
+        .order_by(SaleItems.created_at, SaleItems.sales_id, SaleItems.id),
+        ITEM_COLUMNS,
+    )
+    sales = _fetch_columns(
+        connection,
+        select(Sales.id, Sales.created_at, Sales.updated_at)
+        .where(Sales.created_at >= start, Sales.created_at < end)
+        .order_by(Sales.created_at, Sales.id),
+        SALE_COLUMNS,
+    )
+    return items, sales
+
+
+def _union(archived: dict, live: dict, key: str, order: tuple) -> dict:
+    """
+    Combine archived and live column arrays, keeping the live copy of rows
+    found in both, sorted by the order columns
+    """
+    kept = ~np.isin(archived[key], live[key])
+    columns = {
+        name: np.concatenate((archived[name][kept], live[name])) for name in live
+    }
+    # lexsort sorts by its last key first
+    positions = np.lexsort(tuple(columns[name] for name in reversed(order)))
+    return {name: column[positions] for name, column in columns.items()}
+
+
+def merge_month(
+    archived: tuple[dict, dict], live: tuple[dict, dict]
+) -> tuple[dict, dict]:
+    """
+    Merge the rows of an archived month still in the database, or added to it
+    since, into its archived arrays
+
+    Parameters:
+        archived (tuple[dict, dict]): The archived ITEM_COLUMNS and SALE_COLUMNS arrays
+        live (tuple[dict, dict]): The month's arrays read from the database
+
+    Returns:
+        tuple[dict, dict]: The merged ITEM_COLUMNS and SALE_COLUMNS arrays
+    """
+    (archived_items, archived_sales), (items, sales) = archived, live
+    return (
+        _union(
+            archived_items,
+            items,
+            "sale_item_id",
+            ("created_at", "sale_id", "sale_item_id"),
+        ),
+        _union(archived_sales, sales, "id", ("created_at", "id")),
+    )
+
+
+def month_counts(connection: Connection, month: date) -> tuple[int, int]:
+    """
+    Get the number of sales and sale items of a month in the database
+
+    Parameters:
+        connection (Connection): The database connection
+        month (date): The first day of the month
+
+    Returns:
+        tuple[int, int]: The sales and the sale items
+    """
+    start, end = _bounds(month)
+    sales = connection.scalar(
+        select(functions.count(Sales.id)).where(
+            Sales.created_at >= start, Sales.created_at < end
+        )
+    )
+    items = connection.scalar(
+        select(functions.count(SaleItems.id)).where(
+            SaleItems.created_at >= start, SaleItems.created_at < end
+        )
+    )
+    return sales, items
+
+
+def all_archived(connection: Connection, month: date, items: dict, sales: dict) -> bool:
+    """
+    Check that every sale and sale item of a month left in the database is
+    in its archived arrays
+
+    Parameters:
+        connection (Connection): The database connection
+        month (date): The first day of the month
+        items (dict): The archived ITEM_COLUMNS arrays
+        sales (dict): The archived SALE_COLUMNS arrays
+
+    Returns:
+        bool: True when removing the month's rows loses nothing
+    """
+    start, end = _bounds(month)
+    item_ids = connection.scalars(
+        select(SaleItems.id).where(
+            SaleItems.created_at >= start, SaleItems.created_at < end
+        )
+    ).all()
+    sale_ids = connection.scalars(
+        select(Sales.id).where(Sales.created_at >= start, Sales.created_at < end)
+    ).all()
+    return bool(
+        np.isin(np.array(item_ids, dtype="int64"), items["sale_item_id"]).all()
+        and np.isin(np.array(sale_ids, dtype="int64"), sales["id"]).all()
+    )
+
+
+def close_months(connection: Connection, months: list[date]) -> None:
+    """
+    Close months to new sales. Waits for the transactions writing sales into
+    them, which hold a share lock on their months' sales_versions rows.
+
+    Parameters:
+        connection (Connection): The database connection
+        months (list[date]): The first days of the months
+    """
+    if not months:
+        return
+    statement = mysql_insert(SalesVersion.__table__).values(
+        [
+            {"month": month, "version": 0, "closed_at": functions.now()}
+            for month in months
+        ]
+    )
+    connection.execute(
+        statement.on_duplicate_key_update(
+            closed_at=functions.coalesce(SalesVersion.closed_at, functions.now())
+        )
+    )
+    connection.commit()
+
+
+def reopen_month(connection: Connection, month: date) -> None:
+    """
+    Accept sales dated into a month again, after archiving it failed
+
+    Parameters:
+        connection (Connection): The database connection
+        month (date): The first day of the month
+    """
+    connection.execute(
+        update(SalesVersion).where(SalesVersion.month == month).values(closed_at=None)
+    )
+    connection.commit()
+
+
+def remove_month(connection: Connection, month: date, items: dict, sales: dict) -> bool:
+    """
+    Remove the archived sales and sale items of a closed month from the
+    database. A partition named after the month only holds that month once
+    every older month is gone, so months must be removed oldest first.
+    Partitions are dropped whole once the month is checked again to be
+    archived completely, otherwise only the archived ids are deleted.
+
+    Parameters:
+        connection (Connection): The database connection
+        month (date): The first day of the month
+        items (dict): The archived ITEM_COLUMNS arrays
+        sales (dict): The archived SALE_COLUMNS arrays
+
+    Returns:
+        bool: False when the month gained rows before a partition was dropped
+    """
+    start, end = _bounds(month)
+    archived_ids = {"sale_items": items["sale_item_id"], "sales": sales["id"]}
+    for table in TABLES:
+        name = partition_name(month)
+        # a RANGE partitioned table can't lose its last partition
+        if name in get_partitions(connection, table)[:-1]:
+            archived = all_archived(connection, month, items, sales)
+            connection.commit()
+            if not archived:
+                return False
+            connection.exec_driver_sql(f"ALTER TABLE {table} DROP PARTITION {name}")
+            continue
+        delete = text(
+            f"DELETE FROM {table} "
+            "WHERE created_at >= :start AND created_at < :end AND id IN :ids"
+        ).bindparams(bindparam("ids", expanding=True))
+        ids = archived_ids[table]
+        for offset in range(0, len(ids), DELETE_BATCH_SIZE):
+            connection.execute(
+                delete,
+                {
+                    "start": start,
+                    "end": end,
+                    "ids": ids[offset : offset + DELETE_BATCH_SIZE].tolist(),
+                },
+            )
+            connection.commit()
+    return True
+
+
+def table_bytes(connection: Connection) -> dict[str, int]:
+    """
+    Get the data and index size of the sales tables, after refreshing their
+    statistics
+    """
+    sizes = {}
+    for table in TABLES:
+        connection.exec_driver_sql(f"ANALYZE TABLE {table}")
+        sizes[table] = connection.scalar(
+            text(
+                "SELECT DATA_LENGTH + INDEX_LENGTH FROM information_schema.TABLES "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table"
+            ),
+            {"table": table},
+        )
+    return sizes
+
+
+def archive_month(
+    connection: Connection, archive: SalesArchive, month: date, dry_run: bool = False
+) -> bool:
+    """
+    Write a month to the archive, check it against the database and remove
+    its rows from the database
+
+    Parameters:
+        connection (Connection): The database connection
+        archive (SalesArchive): The sales archive
+        month (date): The first day of the month
+        dry_run (bool): Only log what would be archived
+
+    Returns:
+        bool: False when the month changed while it was archived and was left
+        in the database
+    """
+    sales_count, items_count = month_counts(connection, month)
+    connection.commit()
+    if not sales_count and not items_count:
+        return True
+    if dry_run:
+        logging.info(
+            f"Would archive {sales_count} sales and {items_count} items of {month:%Y-%m}"
+        )
+        return True
+
+    close_months(connection, [month])
+    archive.refresh()
+    resumed = month in archive.months()
+    items, sales = read_month(connection, month)
+    connection.commit()
+    if resumed:
+        # rows left by an interrupted removal or backdated into the month
+        items, sales = merge_month(archive.load_month(month), (items, sales))
+        logging.info(f"Found {month:%Y-%m} in the archive, merging its live rows")
+    written = archive.write_month(month, items, sales)
+    logging.info(
+        f"Archived {len(sales['id'])} sales and {len(items['sale_item_id'])} "
+        f"items of {month:%Y-%m} in {written / 1e6:.1f}MB"
+    )
+
+    # rows written around the API don't respect the closed month
+    archived = all_archived(connection, month, items, sales)
+    connection.commit()
+    if not archived:
+        if not resumed:
+            archive.remove_month(month)
+            reopen_month(connection, month)
+        logging.error(f"{month:%Y-%m} changed while being archived, left in place")
+        return False
+    if not remove_month(connection, month, items, sales):
+        logging.error(f"{month:%Y-%m} changed while being removed, archive it again")
+        return False
+    logging.info(f"Removed {month:%Y-%m} from the database")
+    return True
+
+
+def _month(value: str) -> date:
+    return datetime.strptime(value, "%Y-%m").date()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    cutoff = parser.add_mutually_exclusive_group()
+    cutoff.add_argument("--keep-months", type=int, default=12)
+    cutoff.add_argument("--before", type=_month, default=None)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    if np is None:
+        logging.error("numpy is needed to write the sales archive")
+        return 1
+    this_month = date.today().replace(day=1)
+    before = args.before
+    if before is None:
+        before = this_month
+        for _ in range(args.keep_months):
+            before = (before - timedelta(days=1)).replace(day=1)
+    if before > this_month:
+        parser.error("only closed months can be archived")
+
+    os.makedirs(sales_archive.directory, exist_ok=True)
+    sales_archive.refresh()
+    with engine.connect() as connection:
+        if not args.dry_run:
+            close_months(connection, sales_archive.months())
+        first_sale = connection.scalar(select(functions.min(Sales.created_at)))
+        connection.commit()
+        if first_sale is None:
+            logging.info("No sales to archive")
+            return 0
+        sizes = table_bytes(connection)
+        month = first_sale.date().replace(day=1)
+        while month < before:
+            if not archive_month(connection, sales_archive, month, args.dry_run):
+                return 1
+            sales_archive.refresh()
+            month = next_month(month)
+        if not args.dry_run:
+            for table, size in table_bytes(connection).items():
+                logging.info(
+                    f"{table}: {sizes[table] / 1e6:.1f}MB before, {size / 1e6:.1f}MB after"
+                )
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    sys.exit(main())
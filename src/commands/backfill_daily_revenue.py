@@ -0,0 +1,72 @@
+"""
+Rebuilds the daily_revenue rollup from raw sales, one month per transaction.
+
+By default every day from the first sale up to yesterday is rebuilt, starting
+at the first archived month when there is one: days of months moved to the
+sales archive are summed from its files. Today is left to the incremental
+updates made as sales are written, rebuilding a day that is still receiving
+sales can double count them.
+
+Usage:
+    python -m src.commands.backfill_daily_revenue [--start-day 2023-01-01] [--end-day 2023-12-31]
+"""
+
+import argparse
+import logging
+from datetime import date, timedelta
+
+from sqlalchemy import func, select
+
+from src.database import SessionLocal
+from src.models.sales import Sales
+from src.repositories.product_repository import ProductRepository
+from src.sales_archive import sales_archive
+
+
+def month_ranges(start_day: date, end_day: date):
+    """
+    Split [start_day, end_day] into calendar month sized (first, last) ranges
+    """
+    while start_day <= end_day:
+        next_month = (start_day.replace(day=1) + timedelta(days=32)).replace(day=1)
+        yield start_day, min(next_month - timedelta(days=1), end_day)
+        start_day = next_month
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--start-day", type=date.fromisoformat, default=None)
+    parser.add_argument(
+        "--end-day",
+        type=date.fromisoformat,
+        default=date.today() - timedelta(days=1),
+    )
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        start_day = args.start_day
+        if start_day is None:
+            sales_archive.refresh()
+            first_days = sales_archive.months()[:1]
+            first_sale = db.scalar(select(func.min(Sales.created_at)))
+            if first_sale is not None:
+                first_days.append(first_sale.date())
+            if not first_days:
+                logging.info("No sales to roll up")
+                return
+            start_day = min(first_days)
+
+        repository = ProductRepository(db)
+        for first_day, last_day in month_ranges(start_day, args.end_day):
+            rows = repository.rebuild_daily_revenue(first_day, last_day)
+            logging.info(
+                f"Rebuilt {rows} daily revenue rows for {first_day} to {last_day}"
+            )
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    main()
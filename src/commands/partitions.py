@@ -0,0 +1,223 @@
+"""
+Maintains the monthly RANGE partitions of sales and sale_items.
+
+Both tables are partitioned on created_at into one partition per month, named
+pYYYYMM, and a pfuture partition catching everything later. Run it daily: it
+keeps --months-ahead empty partitions after the current month, by splitting
+them off pfuture, and splits the oldest partition back to the month of the
+first sale after sales older than it were loaded.
+
+Old months can be dropped with --drop-before, or archived with
+--archive-before, which swaps each partition with an empty table named
+<table>_<partition> (EXCHANGE PARTITION, no rows are copied) before dropping
+it. Both are applied to sale_items and sales together. The daily_revenue
+rollup is kept, so revenue series and summaries of whole days stay available.
+
+Usage:
+    python -m src.commands.partitions [--months-ahead 3] [--drop-before 2023-01 | --archive-before 2023-01] [--dry-run]
+"""
+
+import argparse
+import logging
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from src.database import engine
+
+# children first, so no month ever has items without their sales
+TABLES = ("sale_items", "sales")
+FUTURE_PARTITION = "pfuture"
+
+
+def next_month(month: date) -> date:
+    return (month.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+
+def partition_name(month: date) -> str:
+    return f"p{month:%Y%m}"
+
+
+def partition_month(name: str) -> date:
+    return datetime.strptime(name, "p%Y%m").date()
+
+
+def partition_definitions(months: list[date]) -> str:
+    """
+    Get the definitions of the partitions holding the given months
+    """
+    return ", ".join(
+        f"PARTITION {partition_name(month)} "
+        f"VALUES LESS THAN ('{next_month(month):%Y-%m-%d}')"
+        for month in months
+    )
+
+
+def month_range(first_month: date, last_month: date) -> list[date]:
+    months = []
+    month = first_month.replace(day=1)
+    while month <= last_month:
+        months.append(month)
+        month = next_month(month)
+    return months
+
+
+def get_partitions(connection: Connection, table: str) -> list[str]:
+    """
+    Get the names of a table's partitions in order, empty when it isn't
+    partitioned
+
+    Parameters:
+        connection (Connection): The database connection
+        table (str): The table name
+
+    Returns:
+        list[str]: The partition names
+    """
+    return list(
+        connection.scalars(
+            text(
+                "SELECT PARTITION_NAME FROM information_schema.PARTITIONS "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table "
+                "AND PARTITION_NAME IS NOT NULL "
+                "ORDER BY PARTITION_ORDINAL_POSITION"
+            ),
+            {"table": table},
+        )
+    )
+
+
+def add_partitions(
+    connection: Connection,
+    table: str,
+    first_month: date,
+    last_month: date,
+    dry_run: bool = False,
+) -> list[str]:
+    """
+    Make sure every month in [first_month, last_month] has its own partition,
+    splitting the new months off the first and the pfuture partitions
+
+    Parameters:
+        connection (Connection): The database connection
+        table (str): The table name
+        first_month (date): The oldest month to hold in its own partition
+        last_month (date): The newest month to hold in its own partition
+        dry_run (bool): Only log the statements
+
+    Returns:
+        list[str]: The statements executed
+    """
+    partitions = get_partitions(connection, table)
+    months = [partition_month(name) for name in partitions if name != FUTURE_PARTITION]
+    if not months:
+        raise ValueError(f"{table} is not partitioned by month")
+
+    statements = []
+    older = month_range(first_month, months[0] - timedelta(days=1))
+    if older:
+        # the first partition holds every older row, split them into months
+        statements.append(
+            f"ALTER TABLE {table} REORGANIZE PARTITION {partitions[0]} INTO "
+            f"({partition_definitions(older + [months[0]])})"
+        )
+    newer = month_range(next_month(months[-1]), last_month)
+    if newer:
+        statements.append(
+            f"ALTER TABLE {table} REORGANIZE PARTITION {FUTURE_PARTITION} INTO "
+            f"({partition_definitions(newer)}, "
+            f"PARTITION {FUTURE_PARTITION} VALUES LESS THAN (MAXVALUE))"
+        )
+    return _execute(connection, statements, dry_run)
+
+
+def remove_partitions(
+    connection: Connection,
+    table: str,
+    before_month: date,
+    archive: bool = False,
+    dry_run: bool = False,
+) -> list[str]:
+    """
+    Drop the partitions of the months before before_month, first swapping
+    each into an archive table when asked to. The newest partition is always
+    kept, a RANGE partitioned table can't lose its last one.
+
+    Parameters:
+        connection (Connection): The database connection
+        table (str): The table name
+        before_month (date): The first month to keep
+        archive (bool): Keep the rows in <table>_<partition> tables
+        dry_run (bool): Only log the statements
+
+    Returns:
+        list[str]: The statements executed
+    """
+    old = [
+        name
+        for name in get_partitions(connection, table)[:-1]
+        if name != FUTURE_PARTITION and partition_month(name) < before_month
+    ]
+    statements = []
+    if archive:
+        for name in old:
+            archive_table = f"{table}_{name}"
+            statements += [
+                f"CREATE TABLE {archive_table} LIKE {table}",
+                f"ALTER TABLE {archive_table} REMOVE PARTITIONING",
+                f"ALTER TABLE {table} EXCHANGE PARTITION {name} "
+                f"WITH TABLE {archive_table}",
+            ]
+    if old:
+        statements.append(f"ALTER TABLE {table} DROP PARTITION {', '.join(old)}")
+    return _execute(connection, statements, dry_run)
+
+
+def _execute(connection: Connection, statements: list[str], dry_run: bool) -> list[str]:
+    for statement in statements:
+        logging.info(f"{'Would run' if dry_run else 'Running'} {statement}")
+        if not dry_run:
+            # DDL commits implicitly, every statement stands on its own
+            connection.exec_driver_sql(statement)
+    return statements
+
+
+def _month(value: str) -> date:
+    return datetime.strptime(value, "%Y-%m").date()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--months-ahead", type=int, default=3)
+    removal = parser.add_mutually_exclusive_group()
+    removal.add_argument("--drop-before", type=_month, default=None)
+    removal.add_argument("--archive-before", type=_month, default=None)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    last_month = date.today().replace(day=1)
+    for _ in range(args.months_ahead):
+        last_month = next_month(last_month)
+
+    with engine.connect() as connection:
+        first_sale = connection.scalar(text("SELECT MIN(created_at) FROM sales"))
+        first_month = (first_sale or datetime.now()).date().replace(day=1)
+        for table in TABLES:
+            add_partitions(connection, table, first_month, last_month, args.dry_run)
+
+        before_month = args.drop_before or args.archive_before
+        if before_month:
+            for table in TABLES:
+                remove_partitions(
+                    connection,
+                    table,
+                    before_month,
+                    archive=args.archive_before is not None,
+                    dry_run=args.dry_run,
+                )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    main()
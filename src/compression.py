@@ -0,0 +1,177 @@
+import zlib
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, responses fall back to gzip
+    brotli = None
+
+
+class _GzipEncoder:
+    def __init__(self, level: int):
+        # wbits 31 writes the gzip header and trailer around the deflate stream
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(
+            zlib.Z_SYNC_FLUSH
+        )
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class _BrotliEncoder:
+    def __init__(self, quality: int):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Pick the response encoding from an Accept-Encoding header, preferring
+    brotli when it is installed and accepted, then gzip
+
+    Parameters:
+        accept_encoding (str): The Accept-Encoding header
+
+    Returns:
+        Optional[str]: "br", "gzip" or None to send the body as is
+    """
+    accepted = {}
+    for item in accept_encoding.lower().split(","):
+        coding, _, params = item.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[coding.strip()] = quality
+
+    for coding in ("br", "gzip") if brotli is not None else ("gzip",):
+        if accepted.get(coding, accepted.get("*", 0.0)) > 0:
+            return coding
+    return None
+
+
+class CompressionMiddleware:
+    """
+    Compresses response bodies with brotli or gzip, negotiated from the
+    request's Accept-Encoding header. Bodies below minimum_size are sent as is.
+    Streamed bodies are compressed chunk by chunk and flushed after every
+    chunk, so clients receive rows as they are produced instead of when the
+    stream ends.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http":
+            encoding = negotiate_encoding(
+                Headers(scope=scope).get("Accept-Encoding", "")
+            )
+            if encoding is not None:
+                responder = _CompressionResponder(
+                    self.app, encoding, self.minimum_size, self._encoder(encoding)
+                )
+                await responder(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
+    def _encoder(self, encoding: str):
+        if encoding == "br":
+            return _BrotliEncoder(self.brotli_quality)
+        return _GzipEncoder(self.gzip_level)
+
+
+class _CompressionResponder:
+    def __init__(self, app: ASGIApp, encoding: str, minimum_size: int, encoder):
+        self.app = app
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.encoder = encoder
+        self.send: Optional[Send] = None
+        self.initial_message: Message = {}
+        self.passthrough = False
+        self.compressing = False
+        self.buffered: list[bytes] = []
+        self.buffered_size = 0
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self.send = send
+        await self.app(scope, receive, self.send_compressed)
+
+    async def send_compressed(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            # hold the headers back until the body shows whether to compress
+            self.initial_message = message
+            encoded = "content-encoding" in Headers(raw=message["headers"])
+            self.passthrough = encoded or message["status"] in (204, 304)
+            if self.passthrough:
+                await self.send(message)
+            return
+
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.compressing:
+            chunk = self.encoder.compress(body)
+            if not more_body:
+                chunk += self.encoder.finish()
+            await self.send(
+                {"type": "http.response.body", "body": chunk, "more_body": more_body}
+            )
+            return
+
+        # buffer the first chunks of a stream until they reach the minimum size
+        self.buffered.append(body)
+        self.buffered_size += len(body)
+        if more_body and self.buffered_size < self.minimum_size:
+            return
+
+        body = b"".join(self.buffered)
+        self.buffered = []
+        if self.buffered_size < self.minimum_size:
+            await self.send(self.initial_message)
+            await self.send({"type": "http.response.body", "body": body})
+            return
+
+        self.compressing = True
+        chunk = self.encoder.compress(body)
+        headers = MutableHeaders(raw=self.initial_message["headers"])
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        if more_body:
+            del headers["Content-Length"]
+        else:
+            chunk += self.encoder.finish()
+            headers["Content-Length"] = str(len(chunk))
+        await self.send(self.initial_message)
+        await self.send(
+            {"type": "http.response.body", "body": chunk, "more_body": more_body}
+        )
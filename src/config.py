@@ -0,0 +1,68 @@
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def _get_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+DATABASE_URL = os.getenv(
+    "DATABASE_URL", "mysql://root:    @localhost:3306/ecommerce_db"
+)
+# Read replica for the catalog and sales analytics reads, unset sends every
+# query to DATABASE_URL
+REPLICA_DATABASE_URL = os.getenv("REPLICA_DATABASE_URL") or None
+
+# Connection pool, per worker process
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# Recycle connections well before MySQL's wait_timeout closes them server side
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = _get_bool("DB_POOL_PRE_PING", True)
+
+# Worker threads that run the synchronous route handlers and repository calls,
+# keep it at or below the database pool capacity so threads don't queue on it
+THREAD_POOL_SIZE = int(
+    os.getenv("THREAD_POOL_SIZE", str(DB_POOL_SIZE + DB_MAX_OVERFLOW))
+)
+
+# In-process read-through cache of product and category lookups
+CATALOG_CACHE_ENABLED = _get_bool("CATALOG_CACHE_ENABLED", True)
+CATALOG_CACHE_MAX_SIZE = int(os.getenv("CATALOG_CACHE_MAX_SIZE", "10000"))
+CATALOG_CACHE_TTL = float(os.getenv("CATALOG_CACHE_TTL", "300"))
+
+# Response compression, brotli is used when the optional brotli package is
+# installed and the client accepts it, gzip otherwise
+COMPRESSION_MINIMUM_SIZE = int(os.getenv("COMPRESSION_MINIMUM_SIZE", "1024"))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+
+# In-memory NumPy copy of the sales answering /sales/data and
+# /sales/get-revenue, needs the optional numpy package. Refreshed from the
+# database at most once per interval, so results lag by up to that many seconds
+SALES_COLUMN_STORE_ENABLED = _get_bool("SALES_COLUMN_STORE_ENABLED", False)
+SALES_COLUMN_STORE_REFRESH_INTERVAL = float(
+    os.getenv("SALES_COLUMN_STORE_REFRESH_INTERVAL", "5")
+)
+# Sale item ids below the highest loaded one that every refresh reads again,
+# catching items of transactions that committed after later ids were loaded
+SALES_COLUMN_STORE_RELOAD_WINDOW = int(
+    os.getenv("SALES_COLUMN_STORE_RELOAD_WINDOW", "10000")
+)
+# Seconds between checks of the column store against the database, a store
+# that drifted, e.g. missing a commit later than the reload window, is reloaded
+SALES_COLUMN_STORE_VERIFY_INTERVAL = float(
+    os.getenv("SALES_COLUMN_STORE_VERIFY_INTERVAL", "300")
+)
+
+# Directory of the closed months moved out of the sales tables by
+# src.commands.archive_sales, read through memory maps with the optional numpy
+# package and combined with the live rows of /sales/data and /sales/get-revenue
+SALES_ARCHIVE_DIR = os.getenv("SALES_ARCHIVE_DIR", "archive")
@@ -1,17 +1,103 @@
-from sqlalchemy import create_engine
+import inspect
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from sqlalchemy import Select, create_engine, exc
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
-from typing import Generator
+from sqlalchemy.pool import QueuePool
+from typing import Callable, Generator
 import logging
 
+from src import config
+
+
+SQLALCHEMY_DATABASE_URL = config.DATABASE_URL
+REPLICA_DATABASE_URL = config.REPLICA_DATABASE_URL
+
+# Session.info keys that steer RoutingSession
+USE_REPLICA = "use_replica"
+READ_YOUR_WRITES = "read_your_writes"
+HAS_WRITTEN = "has_written"
+
+
+class InstrumentedQueuePool(QueuePool):
+    """
+    QueuePool that records how long checkouts wait for a connection
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            with self._stats_lock:
+                self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            with self._stats_lock:
+                self.checkouts += 1
+                self.wait_seconds_total += waited
+                self.wait_seconds_max = max(self.wait_seconds_max, waited)
 
-SQLALCHEMY_DATABASE_URL = "mysql://root:    @localhost:3306/ecommerce_db"
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def _create_engine(url: str):
+    return create_engine(
+        url,
+        poolclass=InstrumentedQueuePool,
+        pool_size=config.DB_POOL_SIZE,
+        max_overflow=config.DB_MAX_OVERFLOW,
+        pool_timeout=config.DB_POOL_TIMEOUT,
+        pool_recycle=config.DB_POOL_RECYCLE,
+        pool_pre_ping=config.DB_POOL_PRE_PING,
+    )
+
+
+engine = _create_engine(SQLALCHEMY_DATABASE_URL)
+# Without a replica configured every query goes to the primary
+replica_engine = (
+    _create_engine(REPLICA_DATABASE_URL) if REPLICA_DATABASE_URL else engine
+)
+
+
+class RoutingSession(Session):
+    """
+    Session that sends SELECTs to the read replica while a use_replica() block
+    is active, and everything else to the primary. Once the session writes,
+    or when read-your-writes is requested, all its queries go to the primary
+    so replication lag can't hide the session's own changes.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self._flushing or (clause is not None and not isinstance(clause, Select)):
+            self.info[HAS_WRITTEN] = True
+            return engine
+        if (
+            self.info.get(USE_REPLICA)
+            and clause is not None
+            and not self.info.get(READ_YOUR_WRITES)
+            and not self.info.get(HAS_WRITTEN)
+        ):
+            return replica_engine
+        return engine
+
+
+SessionLocal = sessionmaker(
+    autocommit=False, autoflush=False, bind=engine, class_=RoutingSession
+)
 
 Base = declarative_base()
-Base.metadata.create_all(bind=engine)
 
 
 def get_db() -> Generator[Session, None, None]:
@@ -26,3 +112,65 @@ def get_db() -> Generator[Session, None, None]:
         raise exception
     finally:
         db.close()
+
+
+@contextmanager
+def use_replica(db: Session) -> Generator[None, None, None]:
+    """
+    Send the SELECTs issued by the session inside the block to the replica
+    """
+    previous = db.info.get(USE_REPLICA, False)
+    db.info[USE_REPLICA] = True
+    try:
+        yield
+    finally:
+        db.info[USE_REPLICA] = previous
+
+
+def reads_from_replica(method: Callable) -> Callable:
+    """
+    Run a repository read method, or iterate a generator method, inside
+    use_replica() on the repository's session
+    """
+    if inspect.isgeneratorfunction(method):
+
+        @wraps(method)
+        def generator(self, *args, **kwargs):
+            with use_replica(self.db):
+                yield from method(self, *args, **kwargs)
+
+        return generator
+
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with use_replica(self.db):
+            return method(self, *args, **kwargs)
+
+    return wrapper
+
+
+def get_pool_status(replica: bool = False) -> dict:
+    """
+    Get connection pool usage of this worker process
+
+    Parameters:
+        replica (bool): Report the replica pool instead of the primary pool
+
+    Returns:
+        dict: The pool size, connection counts and checkout wait times
+    """
+    pool = (replica_engine if replica else engine).pool
+    checkouts = getattr(pool, "checkouts", 0)
+    wait_seconds_total = getattr(pool, "wait_seconds_total", 0.0)
+    return {
+        "size": pool.size(),
+        "max_overflow": config.DB_MAX_OVERFLOW,
+        "checked_out": pool.checkedout(),
+        "idle": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "checkouts": checkouts,
+        "timeouts": getattr(pool, "timeouts", 0),
+        "wait_seconds_total": wait_seconds_total,
+        "wait_seconds_avg": wait_seconds_total / checkouts if checkouts else 0.0,
+        "wait_seconds_max": getattr(pool, "wait_seconds_max", 0.0),
+    }
@@ -1,18 +1,25 @@
-from fastapi import Depends
+from fastapi import Depends, Header
 from sqlalchemy.orm import Session
 
-from src.database import get_db
+from src.database import READ_YOUR_WRITES, get_db
 from src.repositories.product_repository import ProductRepository
 
 
-def get_product_repository(db: Session = Depends(get_db)) -> ProductRepository:
+def get_product_repository(
+    db: Session = Depends(get_db),
+    read_your_writes: bool = Header(False, alias="X-Read-Your-Writes"),
+) -> ProductRepository:
     """
-    Get user repository instance from database session for managing user data
+    Get user repository instance from database session for managing user data.
+    Clients that must see their own recent writes send X-Read-Your-Writes: true
+    to keep the request's reads off the replica.
 
     Parameters:
         db (Session): The database session
+        read_your_writes (bool): Read from the primary instead of the replica
 
     Returns:
         UserRepository: The user repository instance
     """
+    db.info[READ_YOUR_WRITES] = read_your_writes
     return ProductRepository(db)
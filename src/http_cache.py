@@ -0,0 +1,102 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Hashable, Optional
+
+from fastapi import Request, Response
+
+# Clients may store the response but must revalidate it on every use, polling
+# clients get a bodiless 304 while the data is unchanged
+REVALIDATE_CACHE_CONTROL = "no-cache"
+# Responses over closed historical ranges rarely change, but sales can still be
+# backdated into them: clients reuse them briefly, then revalidate
+CLOSED_RANGE_CACHE_CONTROL = "public, max-age=60, must-revalidate"
+
+
+def make_etag(*parts: Hashable) -> str:
+    """
+    Build a weak ETag from the parts that version a response, such as the
+    ids and updated_at values of the rows it is built from
+    """
+    digest = hashlib.sha1(repr(parts).encode()).hexdigest()
+    return f'W/"{digest}"'
+
+
+def _http_date(value: datetime) -> str:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def _is_not_modified(
+    request: Request, etag: str, last_modified: Optional[datetime]
+) -> bool:
+    """
+    Evaluate If-None-Match, or If-Modified-Since when no If-None-Match is
+    sent, with the weak comparison RFC 9110 prescribes for GET
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return etag.removeprefix("W/") in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is None or last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    if last_modified.tzinfo is None:
+        last_modified = last_modified.replace(tzinfo=timezone.utc)
+    return last_modified.replace(microsecond=0) <= since
+
+
+def conditional_response(
+    request: Request,
+    response: Response,
+    etag: str,
+    last_modified: Optional[datetime] = None,
+    cache_control: str = REVALIDATE_CACHE_CONTROL,
+) -> Optional[Response]:
+    """
+    Answer a conditional GET. Returns a 304 response when the client's copy is
+    current, so the route can return it without building or serializing the
+    body, otherwise sets the validators on the route's response and returns
+    None.
+
+    Parameters:
+        request (Request): The request
+        response (Response): The response the route's return value is rendered into
+        etag (str): The ETag of the current representation
+        last_modified (datetime): When the representation last changed
+        cache_control (str): The Cache-Control header
+
+    Returns:
+        Optional[Response]: The 304 response, or None when the body must be sent
+    """
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if last_modified is not None:
+        headers["Last-Modified"] = _http_date(last_modified)
+
+    if _is_not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+
+def is_closed_range(end_date: Optional[datetime]) -> bool:
+    """
+    Whether a date range ended before the current day, so only backdated
+    sales can still fall into it
+    """
+    if end_date is None:
+        return False
+    today = datetime.now(end_date.tzinfo).replace(
+        hour=0, minute=0, second=0, microsecond=0
+    )
+    return end_date <= today
@@ -0,0 +1,253 @@
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class RequestStats:
+    """
+    Database usage of the current request. Sync route handlers run on worker
+    threads that inherit the request's context, so their queries are counted
+    here too.
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar(
+    "request_stats", default=None
+)
+
+
+def current_request_stats() -> Optional[RequestStats]:
+    return _request_stats.get()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._query_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += time.perf_counter() - context._query_started
+
+
+def instrument_engine(engine: Engine) -> None:
+    """
+    Count the queries and time spent in the database per request
+    """
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class Histogram:
+    """
+    Thread safe Prometheus histogram keyed by a tuple of label values
+    """
+
+    def __init__(self, name: str, documentation: str, labels: tuple, buckets: tuple):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = buckets
+        self._series: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label_values: tuple, value: float) -> None:
+        with self._lock:
+            series = self._series.setdefault(
+                label_values, [[0] * (len(self.buckets) + 1), 0.0]
+            )
+            series[0][bisect_left(self.buckets, value)] += 1
+            series[1] += value
+
+    def render(self) -> list[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} histogram",
+        ]
+        with self._lock:
+            series = [
+                (labels, list(counts), total)
+                for labels, (counts, total) in sorted(self._series.items())
+            ]
+        for label_values, counts, total in series:
+            labels = ",".join(
+                f'{name}="{value}"' for name, value in zip(self.labels, label_values)
+            )
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                lines.append(
+                    f'{self.name}_bucket{{{labels},le="{bound}"}} {cumulative}'
+                )
+            lines.append(f"{self.name}_sum{{{labels}}} {total}")
+            lines.append(f"{self.name}_count{{{labels}}} {cumulative}")
+        return lines
+
+
+request_duration = Histogram(
+    "http_request_duration_seconds",
+    "Time from receiving a request to sending the last body chunk.",
+    ("method", "route", "status"),
+    LATENCY_BUCKETS,
+)
+request_queries = Histogram(
+    "http_request_db_queries",
+    "Database queries executed per request.",
+    ("method", "route"),
+    QUERY_COUNT_BUCKETS,
+)
+request_db_duration = Histogram(
+    "http_request_db_duration_seconds",
+    "Time spent executing database queries per request.",
+    ("method", "route"),
+    LATENCY_BUCKETS,
+)
+
+
+def _route_name(scope: Scope) -> str:
+    # the route template rather than the raw path keeps label cardinality bounded
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class TimingMiddleware:
+    """
+    Records latency, query count and database time per route, and reports the
+    request's database usage in a Server-Timing header. The header is sent with
+    the response start, so for streamed responses it covers the queries that
+    ran before the first chunk.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                elapsed = time.perf_counter() - started
+                headers = MutableHeaders(scope=message)
+                headers.append(
+                    "Server-Timing",
+                    f"db;dur={stats.db_seconds * 1000:.2f};"
+                    f'desc="{stats.queries} queries", app;dur={elapsed * 1000:.2f}',
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_stats.reset(token)
+            route = _route_name(scope)
+            method = scope["method"]
+            request_duration.observe(
+                (method, route, str(status)), time.perf_counter() - started
+            )
+            request_queries.observe((method, route), stats.queries)
+            request_db_duration.observe((method, route), stats.db_seconds)
+
+
+def _metric(name: str, documentation: str, metric_type: str, samples: dict) -> list:
+    lines = [f"# HELP {name} {documentation}", f"# TYPE {name} {metric_type}"]
+    lines.extend(f"{name}{labels} {value}" for labels, value in samples.items())
+    return lines
+
+
+POOL_METRICS = (
+    ("db_pool_size", "size", "gauge", "Connections kept open by the pool."),
+    ("db_pool_checked_out", "checked_out", "gauge", "Connections in use."),
+    ("db_pool_idle", "idle", "gauge", "Connections idle in the pool."),
+    ("db_pool_overflow", "overflow", "gauge", "Connections open beyond the pool size."),
+    ("db_pool_checkouts_total", "checkouts", "counter", "Connection checkouts."),
+    ("db_pool_timeouts_total", "timeouts", "counter", "Checkouts that timed out."),
+    (
+        "db_pool_wait_seconds_total",
+        "wait_seconds_total",
+        "counter",
+        "Time spent waiting for a connection.",
+    ),
+)
+CACHE_METRICS = (
+    ("cache_size", "size", "gauge", "Entries held by the cache."),
+    ("cache_hits_total", "hits", "counter", "Cache hits."),
+    ("cache_misses_total", "misses", "counter", "Cache misses."),
+    ("cache_evictions_total", "evictions", "counter", "Entries evicted when full."),
+    ("cache_expirations_total", "expirations", "counter", "Entries expired by TTL."),
+)
+COLUMN_STORE_METRICS = (
+    ("sales_column_store_rows", "rows", "gauge", "Sale items held in memory."),
+    (
+        "sales_column_store_memory_bytes",
+        "memory_bytes",
+        "gauge",
+        "Bytes held by the column arrays.",
+    ),
+    ("sales_column_store_refreshes_total", "refreshes", "counter", "Refreshes."),
+    (
+        "sales_column_store_refresh_seconds_total",
+        "refresh_seconds_total",
+        "counter",
+        "Time spent refreshing from the database.",
+    ),
+)
+
+
+def prometheus_metrics(
+    pool_status: dict,
+    cache_stats: dict[str, dict],
+    column_store_stats: Optional[dict] = None,
+) -> str:
+    """
+    Render the request histograms, pool status, cache counters and column
+    store footprint of this worker process in the Prometheus text exposition
+    format
+
+    Parameters:
+        pool_status (dict): The connection pool status
+        cache_stats (dict[str, dict]): The stats of every cache by name
+        column_store_stats (dict): The sales column store stats, when enabled
+
+    Returns:
+        str: The metrics
+    """
+    lines = []
+    for histogram in (request_duration, request_queries, request_db_duration):
+        lines.extend(histogram.render())
+    for name, key, metric_type, documentation in POOL_METRICS:
+        lines.extend(_metric(name, documentation, metric_type, {"": pool_status[key]}))
+    for name, key, metric_type, documentation in CACHE_METRICS:
+        samples = {
+            f'{{cache="{cache}"}}': stats[key] for cache, stats in cache_stats.items()
+        }
+        lines.extend(_metric(name, documentation, metric_type, samples))
+    if column_store_stats and column_store_stats["enabled"]:
+        for name, key, metric_type, documentation in COLUMN_STORE_METRICS:
+            lines.extend(
+                _metric(name, documentation, metric_type, {"": column_store_stats[key]})
+            )
+    return "\n".join(lines) + "\n"
@@ -2,15 +2,29 @@ import logging
 import os
 from logging import config as logging_config
 
+from anyio import to_thread
 from fastapi import Depends, FastAPI, HTTPException
 from fastapi.logger import logger
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.orm import Session
 from starlette.middleware.cors import CORSMiddleware
 
+from src.column_store import sales_column_store
+from src.compression import CompressionMiddleware
+from src.config import (
+    COMPRESSION_BROTLI_QUALITY,
+    COMPRESSION_GZIP_LEVEL,
+    COMPRESSION_MINIMUM_SIZE,
+    THREAD_POOL_SIZE,
+)
+from src.database import SessionLocal, engine, replica_engine, use_replica
+from src.instrumentation import TimingMiddleware, instrument_engine
+from src.routers.metrics import router as metrics_router
 from src.routers.sales import router as sales_router
 from src.routers.products import router as products_router
 
-app = FastAPI()
+# response models serialize with pydantic-core, orjson renders the result
+app = FastAPI(default_response_class=ORJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -24,13 +38,39 @@ app.add_middleware(
         "Content-Type",
         "Origin",
         "User-Agent",
+        "X-Read-Your-Writes",
     ),
 )
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=COMPRESSION_MINIMUM_SIZE,
+    gzip_level=COMPRESSION_GZIP_LEVEL,
+    brotli_quality=COMPRESSION_BROTLI_QUALITY,
+)
+# outermost, so the timings include compression
+app.add_middleware(TimingMiddleware)
+instrument_engine(engine)
+if replica_engine is not engine:
+    instrument_engine(replica_engine)
 
 
 @app.on_event("startup")
 async def startup() -> None:
-    pass
+    # route handlers are sync, FastAPI runs them on this bounded thread pool so
+    # blocking database calls never stall the event loop
+    to_thread.current_default_thread_limiter().total_tokens = THREAD_POOL_SIZE
+    if sales_column_store.enabled:
+        # load the sales before serving, later refreshes are incremental
+        await to_thread.run_sync(_load_column_store)
+
+
+def _load_column_store() -> None:
+    db = SessionLocal()
+    try:
+        with use_replica(db):
+            sales_column_store.refresh(db, force=True)
+    finally:
+        db.close()
 
 
 @app.on_event("shutdown")
@@ -46,6 +86,7 @@ async def healthcheck() -> dict[str, str]:
 # users routes
 app.include_router(sales_router, prefix="/sales", tags=["Sales"])
 app.include_router(products_router, prefix="/products", tags=["Products"])
+app.include_router(metrics_router, prefix="/metrics", tags=["Metrics"])
 
 # our own custom logging config
 logging_config.fileConfig(
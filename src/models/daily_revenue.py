@@ -0,0 +1,29 @@
+from datetime import date, datetime
+
+from sqlalchemy import Date, DateTime, Float, ForeignKey, Index, Integer
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.sql import functions
+
+from src.database import Base
+
+
+class DailyRevenue(Base):
+    """
+    Revenue and units sold per day and product, kept up to date as sales are
+    written. category_id is the product's category when the sales were rolled
+    up, re-run the backfill command after moving products between categories.
+    """
+
+    __tablename__ = "daily_revenue"
+    __table_args__ = (Index("ix_daily_revenue_category_id_day", "category_id", "day"),)
+
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    product_id: Mapped[int] = mapped_column(ForeignKey("product.id"), primary_key=True)
+    category_id: Mapped[int] = mapped_column(ForeignKey("category.id"), nullable=False)
+    revenue: Mapped[float] = mapped_column(Float, nullable=False, default=0)
+    units: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=functions.now(),
+        onupdate=functions.now(),
+    )
@@ -1,6 +1,14 @@
 from datetime import datetime
 
-from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Integer, String
+from sqlalchemy import (
+    Boolean,
+    Column,
+    Computed,
+    DateTime,
+    ForeignKey,
+    Integer,
+    String,
+)
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.sql import functions
 
@@ -22,6 +30,13 @@ class Inventory(Base):
     low_stock_alert_threshold: Mapped[Integer] = mapped_column(
         Integer, nullable=False, default=1
     )
+    # maintained by MySQL on every stock or threshold change, so low stock
+    # lookups are an index seek instead of a two column comparison per row
+    is_low_stock: Mapped[bool] = mapped_column(
+        Boolean,
+        Computed("current_stock <= low_stock_alert_threshold", persisted=True),
+        index=True,
+    )
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), server_default=functions.now()
     )
@@ -1,6 +1,15 @@
 from datetime import datetime
 
-from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Integer, String, Float
+from sqlalchemy import (
+    Boolean,
+    Column,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Float,
+)
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.sql import functions
 
@@ -10,6 +19,7 @@ from src.models.sale_items import SaleItems
 
 class Product(Base):
     __tablename__ = "product"
+    __table_args__ = (Index("ix_product_category_id_price", "category_id", "price"),)
 
     id: Mapped[int] = mapped_column(
         Integer, primary_key=True, autoincrement=True, nullable=False
@@ -31,6 +41,7 @@ class Product(Base):
         "SaleItems",
         uselist=True,
         back_populates="product",
+        primaryjoin="Product.id == foreign(SaleItems.product_id)",
     )
     price: Mapped[float] = mapped_column(Float, nullable=False)
     created_at: Mapped[datetime] = mapped_column(
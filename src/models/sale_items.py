@@ -1,32 +1,80 @@
 from datetime import datetime
 
-from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Integer, String, Float
+from sqlalchemy import (
+    Boolean,
+    Column,
+    Computed,
+    DateTime,
+    Double,
+    Index,
+    Integer,
+    String,
+    Float,
+)
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.sql import functions
 
 from src.database import Base
-from src.models.sales import Sales
+from src.models.sales import SALE_ITEMS_JOIN, Sales
+
 
 class SaleItems(Base):
+    """
+    A product sold in a sale. unit_price is the product's price when the sale
+    was recorded and line_total is generated from it, so revenue is summed from
+    sale_items alone and later price changes don't rewrite past revenue. Both
+    indexes end in quantity and line_total to cover the revenue aggregations.
+
+    The table is range partitioned by month on created_at, a copy of the sale's
+    created_at, like sales. MySQL doesn't allow foreign keys on partitioned
+    tables and needs the partitioning column in the primary key, so product_id
+    and sales_id are plain columns and the relationships spell out their joins.
+    """
+
     __tablename__ = "sale_items"
+    __table_args__ = (
+        Index(
+            "ix_sale_items_sales_id_product_id_quantity_line_total",
+            "sales_id",
+            "product_id",
+            "quantity",
+            "line_total",
+        ),
+        Index(
+            "ix_sale_items_product_id_sales_id_quantity_line_total",
+            "product_id",
+            "sales_id",
+            "quantity",
+            "line_total",
+        ),
+    )
 
     id: Mapped[int] = mapped_column(
         Integer, primary_key=True, autoincrement=True, nullable=False
     )
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), primary_key=True, nullable=False
+    )
 
-    product_id: Mapped[int] = mapped_column(ForeignKey("product.id"), nullable=False)
+    product_id: Mapped[int] = mapped_column(Integer, nullable=False)
     product: Mapped["Product"] = relationship(
         "Product",
         uselist=True,
         back_populates="sale_items",
+        primaryjoin="Product.id == foreign(SaleItems.product_id)",
     )
     quantity: Mapped[Integer] = mapped_column(Integer, nullable=False, default=1)
+    unit_price: Mapped[float] = mapped_column(Float, nullable=False)
+    line_total: Mapped[float] = mapped_column(
+        Double, Computed("quantity * unit_price", persisted=True)
+    )
 
-    sales_id: Mapped[int] = mapped_column(ForeignKey("sales.id"), nullable=False)
+    sales_id: Mapped[int] = mapped_column(Integer, nullable=False)
     sales: Mapped["Sales"] = relationship(
         "Sales",
         back_populates="sale_items",
+        primaryjoin=SALE_ITEMS_JOIN,
     )
 
     def get_total_price(self):
-        return self.product_id.price * self.quantity
+        return self.line_total
@@ -1,14 +1,36 @@
 from datetime import datetime
 
-from sqlalchemy import Boolean, Column, DateTime, Float, ForeignKey, Integer, String
+from sqlalchemy import (
+    Boolean,
+    Column,
+    DateTime,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+)
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.sql import functions
 
 from src.database import Base
 
+# Joining on created_at as well lets MySQL prune the sale_items partitions
+SALE_ITEMS_JOIN = (
+    "and_(Sales.id == foreign(SaleItems.sales_id), "
+    "Sales.created_at == foreign(SaleItems.created_at))"
+)
+
 
 class Sales(Base):
+    """
+    A sale. The table is range partitioned by month on created_at, which is
+    therefore part of the primary key; partitions are managed with
+    src.commands.partitions.
+    """
+
     __tablename__ = "sales"
+    __table_args__ = (Index("ix_sales_created_at_id", "created_at", "id"),)
 
     id: Mapped[int] = mapped_column(
         Integer, primary_key=True, autoincrement=True, nullable=False
@@ -18,10 +40,11 @@ class Sales(Base):
         "SaleItems",
         uselist=True,
         back_populates="sales",
+        primaryjoin=SALE_ITEMS_JOIN,
     )
 
     created_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True), server_default=functions.now()
+        DateTime(timezone=True), primary_key=True, server_default=functions.now()
     )
     updated_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
@@ -0,0 +1,31 @@
+from datetime import date, datetime
+
+from sqlalchemy import BigInteger, Date, DateTime
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.sql import functions
+
+from src.database import Base
+
+
+class SalesVersion(Base):
+    """
+    A counter per month of sales, bumped in the same transaction as every
+    write to the month's sales or to its daily_revenue rollup. The sum of the
+    counters of a date range versions the analytics responses computed over
+    it without reading the sales tables. closed_at is set by the sales
+    archival job before it reads a month, sales can't be recorded into a
+    closed month anymore.
+    """
+
+    __tablename__ = "sales_versions"
+
+    month: Mapped[date] = mapped_column(Date, primary_key=True)
+    version: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    closed_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=functions.now(),
+        onupdate=functions.now(),
+    )
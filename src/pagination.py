@@ -0,0 +1,48 @@
+import base64
+import json
+from datetime import datetime
+from typing import Optional
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 10000
+
+
+def encode_cursor(created_at: datetime, *ids: int) -> str:
+    """
+    Encode a keyset position into an opaque cursor string
+
+    Parameters:
+        created_at (datetime): The created_at of the last row of the page
+        ids (int): The ids that break ties between rows with the same created_at
+
+    Returns:
+        str: The cursor
+    """
+    payload = json.dumps([created_at.isoformat(), *ids], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str], id_count: int) -> Optional[tuple]:
+    """
+    Decode a cursor produced by encode_cursor back into a keyset position
+
+    Parameters:
+        cursor (str): The cursor
+        id_count (int): The number of ids the cursor is expected to carry
+
+    Returns:
+        Optional[tuple]: The (created_at, *ids) position, or None without a cursor
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, *ids = json.loads(base64.urlsafe_b64decode(padded))
+        if len(ids) != id_count or not all(isinstance(value, int) for value in ids):
+            raise ValueError
+        return (datetime.fromisoformat(created_at), *ids)
+    except (TypeError, ValueError) as exception:
+        raise ValueError("Invalid cursor") from exception
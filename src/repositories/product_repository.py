@@ -1,22 +1,241 @@
+import heapq
 import logging
-from datetime import datetime
-from typing import Optional
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from typing import Callable, Iterator, Optional
 
-from sqlalchemy.orm import Session
+from sqlalchemy import (
+    Table,
+    and_,
+    case,
+    delete,
+    func,
+    insert,
+    literal,
+    or_,
+    select,
+    text,
+    update,
+)
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.engine import Row
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Query, Session
+from sqlalchemy.sql import functions
 
+from src.cache import category_cache, product_cache
+from src.column_store import SalesColumnStore, np, sales_column_store
+from src.database import READ_YOUR_WRITES, reads_from_replica
 from src.models.category import Category
+from src.models.daily_revenue import DailyRevenue
 from src.models.inventory import Inventory
 from src.models.product import Product
 from src.models.sale_items import SaleItems
 from src.models.sales import Sales
+from src.models.sales_version import SalesVersion
+from src.sales_archive import SalesArchive, sales_archive
 from src.schemas import (
     CategoryRequest,
     InventoryRequest,
     ProductRequest,
     InventoryEdit,
     RevenueFilter,
+    SaleRequest,
 )
 
+# (day, product) rows per INSERT when archived months are added to the rollup
+ROLLUP_BATCH_SIZE = 10000
+
+
+class InsufficientStockError(Exception):
+    """
+    Raised when a sale asks for more units than a product has in stock
+    """
+
+    def __init__(self, product_ids: list[int]):
+        super().__init__(f"Insufficient stock for products {product_ids}")
+        self.product_ids = product_ids
+
+
+def _whole_days(
+    start_date: Optional[datetime], end_date: Optional[datetime]
+) -> tuple[Optional[date], Optional[date]]:
+    """
+    Get the first and last calendar day that lie completely inside the
+    inclusive [start_date, end_date] range, None for an open end.
+    """
+    first_day = None
+    if start_date:
+        first_day = start_date.date()
+        if start_date.time() != time.min:
+            first_day += timedelta(days=1)
+    last_day = end_date.date() - timedelta(days=1) if end_date else None
+    return first_day, last_day
+
+
+class ClosedMonthError(Exception):
+    """
+    Raised when a sale is dated into a month closed by the sales archival job
+    """
+
+    def __init__(self, months: list[date]):
+        super().__init__(f"Sales months {months} are closed")
+        self.months = months
+
+
+def _take_stock(quantities: dict[int, int], inventories: list[Row]) -> dict[int, int]:
+    """
+    Spread the requested quantities over the inventory rows of each product,
+    a product can have several, draining them in the given order. Returns the
+    new stock of every inventory row that changes.
+
+    Raises:
+        InsufficientStockError: If the summed stock of a product's rows can't
+            cover its quantity, including products without an inventory
+    """
+    stock = defaultdict(int)
+    for inventory in inventories:
+        stock[inventory.product_id] += inventory.current_stock
+    understocked = [
+        product_id
+        for product_id, quantity in quantities.items()
+        if stock[product_id] < quantity
+    ]
+    if understocked:
+        raise InsufficientStockError(understocked)
+
+    remaining = dict(quantities)
+    new_stock = {}
+    for inventory in inventories:
+        taken = min(max(inventory.current_stock, 0), remaining[inventory.product_id])
+        if taken:
+            remaining[inventory.product_id] -= taken
+            new_stock[inventory.id] = inventory.current_stock - taken
+    return new_stock
+
+
+def _wall_clock(value: Optional[datetime]) -> Optional[datetime]:
+    """
+    Drop the offset of an aware datetime and keep its wall clock value, which
+    is how the naive DATETIME columns and the column store compare it.
+    """
+    return value.replace(tzinfo=None) if value else value
+
+
+def _midnight(day: date) -> datetime:
+    return datetime.combine(day, time.min)
+
+
+def _created_at_range(
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    before: Optional[datetime] = None,
+) -> tuple:
+    """
+    Get the conditions bounding sales created in [start_date, end_date] or
+    before the given datetime. They're repeated on the sale items' copy of
+    created_at so MySQL prunes the monthly partitions of both tables; the join
+    alone doesn't carry a range over.
+    """
+    conditions = []
+    for column in (Sales.created_at, SaleItems.created_at):
+        if start_date:
+            conditions.append(column >= start_date)
+        if end_date:
+            conditions.append(column <= end_date)
+        if before:
+            conditions.append(column < before)
+    return tuple(conditions)
+
+
+def _merge_archived(
+    archived: list, live: list, key: Callable, limit: Optional[int]
+) -> list:
+    """
+    Combine rows read from the sales archive with the live rows. Pages are
+    sorted by key on both sides and merged, whole results are concatenated.
+    Rows found on both sides, of a month being archived or still held by the
+    column store, are kept once.
+    """
+    if not limit:
+        archived_keys = {key(row) for row in archived}
+        return archived + [row for row in live if key(row) not in archived_keys]
+    merged = []
+    for row in heapq.merge(archived, live, key=key):
+        if merged and key(merged[-1]) == key(row):
+            continue
+        merged.append(row)
+        if len(merged) == limit:
+            break
+    return merged
+
+
+def _sales_data_key(row) -> tuple:
+    return row.created_at, row.id, row.sale_item_id
+
+
+def _revenue_key(sale: dict) -> tuple:
+    return sale["created_at"], sale["id"]
+
+
+def _time_bucket(column, granularity: str):
+    """
+    Get the SQL expression truncating a date or datetime column to the start
+    of its hour, day, week (Monday) or month.
+    """
+    if granularity == "hour":
+        return func.date_format(column, "%Y-%m-%d %H:00:00")
+    if granularity == "week":
+        return func.subdate(func.date(column), func.weekday(column))
+    if granularity == "month":
+        return func.date_format(column, "%Y-%m-01")
+    return func.date(column)
+
+
+def _bucket_starts(created_at, granularity: str):
+    """
+    Truncate an array of archived created_at values to the start of their
+    hour, day, week (Monday) or month, like _time_bucket does in SQL.
+    """
+    if granularity == "hour":
+        return created_at.astype("datetime64[h]")
+    if granularity == "month":
+        return created_at.astype("datetime64[M]")
+    days = created_at.astype("datetime64[D]")
+    if granularity == "week":
+        # day 0, 1970-01-01, was a Thursday
+        days = days - (days.astype("int64") + 3) % 7
+    return days
+
+
+def _sum_archived(items: dict, keys: list) -> list[tuple]:
+    """
+    Sum the line totals and quantities of archived sale items per distinct
+    combination of the int64 key arrays, the in-memory GROUP BY of the
+    archive. Returns (*key values, revenue, units) tuples.
+    """
+    if not len(items["sale_item_id"]):
+        return []
+    if not keys:
+        return [(float(items["line_total"].sum()), int(items["quantity"].sum()))]
+    groups, inverse = np.unique(np.stack(keys), axis=1, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    revenue = np.bincount(inverse, items["line_total"], groups.shape[1])
+    units = np.bincount(inverse, items["quantity"], groups.shape[1])
+    return list(zip(*groups.tolist(), revenue.tolist(), units.astype("int64").tolist()))
+
+
+def _bucket_start(bucket) -> datetime:
+    """
+    Normalize a bucket returned by MySQL, a DATE or a formatted string, into
+    the datetime the bucket starts at.
+    """
+    if isinstance(bucket, str):
+        return datetime.fromisoformat(bucket)
+    if not isinstance(bucket, datetime):
+        return _midnight(bucket)
+    return bucket
+
 
 class ProductRepository:
     """
@@ -26,6 +245,108 @@ class ProductRepository:
     def __init__(self, db: Session):
         self.db = db
 
+    def _column_store(self) -> Optional[SalesColumnStore]:
+        """
+        Get the refreshed in-memory sales store when it is enabled, None when
+        the query has to run in SQL database
+        """
+        if not sales_column_store.enabled or self.db.info.get(READ_YOUR_WRITES):
+            return None
+        sales_column_store.refresh(self.db)
+        return sales_column_store
+
+    def _archive(
+        self, start_date: Optional[datetime], end_date: Optional[datetime]
+    ) -> Optional[SalesArchive]:
+        """
+        Get the sales archive when it holds months in the date range, None when
+        the live rows are all there is
+        """
+        sales_archive.refresh()
+        if not sales_archive.covers(start_date, end_date):
+            return None
+        return sales_archive
+
+    def _live_item_ids(
+        self,
+        archive: SalesArchive,
+        start_date: Optional[datetime],
+        end_date: Optional[datetime],
+        before: Optional[datetime] = None,
+    ) -> list[int]:
+        """
+        Get the ids of the sale items of archived months in the range that are
+        still in the database: those of a month being archived, or of sales
+        backdated into it since. Their archived copies are skipped when
+        archived and live rows are combined.
+        """
+        months = archive.months()
+        end_of_archive = (months[-1] + timedelta(days=32)).replace(day=1)
+        return list(
+            self.db.scalars(
+                select(SaleItems.id).where(
+                    SaleItems.created_at >= _midnight(months[0]),
+                    SaleItems.created_at < _midnight(end_of_archive),
+                    SaleItems.created_at >= start_date if start_date else True,
+                    SaleItems.created_at <= end_date if end_date else True,
+                    SaleItems.created_at < before if before else True,
+                )
+            )
+        )
+
+    def _archived_items(
+        self,
+        window: tuple[Optional[datetime], Optional[datetime], Optional[datetime]],
+        category_id: Optional[int],
+        product_id: Optional[int],
+    ) -> Optional[dict]:
+        """
+        Get the archived sale items of a (start_date, end_date, before) window
+        matching the filters as column arrays, leaving out the items still in
+        the database. None when the window doesn't reach into the archive.
+        """
+        start_date, end_date, before = window
+        archive = self._archive(start_date, end_date or before)
+        if not archive:
+            return None
+        items = archive.items(
+            start_date,
+            end_date,
+            product_id,
+            self._category_product_ids(category_id),
+            before,
+        )
+        live_ids = self._live_item_ids(archive, start_date, end_date, before)
+        if live_ids:
+            kept = ~np.isin(items["sale_item_id"], live_ids)
+            items = {name: column[kept] for name, column in items.items()}
+        return items
+
+    def _product_categories(self, product_ids):
+        """
+        Map an array of product ids to their current category ids, like the
+        live rows joined with product
+        """
+        ids, category_ids = zip(
+            *self.db.execute(select(Product.id, Product.category_id))
+        )
+        categories = np.zeros(max(ids) + 1, dtype="int64")
+        categories[list(ids)] = category_ids
+        return categories[product_ids]
+
+    def _category_product_ids(self, category_id: Optional[int]) -> Optional[list]:
+        """
+        Get the ids of a category's products to filter archived sale items by
+        their current category, like the live rows joined with product
+        """
+        if not category_id:
+            return None
+        return list(
+            self.db.scalars(
+                select(Product.id).where(Product.category_id == category_id)
+            )
+        )
+
     def create_category(self, category_create: CategoryRequest) -> Category:
         """
         Creates a category in SQL database and returns a Category object.
@@ -43,23 +364,40 @@ class ProductRepository:
         self.db.add(category)
         self.db.commit()
         self.db.refresh(category)
+        category_cache.invalidate(category.id)
         return category
 
     def get_category(self, category_id: int) -> Optional[Category]:
         """
-        Gets a category from SQL database and returns a Category object.
+        Gets a category from the catalog cache, or from SQL database on a miss,
+        and returns a Category object. Cached objects are detached from their
+        session, so only their column attributes are available. Misses are
+        read from the primary, a lagging replica row would be cached for the
+        whole TTL.
 
         Parameters:
-            user_id (int): The user id
+            category_id (int): The category id
 
         Returns:
             Optional[Category]: The category object
         """
-        return self.db.query(Category).filter(Category.id == category_id).first()
+        category = category_cache.get(category_id)
+        if category is None:
+            category = (
+                self.db.query(Category).filter(Category.id == category_id).first()
+            )
+            if category:
+                self.db.expunge(category)
+                category_cache.set(category_id, category)
+        return category
 
     def get_product(self, product_id: int) -> Optional[Product]:
         """
-        Gets a product from SQL database and returns a Product object.
+        Gets a product from the catalog cache, or from SQL database on a miss,
+        and returns a Product object. Cached objects are detached from their
+        session, so only their column attributes are available. Misses are
+        read from the primary, a lagging replica row would be cached for the
+        whole TTL.
 
         Parameters:
             product_id (int): The product id
@@ -67,8 +405,13 @@ class ProductRepository:
         Returns:
             Optional[Product]: The product object
         """
-
-        return self.db.query(Product).filter(Product.id == product_id).first()
+        product = product_cache.get(product_id)
+        if product is None:
+            product = self.db.query(Product).filter(Product.id == product_id).first()
+            if product:
+                self.db.expunge(product)
+                product_cache.set(product_id, product)
+        return product
 
     def create_product(self, product_create: ProductRequest) -> Product:
         """
@@ -89,8 +432,10 @@ class ProductRepository:
         self.db.add(product)
         self.db.commit()
         self.db.refresh(product)
+        product_cache.invalidate(product.id)
         return product
 
+    @reads_from_replica
     def get_all_products(self) -> Optional[list[Product]]:
         """
         Gets all products from SQL database and returns a list of Product objects.
@@ -119,6 +464,120 @@ class ProductRepository:
         self.db.refresh(inventory)
         return inventory
 
+    def bulk_create_categories(
+        self, category_creates: list[CategoryRequest], chunk_size: int = 1000
+    ) -> tuple[int, list[tuple[int, str]]]:
+        """
+        Creates categories in SQL database with chunked multi-row INSERTs.
+
+        Parameters:
+            category_creates (list[CategoryRequest]): The category create schemas
+            chunk_size (int): The number of rows per INSERT and transaction
+
+        Returns:
+            tuple: The number of created categories and the (index, error) of
+            every row that failed
+        """
+        result = self._bulk_insert(
+            Category.__table__,
+            [
+                {"name": category_create.name, "desc": category_create.description}
+                for category_create in category_creates
+            ],
+            chunk_size,
+        )
+        category_cache.clear()
+        return result
+
+    def bulk_create_products(
+        self, product_creates: list[ProductRequest], chunk_size: int = 1000
+    ) -> tuple[int, list[tuple[int, str]]]:
+        """
+        Creates products in SQL database with chunked multi-row INSERTs.
+
+        Parameters:
+            product_creates (list[ProductRequest]): The product create schemas
+            chunk_size (int): The number of rows per INSERT and transaction
+
+        Returns:
+            tuple: The number of created products and the (index, error) of
+            every row that failed
+        """
+        result = self._bulk_insert(
+            Product.__table__,
+            [
+                {
+                    "name": product_create.name,
+                    "desc": product_create.description,
+                    "price": product_create.price,
+                    "category_id": product_create.category_id,
+                }
+                for product_create in product_creates
+            ],
+            chunk_size,
+        )
+        product_cache.clear()
+        return result
+
+    def bulk_create_product_inventories(
+        self, inventory_creates: list[InventoryRequest], chunk_size: int = 1000
+    ) -> tuple[int, list[tuple[int, str]]]:
+        """
+        Creates product inventories in SQL database with chunked multi-row INSERTs.
+
+        Parameters:
+            inventory_creates (list[InventoryRequest]): The inventory create schemas
+            chunk_size (int): The number of rows per INSERT and transaction
+
+        Returns:
+            tuple: The number of created inventories and the (index, error) of
+            every row that failed
+        """
+        return self._bulk_insert(
+            Inventory.__table__,
+            [
+                {
+                    "product_id": inventory_create.product_id,
+                    "current_stock": inventory_create.current_stock,
+                    "low_stock_alert_threshold": inventory_create.low_stock_alert_threshold,
+                }
+                for inventory_create in inventory_creates
+            ],
+            chunk_size,
+        )
+
+    def _bulk_insert(
+        self, table: Table, rows: list[dict], chunk_size: int
+    ) -> tuple[int, list[tuple[int, str]]]:
+        """
+        Inserts rows in chunks, each chunk as one multi-row INSERT committed in
+        its own transaction. When a chunk is rejected it is replayed row by row
+        inside savepoints, so the valid rows still land and the failing ones
+        are reported.
+        """
+        inserted = 0
+        errors = []
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start : start + chunk_size]
+            try:
+                self.db.execute(insert(table), chunk)
+                self.db.commit()
+                inserted += len(chunk)
+                continue
+            except DBAPIError:
+                self.db.rollback()
+
+            for index, row in enumerate(chunk, start=start):
+                try:
+                    with self.db.begin_nested():
+                        self.db.execute(insert(table), row)
+                    inserted += 1
+                except DBAPIError as error:
+                    errors.append((index, str(error.orig)))
+            self.db.commit()
+        return inserted, errors
+
+    @reads_from_replica
     def get_product_inventory(self, product_id: int) -> Optional[Inventory]:
         """
         Gets a product inventory from SQL database and returns a Inventory object.
@@ -156,20 +615,313 @@ class ProductRepository:
         self.db.refresh(inventory)
         return inventory
 
+    def create_sales(self, sales_create: list[SaleRequest]) -> list[int]:
+        """
+        Creates sales with their items in one transaction and decrements the
+        stock of every sold product. Sales and sale items are written with
+        multi-row INSERTs, each item with the product's current price as its
+        unit price. The inventory rows of the sold products are locked in
+        (product, id) order and stock is taken from their summed units with a
+        single UPDATE, so a batch either fits in stock completely or is
+        rolled back. Sales can't be dated into months closed for archiving.
+
+        Parameters:
+            sales_create (list[SaleRequest]): The sale create schemas
+
+        Returns:
+            list[int]: The ids of the created sales, in request order
+
+        Raises:
+            ClosedMonthError: If a sale is dated into a closed month
+            InsufficientStockError: If a product lacks stock or inventory
+        """
+        quantities = defaultdict(int)
+        for sale_create in sales_create:
+            for item in sale_create.items:
+                quantities[item.product_id] += item.quantity
+        now = datetime.now()
+        # DATETIME keeps whole seconds and MySQL rounds fractions on insert,
+        # truncate first so the rollup day is the day the row is stored under
+        created_at = [
+            (sale_create.created_at or now).replace(microsecond=0)
+            for sale_create in sales_create
+        ]
+
+        try:
+            self._check_open_months({value.date() for value in created_at})
+            inventories = self.db.execute(
+                select(Inventory.id, Inventory.product_id, Inventory.current_stock)
+                .where(Inventory.product_id.in_(list(quantities)))
+                .order_by(Inventory.product_id, Inventory.id)
+                .with_for_update()
+            ).all()
+            new_stock = _take_stock(quantities, inventories)
+            self.db.execute(
+                update(Inventory)
+                .where(Inventory.id.in_(list(new_stock)))
+                .values(
+                    current_stock=case(new_stock, value=Inventory.id),
+                    updated_at=now,
+                )
+                .execution_options(synchronize_session=False)
+            )
+
+            products = {
+                product.id: product
+                for product in self.db.execute(
+                    select(Product.id, Product.price, Product.category_id).where(
+                        Product.id.in_(list(quantities))
+                    )
+                )
+            }
+            sale_ids = self._insert_returning_ids(
+                Sales.__table__,
+                [{"created_at": value, "updated_at": now} for value in created_at],
+            )
+            self.db.execute(
+                insert(SaleItems.__table__),
+                [
+                    {
+                        "sales_id": sale_id,
+                        "created_at": sale_created_at,
+                        "product_id": item.product_id,
+                        "quantity": item.quantity,
+                        "unit_price": products[item.product_id].price,
+                    }
+                    for sale_id, sale_created_at, sale_create in zip(
+                        sale_ids, created_at, sales_create
+                    )
+                    for item in sale_create.items
+                ],
+            )
+            self._add_to_daily_revenue(sales_create, created_at, products)
+            self._bump_sales_versions({value.date() for value in created_at})
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        return sale_ids
+
+    def _add_to_daily_revenue(
+        self,
+        sales_create: list[SaleRequest],
+        created_at: list[datetime],
+        products: dict[int, Row],
+    ) -> None:
+        """
+        Adds the revenue and units of new sales to the daily_revenue rollup with
+        one multi-row INSERT ... ON DUPLICATE KEY UPDATE. Rows are written in key
+        order so concurrent batches lock them in the same order.
+        """
+        totals = defaultdict(lambda: [0.0, 0])
+        for sale_create, sale_created_at in zip(sales_create, created_at):
+            day = sale_created_at.date()
+            for item in sale_create.items:
+                total = totals[(day, item.product_id)]
+                total[0] += item.quantity * products[item.product_id].price
+                total[1] += item.quantity
+
+        statement = mysql_insert(DailyRevenue.__table__).values(
+            [
+                {
+                    "day": day,
+                    "product_id": product_id,
+                    "category_id": products[product_id].category_id,
+                    "revenue": revenue,
+                    "units": units,
+                }
+                for (day, product_id), (revenue, units) in sorted(totals.items())
+            ]
+        )
+        self.db.execute(
+            statement.on_duplicate_key_update(
+                revenue=DailyRevenue.revenue + statement.inserted.revenue,
+                units=DailyRevenue.units + statement.inserted.units,
+                updated_at=functions.now(),
+            )
+        )
+
+    def _check_open_months(self, days: set[date]) -> None:
+        """
+        Rejects sales dated into months closed for archiving. The share lock
+        also covers months without a sales_versions row, so the archival job
+        can't close a month until the transactions writing to it are done.
+        """
+        months = sorted({day.replace(day=1) for day in days})
+        closed = self.db.scalars(
+            select(SalesVersion.month)
+            .where(SalesVersion.month.in_(months), SalesVersion.closed_at.is_not(None))
+            .with_for_update(read=True)
+        ).all()
+        if closed:
+            raise ClosedMonthError(closed)
+
+    def _bump_sales_versions(self, days: set[date]) -> None:
+        """
+        Bumps the sales_versions counters of the months of the given days,
+        in month order so concurrent writers lock them in the same order.
+        Call it last in the writing transaction to hold the locks briefly.
+        """
+        months = sorted({day.replace(day=1) for day in days})
+        statement = mysql_insert(SalesVersion.__table__).values(
+            [{"month": month, "version": 1} for month in months]
+        )
+        self.db.execute(
+            statement.on_duplicate_key_update(
+                version=SalesVersion.version + 1,
+                updated_at=functions.now(),
+            )
+        )
+
+    def rebuild_daily_revenue(self, start_day: date, end_day: date) -> int:
+        """
+        Recomputes the daily_revenue rollup of the days in [start_day, end_day]
+        from raw sales in one transaction. Days of archived months are summed
+        from the sales archive and added to the rows of their live sales.
+
+        Parameters:
+            start_day (date): The first day to rebuild
+            end_day (date): The last day to rebuild
+
+        Returns:
+            int: The number of rollup rows written
+        """
+        day = func.date(Sales.created_at)
+        rollup = (
+            select(
+                day,
+                SaleItems.product_id,
+                Product.category_id,
+                functions.sum(SaleItems.line_total),
+                functions.sum(SaleItems.quantity),
+            )
+            .join_from(Sales, Sales.sale_items)
+            .join(SaleItems.product)
+            .where(
+                *_created_at_range(
+                    _midnight(start_day),
+                    before=_midnight(end_day + timedelta(days=1)),
+                )
+            )
+            .group_by(day, SaleItems.product_id, Product.category_id)
+        )
+        try:
+            self.db.execute(
+                delete(DailyRevenue).where(
+                    DailyRevenue.day >= start_day, DailyRevenue.day <= end_day
+                )
+            )
+            result = self.db.execute(
+                insert(DailyRevenue).from_select(
+                    ["day", "product_id", "category_id", "revenue", "units"], rollup
+                )
+            )
+            rows = result.rowcount + self._add_archived_to_daily_revenue(
+                start_day, end_day
+            )
+            self._bump_sales_versions(
+                {
+                    start_day + timedelta(days=offset)
+                    for offset in range((end_day - start_day).days + 1)
+                }
+            )
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        return rows
+
+    def _add_archived_to_daily_revenue(self, start_day: date, end_day: date) -> int:
+        """
+        Adds the archived sales of the days in [start_day, end_day] to the
+        daily_revenue rollup, grouped in memory per (day, product) and upserted
+        ROLLUP_BATCH_SIZE rows per statement. Items of deleted products are
+        left out like the live rows' join with product.
+        """
+        archived = self._archived_items(
+            (_midnight(start_day), None, _midnight(end_day + timedelta(days=1))),
+            None,
+            None,
+        )
+        if archived is None:
+            return 0
+        days = archived["created_at"].astype("datetime64[D]").astype("int64")
+        totals = _sum_archived(archived, [days, archived["product_id"].astype("int64")])
+        categories = dict(
+            self.db.execute(
+                select(Product.id, Product.category_id).where(
+                    Product.id.in_({product_id for _, product_id, _, _ in totals})
+                )
+            ).all()
+        )
+        values = [
+            {
+                "day": np.datetime64(day, "D").item(),
+                "product_id": product_id,
+                "category_id": categories[product_id],
+                "revenue": revenue,
+                "units": units,
+            }
+            for day, product_id, revenue, units in totals
+            if product_id in categories
+        ]
+        for offset in range(0, len(values), ROLLUP_BATCH_SIZE):
+            statement = mysql_insert(DailyRevenue.__table__).values(
+                values[offset : offset + ROLLUP_BATCH_SIZE]
+            )
+            self.db.execute(
+                statement.on_duplicate_key_update(
+                    revenue=DailyRevenue.revenue + statement.inserted.revenue,
+                    units=DailyRevenue.units + statement.inserted.units,
+                    updated_at=functions.now(),
+                )
+            )
+        return len(values)
+
+    def _insert_returning_ids(self, table: Table, rows: list[dict]) -> list[int]:
+        """
+        Inserts rows with one multi-row INSERT and returns their generated ids
+        in the order of the given rows.
+        """
+        if self.db.get_bind().dialect.insert_returning:
+            return list(
+                self.db.scalars(
+                    insert(table).returning(table.c.id, sort_by_parameter_order=True),
+                    rows,
+                )
+            )
+        # MySQL has no RETURNING, but InnoDB hands a multi-row simple INSERT
+        # one block of auto-increment ids starting at lastrowid, spaced by the
+        # session's auto_increment_increment (e.g. 2 under multi-primary setups)
+        result = self.db.execute(insert(table).values(rows))
+        increment = self.db.scalar(text("SELECT @@SESSION.auto_increment_increment"))
+        return list(
+            range(
+                result.lastrowid,
+                result.lastrowid + len(rows) * increment,
+                increment,
+            )
+        )
+
+    @reads_from_replica
     def get_low_stock_products(self) -> Optional[list[Product]]:
         """
         Gets low stock products from SQL database and returns a list of Product objects.
+        Reads the indexed is_low_stock flag of their inventory.
         """
         return (
             self.db.query(Product)
             .join(Inventory)
-            .filter(Inventory.current_stock <= Inventory.low_stock_alert_threshold)
+            .filter(Inventory.is_low_stock == True)
             .all()
         )
 
+    @reads_from_replica
     def get_low_stock_inventory(self) -> Optional[list[Inventory]]:
         """
         Gets low stock inventory from SQL database and returns a list of Inventory objects.
+        Reads the indexed is_low_stock flag, so the cost grows with the number of
+        low stock items rather than the catalog size.
 
         Parameters:
             self (self): The class instance
@@ -177,83 +929,596 @@ class ProductRepository:
         Returns:
             Optional[list[Inventory]]: The inventory object
         """
+        return self.db.query(Inventory).filter(Inventory.is_low_stock == True).all()
+
+    @reads_from_replica
+    def get_sales_version(
+        self, start_date: Optional[datetime], end_date: Optional[datetime]
+    ) -> int:
+        """
+        Gets the version of the sales in a date range, the sum of the
+        sales_versions counters of the months it overlaps. Every write to a
+        month's sales or rollup bumps its counter, so the sum changes whenever
+        an analytics response computed over the range may change. Only one
+        row per month is read, however many sales the range holds.
+
+        Parameters:
+            start_date (datetime): The start date
+            end_date (datetime): The end date
+
+        Returns:
+            int: The sales version of the range
+        """
         return (
-            self.db.query(Inventory)
-            .filter(Inventory.current_stock <= Inventory.low_stock_alert_threshold)
-            .all()
+            self.db.query(functions.coalesce(functions.sum(SalesVersion.version), 0))
+            .filter(
+                SalesVersion.month >= start_date.date().replace(day=1)
+                if start_date
+                else True
+            )
+            .filter(SalesVersion.month <= end_date.date() if end_date else True)
+            .scalar()
         )
 
-    def get_sales_data(
+    @reads_from_replica
+    def get_column_store_generation(self) -> Optional[int]:
+        """
+        Gets the generation of the column store snapshot that answers this
+        session's sales reads, refreshing it first when due. It can trail the
+        sales_versions counters by the refresh interval, so responses read
+        from the store are versioned by both.
+
+        Returns:
+            int: The snapshot generation, None when sales reads run in SQL
+        """
+        column_store = self._column_store()
+        return column_store.generation if column_store else None
+
+    def sales_data_query(
         self,
         start_date: Optional[datetime],
         end_date: Optional[datetime],
-        product_id: Optional[datetime],
+        product_id: Optional[int],
         category_id: Optional[int],
-    ):
+        after: Optional[tuple[datetime, int, int]] = None,
+        with_product: bool = False,
+    ) -> Query:
         """
-        Gets sales data from SQL database.
+        Builds the sales data query without executing it. Product is only
+        joined to filter by category, or when asked for.
 
         Parameters:
             start_date (datetime): The start date
             end_date (datetime): The end date
             product_id (int): The product id
             category_id (int): The category id
+            after (tuple): The (created_at, sale id, sale item id) keyset position
+                to resume after
+            with_product (bool): Join product for the caller to use its columns
 
+        Returns:
+            Query: The sales data query
         """
-
-        return (
-            self.db.query(Sales, SaleItems)
-            .join(SaleItems)
-            .join(Product)
-            .filter(Sales.created_at >= start_date if start_date else True)
-            .filter(Sales.created_at <= end_date if end_date else True)
+        query = self.db.query(Sales, SaleItems).join(Sales.sale_items)
+        if category_id or with_product:
+            query = query.join(SaleItems.product).filter(
+                Product.category_id == category_id if category_id else True
+            )
+        query = (
+            query.filter(*_created_at_range(start_date, end_date))
             .filter(SaleItems.product_id == product_id if product_id else True)
-            .filter(Product.category_id == category_id if category_id else True)
             .with_entities(
                 Sales.id,
+                SaleItems.id.label("sale_item_id"),
                 SaleItems.product_id,
                 Sales.created_at,
                 SaleItems.quantity,
             )
-            .all()
         )
+        if after:
+            created_at, sale_id, sale_item_id = after
+            query = query.filter(*_created_at_range(created_at)).filter(
+                or_(
+                    Sales.created_at > created_at,
+                    and_(
+                        Sales.created_at == created_at,
+                        or_(
+                            Sales.id > sale_id,
+                            and_(Sales.id == sale_id, SaleItems.id > sale_item_id),
+                        ),
+                    ),
+                )
+            )
+        return query
 
-    def get_revenue_from_sales(
+    @reads_from_replica
+    def get_sales_data(
         self,
         start_date: Optional[datetime],
         end_date: Optional[datetime],
+        product_id: Optional[int],
         category_id: Optional[int],
+        limit: Optional[int] = None,
+        after: Optional[tuple[datetime, int, int]] = None,
     ):
         """
-        Gets sales revenue from SQL database.
+        Gets sales data from SQL database. With a limit, rows are returned in
+        (created_at, sale id, sale item id) order starting after the given
+        keyset position, so each page is an index seek rather than an OFFSET scan.
+        Rows of archived months are read from the sales archive and merged in.
 
         Parameters:
             start_date (datetime): The start date
             end_date (datetime): The end date
+            product_id (int): The product id
             category_id (int): The category id
+            limit (int): The maximum number of rows to return
+            after (tuple): The (created_at, sale id, sale item id) keyset position
+                to resume after
 
         """
+        column_store = self._column_store()
+        if column_store:
+            rows = column_store.sales_data(
+                start_date, end_date, product_id, category_id, limit, after
+            )
+        else:
+            query = self.sales_data_query(
+                start_date, end_date, product_id, category_id, after
+            )
+            if limit:
+                query = query.order_by(Sales.created_at, Sales.id, SaleItems.id).limit(
+                    limit
+                )
+            rows = query.all()
 
-        sales = (
-            self.db.query(Sales)
-            .join(SaleItems)
-            .join(Product)
-            .filter(Sales.created_at >= start_date if start_date else True)
-            .filter(Sales.created_at <= end_date if end_date else True)
-            .filter(Product.category_id == category_id if category_id else True)
-            .with_entities(
-                Sales,
+        archive = self._archive(start_date, end_date)
+        if not archive:
+            return rows
+        archived = archive.sales_data(
+            start_date,
+            end_date,
+            product_id,
+            self._category_product_ids(category_id),
+            limit,
+            after,
+        )
+        return _merge_archived(archived, rows, _sales_data_key, limit)
+
+    @reads_from_replica
+    def stream_sales_data(
+        self,
+        start_date: Optional[datetime],
+        end_date: Optional[datetime],
+        product_id: Optional[int],
+        category_id: Optional[int],
+        chunk_size: int = 1000,
+    ) -> Iterator[Row]:
+        """
+        Streams sales data from a server-side cursor, fetching chunk_size
+        rows at a time so memory stays flat regardless of the result size.
+        Rows of archived months are streamed from the sales archive first,
+        except those still in the database, which the cursor returns.
+
+        Parameters:
+            start_date (datetime): The start date
+            end_date (datetime): The end date
+            product_id (int): The product id
+            category_id (int): The category id
+            chunk_size (int): The number of rows fetched per round trip
+
+        Returns:
+            Iterator[Row]: The sales data rows
+        """
+        archive = self._archive(start_date, end_date)
+        if archive:
+            live_ids = set(self._live_item_ids(archive, start_date, end_date))
+            for row in archive.iter_sales_data(
+                start_date,
+                end_date,
+                product_id,
+                self._category_product_ids(category_id),
+                chunk_size,
+            ):
+                if row.sale_item_id not in live_ids:
+                    yield row
+        query = self.sales_data_query(start_date, end_date, product_id, category_id)
+        yield from query.yield_per(chunk_size)
+
+    @reads_from_replica
+    def get_top_sellers(
+        self,
+        group_by: str,
+        metric: str,
+        limit: int,
+        start_date: Optional[datetime],
+        end_date: Optional[datetime],
+        category_id: Optional[int] = None,
+    ) -> list[dict]:
+        """
+        Gets the top products or categories by revenue or units sold. Sales are
+        filtered and joined like get_sales_data, then grouped, ranked and cut
+        to the limit by the database with ORDER BY ... LIMIT. Ties are broken by
+        the ascending product or category id, so the cut at the limit is stable.
+        Revenue is summed from the sale items' line totals, product is only
+        joined for categories. When the range reaches archived months, every
+        live group is read and added to the archived totals, then ranked and
+        cut the same way in Python.
+
+        Parameters:
+            group_by (str): Rank products or categories
+            metric (str): Rank by revenue or quantity
+            limit (int): The number of top entries to return
+            start_date (datetime): The start date
+            end_date (datetime): The end date
+            category_id (int): The category id
+
+        Returns:
+            list[dict]: The top entries with their revenue and quantity
+        """
+        key = SaleItems.product_id if group_by == "product" else Product.category_id
+        revenue = functions.sum(SaleItems.line_total).label("revenue")
+        quantity = functions.sum(SaleItems.quantity).label("quantity")
+        ranked = revenue if metric == "revenue" else quantity
+        query = (
+            self.sales_data_query(
+                start_date,
+                end_date,
+                None,
+                category_id,
+                with_product=group_by == "category",
             )
-            .all()
+            .with_entities(key, revenue, quantity)
+            .group_by(key)
         )
-        sales_revenue = []
-        for sale in sales:
-            sales_revenue.append(
+        archived = self._archived_items((start_date, end_date, None), category_id, None)
+        if archived is None:
+            return [
                 {
-                    "id": sale.id,
-                    "total_price": sale.get_total_price(),
-                    "created_at": sale.created_at,
+                    f"{group_by}_id": row[0],
+                    "revenue": row.revenue,
+                    "quantity": row.quantity,
                 }
+                for row in query.order_by(ranked.desc(), key).limit(limit)
+            ]
+
+        totals = defaultdict(lambda: [0.0, 0])
+        for group, group_revenue, group_quantity in query:
+            totals[group][0] += group_revenue or 0
+            totals[group][1] += int(group_quantity or 0)
+        archived_keys = archived["product_id"].astype("int64")
+        if group_by == "category":
+            archived_keys = self._product_categories(archived_keys)
+        for group, group_revenue, group_quantity in _sum_archived(
+            archived, [archived_keys]
+        ):
+            totals[group][0] += group_revenue
+            totals[group][1] += group_quantity
+        position = 0 if metric == "revenue" else 1
+        top = sorted(totals.items(), key=lambda item: (-item[1][position], item[0]))
+        return [
+            {f"{group_by}_id": group, "revenue": revenue, "quantity": units}
+            for group, (revenue, units) in top[:limit]
+        ]
+
+    def revenue_query(
+        self,
+        start_date: Optional[datetime],
+        end_date: Optional[datetime],
+        category_id: Optional[int],
+        after: Optional[tuple[datetime, int]] = None,
+    ) -> Query:
+        """
+        Builds the per sale revenue query without executing it. Revenue is
+        summed from the sale items' line totals, so product is only joined to
+        filter by category and the items are read from a covering index.
+
+        Parameters:
+            start_date (datetime): The start date
+            end_date (datetime): The end date
+            category_id (int): The category id
+            after (tuple): The (created_at, sale id) keyset position to resume after
+
+        Returns:
+            Query: The revenue query
+        """
+        query = self.db.query(Sales).join(Sales.sale_items)
+        if category_id:
+            query = query.join(SaleItems.product).filter(
+                Product.category_id == category_id
+            )
+        query = (
+            query.filter(*_created_at_range(start_date, end_date))
+            .with_entities(
+                Sales.id,
+                functions.sum(SaleItems.line_total).label("total_price"),
+                Sales.created_at,
+            )
+            .group_by(Sales.id, Sales.created_at)
+        )
+        if after:
+            created_at, sale_id = after
+            query = query.filter(*_created_at_range(created_at)).filter(
+                or_(
+                    Sales.created_at > created_at,
+                    and_(Sales.created_at == created_at, Sales.id > sale_id),
+                )
+            )
+        return query
+
+    @reads_from_replica
+    def get_revenue_from_sales(
+        self,
+        start_date: Optional[datetime],
+        end_date: Optional[datetime],
+        category_id: Optional[int],
+        limit: Optional[int] = None,
+        after: Optional[tuple[datetime, int]] = None,
+    ):
+        """
+        Gets sales revenue from SQL database. The revenue of each sale is
+        aggregated in SQL, so only the items matching the filters are summed.
+        With a limit, sales are returned in (created_at, id) order starting
+        after the given keyset position. Sales of archived months are read from
+        the sales archive and merged in.
+
+        Parameters:
+            start_date (datetime): The start date
+            end_date (datetime): The end date
+            category_id (int): The category id
+            limit (int): The maximum number of sales to return
+            after (tuple): The (created_at, sale id) keyset position to resume after
+
+        """
+        column_store = self._column_store()
+        if column_store:
+            sales_revenue = column_store.revenue(
+                start_date, end_date, category_id, limit, after
+            )
+        else:
+            query = self.revenue_query(start_date, end_date, category_id, after)
+            if limit:
+                query = query.order_by(Sales.created_at, Sales.id).limit(limit)
+            sales_revenue = []
+            for sale in query.all():
+                sales_revenue.append(
+                    {
+                        "id": sale.id,
+                        "total_price": sale.total_price,
+                        "created_at": sale.created_at,
+                    }
+                )
+
+        archive = self._archive(start_date, end_date)
+        if not archive:
+            return sales_revenue
+        archived = archive.revenue(
+            start_date,
+            end_date,
+            self._category_product_ids(category_id),
+            limit,
+            after,
+        )
+        return _merge_archived(archived, sales_revenue, _revenue_key, limit)
+
+    @reads_from_replica
+    def get_revenue_summary(
+        self,
+        start_date: Optional[datetime],
+        end_date: Optional[datetime],
+        category_id: Optional[int],
+    ) -> dict:
+        """
+        Gets the total revenue and units sold. Whole days inside the range are
+        read from the daily_revenue rollup, raw sales are only aggregated for
+        the partial days at the edges of the range, from the sales archive too
+        when they fall into archived months.
+
+        Parameters:
+            start_date (datetime): The start date
+            end_date (datetime): The end date
+            category_id (int): The category id
+
+        Returns:
+            dict: The revenue and units
+        """
+        start_date, end_date = _wall_clock(start_date), _wall_clock(end_date)
+        whole_days, raw_windows = self._revenue_windows(start_date, end_date)
+        totals = (
+            functions.sum(DailyRevenue.revenue),
+            functions.sum(DailyRevenue.units),
+        )
+        raw_totals = (
+            functions.sum(SaleItems.line_total),
+            functions.sum(SaleItems.quantity),
+        )
+        parts = []
+        if whole_days:
+            parts.append(
+                self._rollup_revenue_query(*whole_days, category_id, None)
+                .with_entities(*totals)
+                .one()
+            )
+        for window in raw_windows:
+            parts.append(
+                self._raw_revenue_query(_created_at_range(*window), category_id, None)
+                .with_entities(*raw_totals)
+                .one()
+            )
+            archived = self._archived_items(window, category_id, None)
+            if archived is not None:
+                parts += _sum_archived(archived, [])
+
+        return {
+            "revenue": sum(revenue or 0 for revenue, _ in parts),
+            "units": sum(units or 0 for _, units in parts),
+        }
+
+    @reads_from_replica
+    def get_revenue_series(
+        self,
+        granularity: str,
+        start_date: Optional[datetime],
+        end_date: Optional[datetime],
+        category_id: Optional[int],
+        product_id: Optional[int],
+        group_by: Optional[str] = None,
+    ) -> list[dict]:
+        """
+        Gets revenue and units sold per time bucket, optionally split per
+        category or product. Buckets are computed and summed in SQL; day, week
+        and month buckets read whole days from the daily_revenue rollup and raw
+        sales only for the partial days at the edges of the range. Raw sales of
+        archived months are bucketed from the sales archive and added in.
+
+        Parameters:
+            granularity (str): The bucket size, one of hour, day, week or month
+            start_date (datetime): The start date
+            end_date (datetime): The end date
+            category_id (int): The category id
+            product_id (int): The product id
+            group_by (str): Split each bucket per category or product
+
+        Returns:
+            list[dict]: The buckets ordered by start, then by group
+        """
+        start_date, end_date = _wall_clock(start_date), _wall_clock(end_date)
+        if granularity == "hour":
+            whole_days = None
+            raw_windows = [(start_date, end_date, None)]
+        else:
+            whole_days, raw_windows = self._revenue_windows(start_date, end_date)
+
+        series = defaultdict(lambda: [0.0, 0])
+        queries = []
+        if whole_days:
+            bucket = _time_bucket(DailyRevenue.day, granularity)
+            group = {
+                "category": DailyRevenue.category_id,
+                "product": DailyRevenue.product_id,
+            }.get(group_by)
+            queries.append(
+                self._rollup_revenue_query(*whole_days, category_id, product_id)
+                .with_entities(
+                    bucket,
+                    group if group is not None else literal(None),
+                    functions.sum(DailyRevenue.revenue),
+                    functions.sum(DailyRevenue.units),
+                )
+                .group_by(bucket, *([group] if group is not None else []))
+            )
+        for window in raw_windows:
+            bucket = _time_bucket(Sales.created_at, granularity)
+            group = {
+                "category": Product.category_id,
+                "product": SaleItems.product_id,
+            }.get(group_by)
+            queries.append(
+                self._raw_revenue_query(
+                    _created_at_range(*window),
+                    category_id,
+                    product_id,
+                    with_product=group_by == "category",
+                )
+                .with_entities(
+                    bucket,
+                    group if group is not None else literal(None),
+                    functions.sum(SaleItems.line_total),
+                    functions.sum(SaleItems.quantity),
+                )
+                .group_by(bucket, *([group] if group is not None else []))
             )
+            archived = self._archived_items(window, category_id, product_id)
+            if archived is None:
+                continue
+            keys = [
+                _bucket_starts(archived["created_at"], granularity)
+                .astype("datetime64[us]")
+                .astype("int64")
+            ]
+            if group_by == "product":
+                keys.append(archived["product_id"].astype("int64"))
+            elif group_by == "category":
+                keys.append(self._product_categories(archived["product_id"]))
+            for bucket, *group, revenue, units in _sum_archived(archived, keys):
+                point = series[
+                    (
+                        np.datetime64(bucket, "us").astype(object),
+                        group[0] if group else None,
+                    )
+                ]
+                point[0] += revenue
+                point[1] += units
+
+        for query in queries:
+            for bucket, group, revenue, units in query:
+                point = series[(_bucket_start(bucket), group)]
+                point[0] += revenue or 0
+                point[1] += units or 0
 
-        return sales_revenue
+        points = []
+        for (bucket, group), (revenue, units) in sorted(
+            series.items(), key=lambda item: (item[0][0], item[0][1] or 0)
+        ):
+            point = {"bucket": bucket, "revenue": revenue, "units": units}
+            if group_by:
+                point[f"{group_by}_id"] = group
+            points.append(point)
+        return points
+
+    def _revenue_windows(
+        self, start_date: Optional[datetime], end_date: Optional[datetime]
+    ) -> tuple[Optional[tuple[Optional[date], Optional[date]]], list[tuple]]:
+        """
+        Splits the inclusive [start_date, end_date] range into the whole days
+        answered by the daily_revenue rollup and the (start_date, end_date,
+        before) windows of the partial days at its edges, read from raw sales.
+        """
+        first_day, last_day = _whole_days(start_date, end_date)
+        if first_day and last_day and first_day > last_day:
+            return None, [(start_date, end_date, None)]
+
+        raw_windows = []
+        if start_date and start_date < _midnight(first_day):
+            raw_windows.append((start_date, None, _midnight(first_day)))
+        if end_date:
+            raw_windows.append((_midnight(end_date.date()), end_date, None))
+        return (first_day, last_day), raw_windows
+
+    def _rollup_revenue_query(
+        self,
+        first_day: Optional[date],
+        last_day: Optional[date],
+        category_id: Optional[int],
+        product_id: Optional[int],
+    ) -> Query:
+        """
+        Builds a query over the daily_revenue rollup rows of [first_day, last_day].
+        """
+        return (
+            self.db.query(DailyRevenue)
+            .filter(DailyRevenue.day >= first_day if first_day else True)
+            .filter(DailyRevenue.day <= last_day if last_day else True)
+            .filter(DailyRevenue.category_id == category_id if category_id else True)
+            .filter(DailyRevenue.product_id == product_id if product_id else True)
+        )
+
+    def _raw_revenue_query(
+        self,
+        conditions: tuple,
+        category_id: Optional[int],
+        product_id: Optional[int],
+        with_product: bool = False,
+    ) -> Query:
+        """
+        Builds a query over the raw sale items matching the conditions, joining
+        product only to filter by category or when asked for.
+        """
+        query = self.db.query(Sales).join(Sales.sale_items)
+        if category_id or with_product:
+            query = query.join(SaleItems.product).filter(
+                Product.category_id == category_id if category_id else True
+            )
+        return query.filter(*conditions).filter(
+            SaleItems.product_id == product_id if product_id else True
+        )
@@ -0,0 +1,72 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from src.cache import category_cache, product_cache
+from src.column_store import sales_column_store
+from src.database import get_pool_status
+from src.instrumentation import prometheus_metrics
+from src.schemas import CacheStats, ColumnStoreStats, PoolStatus
+
+router = APIRouter()
+
+PROMETHEUS_MEDIA_TYPE = "text/plain; version=0.0.4"
+
+
+def _cache_stats() -> dict:
+    return {cache.name: cache.stats() for cache in (product_cache, category_cache)}
+
+
+@router.get("", response_class=PlainTextResponse)
+async def get_prometheus_metrics():
+    """
+    Get the request latency, query count and database time histograms per
+    route, the connection pool status, the cache counters and the sales column
+    store footprint of this worker process in the Prometheus text format
+
+    Returns:
+        str: The metrics
+    """
+    return PlainTextResponse(
+        prometheus_metrics(
+            get_pool_status(), _cache_stats(), sales_column_store.stats()
+        ),
+        media_type=PROMETHEUS_MEDIA_TYPE,
+    )
+
+
+@router.get("/pool", response_model=PoolStatus)
+async def get_pool_metrics(replica: bool = False):
+    """
+    Get database connection pool metrics of this worker process
+
+    Parameters:
+        replica (bool): Report the read replica pool instead of the primary
+
+    Returns:
+        dict: The pool size, checked out, idle and overflow connections and
+        checkout wait times
+    """
+    return get_pool_status(replica)
+
+
+@router.get("/cache", response_model=dict[str, CacheStats])
+async def get_cache_metrics():
+    """
+    Get catalog cache metrics of this worker process
+
+    Returns:
+        dict: The hit, miss, eviction and expiration counts of each cache
+    """
+    return _cache_stats()
+
+
+@router.get("/column-store", response_model=ColumnStoreStats)
+async def get_column_store_metrics():
+    """
+    Get the size and memory footprint of the in-memory sales column store of
+    this worker process
+
+    Returns:
+        dict: The loaded rows, bytes held and refresh counters
+    """
+    return sales_column_store.stats()
@@ -1,15 +1,75 @@
 import logging
+import time
+from typing import Callable, Type
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
+
+from src.bulk_import import parse_rows, validate_rows
 from src.dependancies.product_dependancy import get_product_repository
+from src.http_cache import conditional_response, make_etag
 from src.repositories.product_repository import ProductRepository
-from src.schemas import CategoryRequest, ProductRequest, InventoryRequest, InventoryEdit
+from src.schemas import (
+    BulkImportResult,
+    CategoryCreated,
+    CategoryRequest,
+    CategoryResponse,
+    InventoryEdit,
+    InventoryId,
+    InventoryList,
+    InventoryRequest,
+    ProductCreated,
+    ProductRequest,
+    ProductResponse,
+)
 
 router = APIRouter()
 
+BULK_CHUNK_SIZE = 1000
+MAX_BULK_CHUNK_SIZE = 10000
+
+
+async def _bulk_import(
+    request: Request,
+    schema: Type[BaseModel],
+    bulk_create: Callable,
+    chunk_size: int,
+) -> dict:
+    """
+    Parse and validate a bulk import body, insert the valid rows and report
+    the per row errors together with the insert throughput.
+    """
+    started = time.perf_counter()
+    body = await request.body()
+    # parsing and validating large bodies is CPU bound, keep it off the event loop
+    try:
+        rows = await run_in_threadpool(
+            parse_rows, body, request.headers.get("content-type", "")
+        )
+    except ValueError as error:
+        raise HTTPException(status_code=400, detail=f"Invalid bulk body: {error}")
+
+    valid, row_numbers, errors = await run_in_threadpool(validate_rows, rows, schema)
+    inserted, insert_errors = await run_in_threadpool(bulk_create, valid, chunk_size)
+    errors.extend(
+        {"row": row_numbers[index], "error": error} for index, error in insert_errors
+    )
+    errors.sort(key=lambda error: error["row"])
+    elapsed = time.perf_counter() - started
+
+    return {
+        "received": len(rows),
+        "inserted": inserted,
+        "failed": len(errors),
+        "errors": errors,
+        "elapsed_seconds": round(elapsed, 3),
+        "rows_per_second": round(inserted / elapsed, 1) if elapsed else None,
+    }
+
 
-@router.post("/add-category")
-async def add_category(
+@router.post("/add-category", response_model=CategoryCreated)
+def add_category(
     product_repository: ProductRepository = Depends(get_product_repository),
     request: CategoryRequest = Depends(),
 ):
@@ -29,16 +89,21 @@ async def add_category(
     return {"category_name": category.name}
 
 
-@router.get("/get-category/{category_id}")
-async def get_category(
+@router.get("/get-category/{category_id}", response_model=CategoryResponse)
+def get_category(
     category_id: int,
+    request: Request,
+    response: Response,
     product_repository: ProductRepository = Depends(get_product_repository),
 ):
     """
-    Get a category from the database
+    Get a category from the database. Answers a conditional GET with a 304 while
+    the category is unchanged.
 
     Parameters:
         category_id (int): The category id
+        request (Request): The request
+        response (Response): The response
         product_repository (ProductRepository): The product repository
 
     Returns:
@@ -47,19 +112,30 @@ async def get_category(
     category = product_repository.get_category(category_id)
     if not category:
         raise HTTPException(status_code=500, detail="Category not found")
-    return category
+    not_modified = conditional_response(
+        request,
+        response,
+        make_etag("category", category.id, category.updated_at),
+        category.updated_at,
+    )
+    return not_modified or category
 
 
-@router.get("/get-product/{product_id}")
-async def get_product(
+@router.get("/get-product/{product_id}", response_model=ProductResponse)
+def get_product(
     product_id: int,
+    request: Request,
+    response: Response,
     product_repository: ProductRepository = Depends(get_product_repository),
 ):
     """
-    Get a product from the database
+    Get a product from the database. Answers a conditional GET with a 304 while
+    the product is unchanged.
 
     Parameters:
         product_id (int): The product id
+        request (Request): The request
+        response (Response): The response
         product_repository (ProductRepository): The product repository
 
     Returns:
@@ -68,11 +144,17 @@ async def get_product(
     product = product_repository.get_product(product_id)
     if not product:
         raise HTTPException(status_code=500, detail="Product not found")
-    return product
+    not_modified = conditional_response(
+        request,
+        response,
+        make_etag("product", product.id, product.updated_at),
+        product.updated_at,
+    )
+    return not_modified or product
 
 
-@router.post("/add-product")
-async def add_product(
+@router.post("/add-product", response_model=ProductCreated)
+def add_product(
     product_repository: ProductRepository = Depends(get_product_repository),
     request: ProductRequest = Depends(),
 ):
@@ -92,8 +174,8 @@ async def add_product(
     return {"product_name": product.name}
 
 
-@router.post("/add-inventory")
-async def add_inventory(
+@router.post("/add-inventory", response_model=InventoryId)
+def add_inventory(
     product_repository: ProductRepository = Depends(get_product_repository),
     request: InventoryRequest = Depends(),
 ):
@@ -108,15 +190,17 @@ async def add_inventory(
         dict: The inventory id
     """
     inventory = product_repository.create_product_inventory(request)
-    logging.info(f"Created inventory for {inventory.product} with id {inventory.id}")
+    logging.info(
+        f"Created inventory for product {inventory.product_id} with id {inventory.id}"
+    )
 
     return {
         "inventory_id": inventory.id,
     }
 
 
-@router.patch("/update-inventory/{inventory_id}")
-async def update_inventory(
+@router.patch("/update-inventory/{inventory_id}", response_model=InventoryId)
+def update_inventory(
     inventory_id: int,
     product_repository: ProductRepository = Depends(get_product_repository),
     request: InventoryEdit = Depends(),
@@ -133,21 +217,119 @@ async def update_inventory(
         dict: The inventory id
     """
     inventory = product_repository.update_product_inventory(inventory_id, request)
-    logging.info(f"Updated inventory for {inventory.product} with id {inventory.id}")
+    logging.info(
+        f"Updated inventory for product {inventory.product_id} with id {inventory.id}"
+    )
 
     return {
         "inventory_id": inventory.id,
     }
 
 
-@router.get("/get-low-stock-inventory")
-async def get_low_stock_inventory(
+@router.post("/bulk-add-categories", response_model=BulkImportResult)
+async def bulk_add_categories(
+    request: Request,
+    chunk_size: int = Query(BULK_CHUNK_SIZE, ge=1, le=MAX_BULK_CHUNK_SIZE),
+    product_repository: ProductRepository = Depends(get_product_repository),
+):
+    """
+    Add categories to the database in bulk. The body is a json array, an NDJSON
+    file (Content-Type: application/x-ndjson) or a CSV file with a header line
+    (Content-Type: text/csv) of CategoryRequest rows.
+
+    Parameters:
+        request (Request): The request
+        chunk_size (int): The number of rows per INSERT and transaction
+        product_repository (ProductRepository): The product repository
+
+    Returns:
+        dict: The inserted and failed counts, per row errors and rows per second
+    """
+    result = await _bulk_import(
+        request,
+        CategoryRequest,
+        product_repository.bulk_create_categories,
+        chunk_size,
+    )
+    logging.info(f"Bulk created {result['inserted']} categories")
+
+    return result
+
+
+@router.post("/bulk-add-products", response_model=BulkImportResult)
+async def bulk_add_products(
+    request: Request,
+    chunk_size: int = Query(BULK_CHUNK_SIZE, ge=1, le=MAX_BULK_CHUNK_SIZE),
+    product_repository: ProductRepository = Depends(get_product_repository),
+):
+    """
+    Add products to the database in bulk. The body is a json array, an NDJSON
+    file (Content-Type: application/x-ndjson) or a CSV file with a header line
+    (Content-Type: text/csv) of ProductRequest rows.
+
+    Parameters:
+        request (Request): The request
+        chunk_size (int): The number of rows per INSERT and transaction
+        product_repository (ProductRepository): The product repository
+
+    Returns:
+        dict: The inserted and failed counts, per row errors and rows per second
+    """
+    result = await _bulk_import(
+        request,
+        ProductRequest,
+        product_repository.bulk_create_products,
+        chunk_size,
+    )
+    logging.info(f"Bulk created {result['inserted']} products")
+
+    return result
+
+
+@router.post("/bulk-add-inventory", response_model=BulkImportResult)
+async def bulk_add_inventory(
+    request: Request,
+    chunk_size: int = Query(BULK_CHUNK_SIZE, ge=1, le=MAX_BULK_CHUNK_SIZE),
     product_repository: ProductRepository = Depends(get_product_repository),
 ):
     """
-    Get low stock inventory from the database
+    Add product inventories to the database in bulk. The body is a json array,
+    an NDJSON file (Content-Type: application/x-ndjson) or a CSV file with a
+    header line (Content-Type: text/csv) of InventoryRequest rows.
 
     Parameters:
+        request (Request): The request
+        chunk_size (int): The number of rows per INSERT and transaction
+        product_repository (ProductRepository): The product repository
+
+    Returns:
+        dict: The inserted and failed counts, per row errors and rows per second
+    """
+    result = await _bulk_import(
+        request,
+        InventoryRequest,
+        product_repository.bulk_create_product_inventories,
+        chunk_size,
+    )
+    logging.info(f"Bulk created {result['inserted']} inventories")
+
+    return result
+
+
+@router.get("/get-low-stock-inventory", response_model=InventoryList)
+def get_low_stock_inventory(
+    request: Request,
+    response: Response,
+    product_repository: ProductRepository = Depends(get_product_repository),
+):
+    """
+    Get low stock inventory from the database. The ETag covers the id and
+    updated_at of every low stock row, so a conditional GET gets a 304 until an
+    item enters, leaves or changes in the low stock set.
+
+    Parameters:
+        request (Request): The request
+        response (Response): The response
         product_repository (ProductRepository): The product repository
 
     Returns:
@@ -156,6 +338,24 @@ async def get_low_stock_inventory(
     low_stock_inventories = product_repository.get_low_stock_inventory()
     logging.info(f"Retrieved low stock inventory")
 
+    not_modified = conditional_response(
+        request,
+        response,
+        make_etag(
+            "low-stock",
+            *(
+                (inventory.id, inventory.updated_at)
+                for inventory in low_stock_inventories
+            ),
+        ),
+        max(
+            (inventory.updated_at for inventory in low_stock_inventories),
+            default=None,
+        ),
+    )
+    if not_modified:
+        return not_modified
+
     return {
         "inventory": low_stock_inventories,
     }
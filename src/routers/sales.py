@@ -1,79 +1,479 @@
+import csv
+import io
+import json
 import logging
-from typing import Optional
+from typing import Iterable, Iterator, List, Literal, Optional, Union
 from datetime import datetime
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import (
+    APIRouter,
+    Body,
+    Depends,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+)
+from fastapi.responses import StreamingResponse
 from src.dependancies.product_dependancy import get_product_repository
-from src.repositories.product_repository import ProductRepository
+from src.http_cache import (
+    CLOSED_RANGE_CACHE_CONTROL,
+    REVALIDATE_CACHE_CONTROL,
+    conditional_response,
+    is_closed_range,
+    make_etag,
+)
+from src.pagination import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    decode_cursor,
+    encode_cursor,
+)
+from src.repositories.product_repository import (
+    ClosedMonthError,
+    InsufficientStockError,
+    ProductRepository,
+)
 from src.schemas import (
-    CategoryRequest,
-    ProductRequest,
-    InventoryRequest,
-    InventoryEdit,
-    RevenueFilter,
+    RevenuePoint,
+    RevenueSummary,
+    SaleDataPage,
+    SaleDataRow,
+    SaleRequest,
+    SaleRevenue,
+    SaleRevenuePage,
+    SalesCreated,
+    TopCategory,
+    TopProduct,
 )
 
 router = APIRouter()
 
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+CSV_MEDIA_TYPE = "text/csv"
+SALES_DATA_FIELDS = ("sale_id", "product_id", "quantity", "date")
+STREAM_CHUNK_SIZE = 1000
+
+
+def _sale_row(sale) -> dict:
+    return {
+        "sale_id": sale.id,
+        "product_id": sale.product_id,
+        "quantity": sale.quantity,
+        "date": sale.created_at,
+    }
+
+
+def _decode_cursor(cursor: Optional[str], id_count: int) -> Optional[tuple]:
+    try:
+        return decode_cursor(cursor, id_count)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _stream_format(output_format: Optional[str], accept: Optional[str]) -> str:
+    """
+    Resolve the sales data output format from the format query parameter,
+    falling back to the Accept header.
+    """
+    if output_format:
+        return output_format
+    if accept and NDJSON_MEDIA_TYPE in accept:
+        return "ndjson"
+    if accept and CSV_MEDIA_TYPE in accept:
+        return "csv"
+    return "json"
+
+
+def _chunked(rows: Iterable, size: int) -> Iterator[list]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _ndjson_lines(rows: Iterable) -> Iterator[str]:
+    for chunk in _chunked(rows, STREAM_CHUNK_SIZE):
+        yield "".join(
+            json.dumps(_sale_row(sale), default=datetime.isoformat) + "\n"
+            for sale in chunk
+        )
+
+
+def _csv_lines(rows: Iterable) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(SALES_DATA_FIELDS)
+    for chunk in _chunked(rows, STREAM_CHUNK_SIZE):
+        for sale in chunk:
+            writer.writerow(
+                (sale.id, sale.product_id, sale.quantity, sale.created_at.isoformat())
+            )
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def _conditional_sales_response(
+    request: Request,
+    response: Response,
+    product_repository: ProductRepository,
+    start_date: Optional[datetime],
+    end_date: Optional[datetime],
+    reads_column_store: bool = False,
+) -> Optional[Response]:
+    """
+    Version an analytics response by the sales in its date range and the query
+    parameters, and answer a matching conditional GET with a 304 before any
+    aggregation runs. Responses that may be read from the column store are
+    versioned by its snapshot too, which can lag behind the sales versions.
+    Ranges that ended before today may be reused for a minute before
+    revalidating.
+    """
+    etag = make_etag(
+        request.url.path,
+        str(request.query_params),
+        product_repository.get_sales_version(start_date, end_date),
+        (
+            product_repository.get_column_store_generation()
+            if reads_column_store
+            else None
+        ),
+    )
+    cache_control = (
+        CLOSED_RANGE_CACHE_CONTROL
+        if is_closed_range(end_date)
+        else REVALIDATE_CACHE_CONTROL
+    )
+    return conditional_response(request, response, etag, cache_control=cache_control)
+
+
+@router.post("", response_model=SalesCreated)
+def add_sales(
+    sales: list[SaleRequest] = Body(..., min_length=1),
+    product_repository: ProductRepository = Depends(get_product_repository),
+):
+    """
+    Add a batch of sales with their items to the database and decrement the
+    stock of the sold products. The batch is recorded atomically, it is
+    rejected as a whole when any product lacks stock or a sale is dated into
+    an archived month.
+
+    Parameters:
+        sales (list[SaleRequest]): The sale request schemas
+        product_repository (ProductRepository): The product repository
 
-@router.get("/data")
-async def get_sales_data(
+    Returns:
+        dict: The created sale ids
+    """
+    try:
+        sale_ids = product_repository.create_sales(sales)
+    except InsufficientStockError as error:
+        raise HTTPException(
+            status_code=409,
+            detail={
+                "message": "Insufficient stock",
+                "product_ids": error.product_ids,
+            },
+        )
+    except ClosedMonthError as error:
+        raise HTTPException(
+            status_code=409,
+            detail={
+                "message": "Sales months are archived",
+                "months": [f"{month:%Y-%m}" for month in error.months],
+            },
+        )
+    logging.info(f"Created {len(sale_ids)} sales")
+
+    return {"sale_ids": sale_ids}
+
+
+@router.get("/data", response_model=Union[List[SaleDataRow], SaleDataPage])
+def get_sales_data(
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
     product_id: Optional[int] = None,
     category_id: Optional[int] = None,
+    output_format: Optional[Literal["json", "ndjson", "csv"]] = Query(
+        None, alias="format"
+    ),
+    accept: Optional[str] = Header(None),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
     product_repository: ProductRepository = Depends(get_product_repository),
 ):
     """
-    Get sales data from database
+    Get sales data from database. With format=ndjson or format=csv (or a
+    matching Accept header) the rows are streamed from a server-side cursor
+    instead of being collected into a single JSON body. With a limit or a
+    cursor the rows are paginated and returned with a next_cursor.
 
     Parameters:
         start_date (datetime): The start date
         end_date (datetime): The end date
         product_id (int): The product id
         category_id (int): The category id
+        output_format (str): The output format, one of json, ndjson or csv
+        accept (str): The Accept header
+        limit (int): The page size
+        cursor (str): The next_cursor of the previous page
         product_repository (ProductRepository): The product repository
 
     Returns:
         dict: The sales data
     """
-    sales_data = product_repository.get_sales_data(
+    stream_format = _stream_format(output_format, accept)
+    if stream_format != "json":
+        rows = product_repository.stream_sales_data(
+            start_date, end_date, product_id, category_id, STREAM_CHUNK_SIZE
+        )
+        if stream_format == "ndjson":
+            return StreamingResponse(_ndjson_lines(rows), media_type=NDJSON_MEDIA_TYPE)
+        return StreamingResponse(
+            _csv_lines(rows),
+            media_type=CSV_MEDIA_TYPE,
+            headers={"Content-Disposition": 'attachment; filename="sales.csv"'},
+        )
+
+    if limit or cursor:
+        limit = limit or DEFAULT_PAGE_SIZE
+        sales_data = product_repository.get_sales_data(
+            start_date,
+            end_date,
+            product_id,
+            category_id,
+            limit=limit + 1,
+            after=_decode_cursor(cursor, 2),
+        )
+        next_cursor = None
+        if len(sales_data) > limit:
+            sales_data = sales_data[:limit]
+            last = sales_data[-1]
+            next_cursor = encode_cursor(last.created_at, last.id, last.sale_item_id)
+        return {"data": sales_data, "next_cursor": next_cursor}
+
+    return product_repository.get_sales_data(
         start_date, end_date, product_id, category_id
     )
-    data = []
-    for sale in sales_data:
-        data.append(
-            {
-                "sale_id": sale.id,
-                "product_id": sale.product_id,
-                "quantity": sale.quantity,
-                "date": sale.created_at,
-            }
-        )
-    return data
 
 
-@router.get("/get-revenue")
-async def get_revenue_from_sales(
+@router.get("/get-revenue", response_model=Union[List[SaleRevenue], SaleRevenuePage])
+def get_revenue_from_sales(
+    request: Request,
+    response: Response,
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
     category_id: Optional[int] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
     product_repository: ProductRepository = Depends(get_product_repository),
 ):
     """
-    Get sales revenue from database
+    Get sales revenue from database. With a limit or a cursor the sales are
+    paginated and returned with a next_cursor.
 
     Parameters:
+        request (Request): The request
+        response (Response): The response
         start_date (datetime): The start date
         end_date (datetime): The end date
         category_id (int): The category id
+        limit (int): The page size
+        cursor (str): The next_cursor of the previous page
         product_repository (ProductRepository): The product repository
 
     Returns:
         dict: The sales revenue
     """
+    not_modified = _conditional_sales_response(
+        request,
+        response,
+        product_repository,
+        start_date,
+        end_date,
+        reads_column_store=True,
+    )
+    if not_modified:
+        return not_modified
+
+    if limit or cursor:
+        limit = limit or DEFAULT_PAGE_SIZE
+        sales_data = product_repository.get_revenue_from_sales(
+            start_date,
+            end_date,
+            category_id,
+            limit=limit + 1,
+            after=_decode_cursor(cursor, 1),
+        )
+        next_cursor = None
+        if len(sales_data) > limit:
+            sales_data = sales_data[:limit]
+            last = sales_data[-1]
+            next_cursor = encode_cursor(last["created_at"], last["id"])
+        return {"data": sales_data, "next_cursor": next_cursor}
+
     sales_data = product_repository.get_revenue_from_sales(
         start_date, end_date, category_id
     )
 
     return sales_data
+
+
+@router.get("/revenue-summary", response_model=RevenueSummary)
+def get_revenue_summary(
+    request: Request,
+    response: Response,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    category_id: Optional[int] = None,
+    product_repository: ProductRepository = Depends(get_product_repository),
+):
+    """
+    Get the total sales revenue and units sold, answered from the daily revenue
+    rollup for whole days and from raw sales for partial days
+
+    Parameters:
+        request (Request): The request
+        response (Response): The response
+        start_date (datetime): The start date
+        end_date (datetime): The end date
+        category_id (int): The category id
+        product_repository (ProductRepository): The product repository
+
+    Returns:
+        dict: The revenue and units
+    """
+    not_modified = _conditional_sales_response(
+        request, response, product_repository, start_date, end_date
+    )
+    if not_modified:
+        return not_modified
+
+    return product_repository.get_revenue_summary(start_date, end_date, category_id)
+
+
+@router.get(
+    "/revenue-series",
+    response_model=List[RevenuePoint],
+    response_model_exclude_unset=True,
+)
+def get_revenue_series(
+    request: Request,
+    response: Response,
+    granularity: Literal["hour", "day", "week", "month"] = "day",
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    category_id: Optional[int] = None,
+    product_id: Optional[int] = None,
+    group_by: Optional[Literal["category", "product"]] = None,
+    product_repository: ProductRepository = Depends(get_product_repository),
+):
+    """
+    Get revenue and units sold per hour, day, week or month, optionally split
+    per category or product. Bucketing and summing happen in SQL.
+
+    Parameters:
+        request (Request): The request
+        response (Response): The response
+        granularity (str): The bucket size, one of hour, day, week or month
+        start_date (datetime): The start date
+        end_date (datetime): The end date
+        category_id (int): The category id
+        product_id (int): The product id
+        group_by (str): Split each bucket per category or product
+        product_repository (ProductRepository): The product repository
+
+    Returns:
+        list: The buckets with their start, revenue and units
+    """
+    not_modified = _conditional_sales_response(
+        request, response, product_repository, start_date, end_date
+    )
+    if not_modified:
+        return not_modified
+
+    return product_repository.get_revenue_series(
+        granularity, start_date, end_date, category_id, product_id, group_by
+    )
+
+
+@router.get("/top-products", response_model=List[TopProduct])
+def get_top_products(
+    request: Request,
+    response: Response,
+    metric: Literal["revenue", "quantity"] = "revenue",
+    limit: int = Query(10, ge=1, le=1000),
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    category_id: Optional[int] = None,
+    product_repository: ProductRepository = Depends(get_product_repository),
+):
+    """
+    Get the best selling products by revenue or units sold, ranked in SQL
+
+    Parameters:
+        request (Request): The request
+        response (Response): The response
+        metric (str): Rank by revenue or quantity
+        limit (int): The number of products to return
+        start_date (datetime): The start date
+        end_date (datetime): The end date
+        category_id (int): The category id
+        product_repository (ProductRepository): The product repository
+
+    Returns:
+        list: The top products with their revenue and quantity
+    """
+    not_modified = _conditional_sales_response(
+        request, response, product_repository, start_date, end_date
+    )
+    if not_modified:
+        return not_modified
+
+    return product_repository.get_top_sellers(
+        "product", metric, limit, start_date, end_date, category_id
+    )
+
+
+@router.get("/top-categories", response_model=List[TopCategory])
+def get_top_categories(
+    request: Request,
+    response: Response,
+    metric: Literal["revenue", "quantity"] = "revenue",
+    limit: int = Query(10, ge=1, le=1000),
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    product_repository: ProductRepository = Depends(get_product_repository),
+):
+    """
+    Get the best selling categories by revenue or units sold, ranked in SQL
+
+    Parameters:
+        request (Request): The request
+        response (Response): The response
+        metric (str): Rank by revenue or quantity
+        limit (int): The number of categories to return
+        start_date (datetime): The start date
+        end_date (datetime): The end date
+        product_repository (ProductRepository): The product repository
+
+    Returns:
+        list: The top categories with their revenue and quantity
+    """
+    not_modified = _conditional_sales_response(
+        request, response, product_repository, start_date, end_date
+    )
+    if not_modified:
+        return not_modified
+
+    return product_repository.get_top_sellers(
+        "category", metric, limit, start_date, end_date
+    )
@@ -0,0 +1,361 @@
+import os
+import shutil
+import threading
+from datetime import date, datetime, timedelta
+from typing import Iterator, Optional
+
+from src import config
+from src.column_store import (
+    SaleDataRecord,
+    filter_mask,
+    np,
+    select_items,
+    select_revenue,
+    select_sales_data,
+)
+
+# Sale items sorted by (created_at, sale id, sale item id) like the column store
+ITEM_COLUMNS = (
+    ("sale_item_id", "int64"),
+    ("sale_id", "int64"),
+    ("product_id", "int32"),
+    ("quantity", "int32"),
+    ("line_total", "float64"),
+    ("created_at", "datetime64[us]"),
+)
+# Kept so sales without items survive archiving too
+SALE_COLUMNS = (
+    ("id", "int64"),
+    ("created_at", "datetime64[us]"),
+    ("updated_at", "datetime64[us]"),
+)
+MONTH_PREFIX = "sales-"
+
+
+def _next_month(month: date) -> date:
+    return (month.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+
+class SalesArchive:
+    """
+    Closed months of sales moved out of the sales and sale_items tables by
+    src.commands.archive_sales. Every month is a directory of .npy column
+    files, one for sale items and one for sales per column, opened as
+    read-only memory maps: queries only page in the parts of the files they
+    touch and workers share them through the OS page cache. Months added by
+    the archival job are picked up on the next query. A month written again,
+    e.g. after sales were backdated into it, gets a new versioned directory
+    (sales-YYYYMM.1, .2, ...) and the highest version is read, so readers
+    never see a month missing or half written.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._months: dict[date, dict] = {}
+        self._versions: dict[date, int] = {}
+        self._modified: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _path(self, month: date, version: int = 0) -> str:
+        name = f"{MONTH_PREFIX}{month:%Y%m}"
+        return os.path.join(self.directory, f"{name}.{version}" if version else name)
+
+    def _versions_on_disk(self) -> dict[date, list[int]]:
+        """
+        Get the versions of every month in the archive directory, in order
+        """
+        versions = {}
+        for name in sorted(os.listdir(self.directory)):
+            if not name.startswith(MONTH_PREFIX):
+                continue
+            month, _, version = name[len(MONTH_PREFIX) :].partition(".")
+            month = datetime.strptime(month, "%Y%m").date()
+            versions.setdefault(month, []).append(int(version or 0))
+        return {month: sorted(numbers) for month, numbers in versions.items()}
+
+    def _open(self, month: date, version: int) -> dict:
+        if np is None:
+            raise RuntimeError("numpy is needed to read the sales archive")
+        path = self._path(month, version)
+        return {
+            name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+            for name, _ in ITEM_COLUMNS
+        }
+
+    def refresh(self) -> None:
+        """
+        Open the months archived or rewritten since the last refresh. Adding
+        or removing a month changes the archive directory's mtime, so an
+        unchanged archive costs a single stat.
+        """
+        try:
+            modified = os.stat(self.directory).st_mtime_ns
+        except FileNotFoundError:
+            modified = None
+        if modified == self._modified:
+            return
+        with self._lock:
+            months, versions = {}, {}
+            on_disk = self._versions_on_disk() if modified else {}
+            for month, numbers in on_disk.items():
+                versions[month] = numbers[-1]
+                if month in self._months and self._versions[month] == numbers[-1]:
+                    months[month] = self._months[month]
+                else:
+                    months[month] = self._open(month, numbers[-1])
+            self._months = months
+            self._versions = versions
+            self._modified = modified
+
+    def months(self) -> list[date]:
+        """
+        Get the archived months in order
+
+        Returns:
+            list[date]: The first day of every archived month
+        """
+        return sorted(self._months)
+
+    def _columns_in(
+        self, start_date: Optional[datetime], end_date: Optional[datetime]
+    ) -> list[dict]:
+        start_day = start_date.date() if start_date else date.min
+        end_day = end_date.date() if end_date else date.max
+        return [
+            self._months[month]
+            for month in self.months()
+            if month <= end_day and _next_month(month) > start_day
+        ]
+
+    def covers(
+        self, start_date: Optional[datetime], end_date: Optional[datetime]
+    ) -> bool:
+        """
+        Check whether any archived month overlaps the date range
+
+        Parameters:
+            start_date (datetime): The start date
+            end_date (datetime): The end date
+
+        Returns:
+            bool: True when the range reaches into the archive
+        """
+        return bool(self._columns_in(start_date, end_date))
+
+    def sales_data(
+        self,
+        start_date: Optional[datetime],
+        end_date: Optional[datetime],
+        product_id: Optional[int],
+        product_ids: Optional[list[int]],
+        limit: Optional[int] = None,
+        after: Optional[tuple[datetime, int, int]] = None,
+    ) -> list[SaleDataRecord]:
+        """
+        Get the archived sale items matching the filters in (created_at, sale
+        id, sale item id) order, reading month after month until the page is
+        full
+
+        Parameters:
+            start_date (datetime): The start date
+            end_date (datetime): The end date
+            product_id (int): The product id
+            product_ids (list[int]): The ids of the products of the filtered
+                category, None for every category
+            limit (int): The maximum number of rows to return
+            after (tuple): The (created_at, sale id, sale item id) keyset position
+                to resume after
+
+        Returns:
+            list[SaleDataRecord]: The sales data rows
+        """
+        mask = filter_mask(product_id, None, product_ids)
+        rows = []
+        for columns in self._columns_in(start_date, end_date):
+            rows += select_sales_data(
+                columns,
+                start_date,
+                end_date,
+                mask,
+                limit - len(rows) if limit else None,
+                after,
+            )
+            if limit and len(rows) >= limit:
+                break
+        return rows
+
+    def iter_sales_data(
+        self,
+        start_date: Optional[datetime],
+        end_date: Optional[datetime],
+        product_id: Optional[int],
+        product_ids: Optional[list[int]],
+        chunk_size: int = 1000,
+    ) -> Iterator[SaleDataRecord]:
+        """
+        Iterate over the archived sale items matching the filters, chunk_size
+        rows at a time so memory stays flat regardless of the result size
+
+        Parameters:
+            start_date (datetime): The start date
+            end_date (datetime): The end date
+            product_id (int): The product id
+            product_ids (list[int]): The ids of the products of the filtered
+                category, None for every category
+            chunk_size (int): The number of rows read per step
+
+        Returns:
+            Iterator[SaleDataRecord]: The sales data rows
+        """
+        after = None
+        while True:
+            rows = self.sales_data(
+                start_date, end_date, product_id, product_ids, chunk_size, after
+            )
+            yield from rows
+            if len(rows) < chunk_size:
+                return
+            after = (rows[-1].created_at, rows[-1].id, rows[-1].sale_item_id)
+
+    def items(
+        self,
+        start_date: Optional[datetime],
+        end_date: Optional[datetime],
+        product_id: Optional[int],
+        product_ids: Optional[list[int]],
+        before: Optional[datetime] = None,
+    ) -> dict:
+        """
+        Get the archived sale items in [start_date, end_date], or before the
+        given datetime, matching the filters as ITEM_COLUMNS arrays, for
+        aggregating them
+
+        Parameters:
+            start_date (datetime): The start date
+            end_date (datetime): The end date
+            product_id (int): The product id
+            product_ids (list[int]): The ids of the products of the filtered
+                category, None for every category
+            before (datetime): The exclusive end of the range
+
+        Returns:
+            dict: The ITEM_COLUMNS arrays of the matching sale items
+        """
+        mask = filter_mask(product_id, None, product_ids)
+        parts = [
+            select_items(columns, start_date, end_date, mask, before)
+            for columns in self._columns_in(start_date, end_date or before)
+        ]
+        return {
+            name: np.concatenate(
+                [part[name] for part in parts] or [np.empty(0, dtype=dtype)]
+            )
+            for name, dtype in ITEM_COLUMNS
+        }
+
+    def revenue(
+        self,
+        start_date: Optional[datetime],
+        end_date: Optional[datetime],
+        product_ids: Optional[list[int]],
+        limit: Optional[int] = None,
+        after: Optional[tuple[datetime, int]] = None,
+    ) -> list[dict]:
+        """
+        Get the revenue of every archived sale matching the filters in
+        (created_at, id) order. A sale and its items share created_at, so each
+        sale lies within a single month.
+
+        Parameters:
+            start_date (datetime): The start date
+            end_date (datetime): The end date
+            product_ids (list[int]): The ids of the products of the filtered
+                category, None for every category
+            limit (int): The maximum number of sales to return
+            after (tuple): The (created_at, sale id) keyset position to resume after
+
+        Returns:
+            list[dict]: The id, total price and created_at of each sale
+        """
+        mask = filter_mask(None, None, product_ids)
+        sales = []
+        for columns in self._columns_in(start_date, end_date):
+            sales += select_revenue(
+                columns,
+                start_date,
+                end_date,
+                mask,
+                limit - len(sales) if limit else None,
+                after,
+            )
+            if limit and len(sales) >= limit:
+                break
+        return sales
+
+    def write_month(self, month: date, items: dict, sales: dict) -> int:
+        """
+        Write a month's column arrays to a temporary directory and move it in
+        place once every file is flushed, so readers never see a partial month.
+        A month already in the archive is written as its next version, and the
+        older versions are removed once it is in place.
+
+        Parameters:
+            month (date): The first day of the month
+            items (dict): The ITEM_COLUMNS arrays, sorted
+            sales (dict): The SALE_COLUMNS arrays
+
+        Returns:
+            int: The bytes written
+        """
+        older = self._versions_on_disk().get(month, [])
+        path = self._path(month, older[-1] + 1 if older else 0)
+        staging = os.path.join(self.directory, f".{MONTH_PREFIX}{month:%Y%m}.tmp")
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        written = 0
+        files = [(name, items[name]) for name, _ in ITEM_COLUMNS]
+        files += [(f"sales_{name}", sales[name]) for name, _ in SALE_COLUMNS]
+        for name, column in files:
+            with open(os.path.join(staging, f"{name}.npy"), "wb") as file:
+                np.save(file, column)
+                file.flush()
+                os.fsync(file.fileno())
+                written += file.tell()
+        os.replace(staging, path)
+        for version in older:
+            # readers holding memory maps of the old files keep them until closed
+            shutil.rmtree(self._path(month, version))
+        return written
+
+    def remove_month(self, month: date) -> None:
+        """
+        Remove an archived month, e.g. one whose rows couldn't be deleted from
+        the database
+
+        Parameters:
+            month (date): The first day of the month
+        """
+        for version in self._versions_on_disk().get(month, []):
+            shutil.rmtree(self._path(month, version))
+
+    def load_month(self, month: date) -> tuple[dict, dict]:
+        """
+        Open every column of an archived month, sale items and sales
+
+        Parameters:
+            month (date): The first day of the month
+
+        Returns:
+            tuple[dict, dict]: The ITEM_COLUMNS and SALE_COLUMNS arrays
+        """
+        version = self._versions_on_disk()[month][-1]
+        path = self._path(month, version)
+        items = self._open(month, version)
+        sales = {
+            name: np.load(os.path.join(path, f"sales_{name}.npy"), mmap_mode="r")
+            for name, _ in SALE_COLUMNS
+        }
+        return items, sales
+
+
+sales_archive = SalesArchive(config.SALES_ARCHIVE_DIR)
@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import List, Optional
 
-from pydantic import BaseModel, Field, validator
+from pydantic import BaseModel, ConfigDict, Field
 
 from src.models.category import Category
 from src.models.product import Product
@@ -11,8 +11,7 @@ class CategoryRequest(BaseModel):
     name: str
     description: str
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class ProductRequest(BaseModel):
@@ -21,8 +20,7 @@ class ProductRequest(BaseModel):
     price: float
     category_id: int
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class InventoryRequest(BaseModel):
@@ -30,16 +28,14 @@ class InventoryRequest(BaseModel):
     current_stock: int
     low_stock_alert_threshold: int
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class InventoryEdit(BaseModel):
     current_stock: int
     low_stock_alert_threshold: int
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class RevenueFilter(BaseModel):
@@ -47,5 +43,177 @@ class RevenueFilter(BaseModel):
     end_date: Optional[int] = None
     category_id: Optional[int] = None
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
+
+
+class SaleItemRequest(BaseModel):
+    product_id: int
+    quantity: int = Field(gt=0)
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class SaleRequest(BaseModel):
+    items: List[SaleItemRequest] = Field(min_length=1)
+    created_at: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class CategoryResponse(BaseModel):
+    id: int
+    name: str
+    desc: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class CategoryCreated(BaseModel):
+    category_name: str
+
+
+class ProductResponse(BaseModel):
+    id: int
+    name: str
+    desc: Optional[str] = None
+    price: float
+    category_id: int
+    created_at: datetime
+    updated_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class ProductCreated(BaseModel):
+    product_name: str
+
+
+class InventoryResponse(BaseModel):
+    id: int
+    product_id: int
+    current_stock: int
+    low_stock_alert_threshold: int
+    is_low_stock: bool
+    created_at: datetime
+    updated_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class InventoryList(BaseModel):
+    inventory: List[InventoryResponse]
+
+
+class InventoryId(BaseModel):
+    inventory_id: int
+
+
+class BulkImportError(BaseModel):
+    row: int
+    error: str
+
+
+class BulkImportResult(BaseModel):
+    received: int
+    inserted: int
+    failed: int
+    errors: List[BulkImportError]
+    elapsed_seconds: float
+    rows_per_second: Optional[float] = None
+
+
+class SalesCreated(BaseModel):
+    sale_ids: List[int]
+
+
+class SaleDataRow(BaseModel):
+    sale_id: int = Field(validation_alias="id")
+    product_id: int
+    quantity: int
+    date: datetime = Field(validation_alias="created_at")
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class SaleDataPage(BaseModel):
+    data: List[SaleDataRow]
+    next_cursor: Optional[str] = None
+
+
+class SaleRevenue(BaseModel):
+    id: int
+    total_price: float
+    created_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class SaleRevenuePage(BaseModel):
+    data: List[SaleRevenue]
+    next_cursor: Optional[str] = None
+
+
+class RevenueSummary(BaseModel):
+    revenue: float
+    units: int
+
+
+class RevenuePoint(BaseModel):
+    bucket: datetime
+    revenue: float
+    units: int
+    category_id: Optional[int] = None
+    product_id: Optional[int] = None
+
+
+class TopProduct(BaseModel):
+    product_id: int
+    revenue: float
+    quantity: int
+
+
+class TopCategory(BaseModel):
+    category_id: int
+    revenue: float
+    quantity: int
+
+
+class PoolStatus(BaseModel):
+    size: int
+    max_overflow: int
+    checked_out: int
+    idle: int
+    overflow: int
+    checkouts: int
+    timeouts: int
+    wait_seconds_total: float
+    wait_seconds_avg: float
+    wait_seconds_max: float
+
+
+class ColumnStoreStats(BaseModel):
+    enabled: bool
+    loaded: bool
+    rows: int
+    memory_bytes: int
+    last_sale_item_id: int
+    generation: int
+    verify_interval_seconds: float
+    drifts: int
+    last_drift_rows: int
+    refresh_interval_seconds: float
+    refreshes: int
+    refresh_seconds_total: float
+
+
+class CacheStats(BaseModel):
+    enabled: bool
+    size: int
+    max_size: int
+    ttl_seconds: float
+    hits: int
+    misses: int
+    evictions: int
+    expirations: int
@@ -0,0 +1,26 @@
+"""
+The tests that talk to a database use the one in DATABASE_URL, which must be
+migrated (alembic upgrade head). They write to it, so they only run against a
+dedicated test database, one whose name ends in _test, and are skipped
+otherwise or when it can't be reached.
+"""
+
+import os
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from src.database import engine
+
+
+@pytest.fixture(scope="session")
+def database():
+    name = os.path.splitext(os.path.basename(engine.url.database or ""))[0]
+    if not name.endswith("_test"):
+        pytest.skip("DATABASE_URL doesn't name a test database ending in _test")
+    try:
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+    except OperationalError:
+        pytest.skip("the database in DATABASE_URL can't be reached")
@@ -0,0 +1,110 @@
+"""
+Archives a month of sales in the test database into a temporary sales
+archive. The month is far older than any seeded sale and is cleaned up, and
+reopened, afterwards. Skipped without numpy.
+"""
+
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import insert, text
+
+from src.commands.archive_sales import archive_month, month_counts
+from src.database import SessionLocal, engine
+from src.models.sale_items import SaleItems
+from src.models.sales import Sales
+from src.repositories.product_repository import ClosedMonthError, ProductRepository
+from src.sales_archive import SalesArchive
+from src.schemas import SaleRequest
+
+pytest.importorskip("numpy")
+
+MONTH = date(2001, 1, 1)
+
+
+@pytest.fixture
+def connection(database):
+    connection = engine.connect()
+    yield connection
+    for table in ("sale_items", "sales"):
+        connection.execute(
+            text(
+                f"DELETE FROM {table} "
+                "WHERE created_at >= '2001-01-01' AND created_at < '2001-02-01'"
+            )
+        )
+    connection.execute(text("DELETE FROM sales_versions WHERE month = '2001-01-01'"))
+    connection.commit()
+    connection.close()
+
+
+def add_sale(connection, created_at: datetime) -> tuple[int, int]:
+    """
+    Record a sale with one item, return their ids
+    """
+    sale_id = connection.execute(
+        insert(Sales.__table__).values(created_at=created_at, updated_at=created_at)
+    ).inserted_primary_key[0]
+    item_id = connection.execute(
+        insert(SaleItems.__table__).values(
+            sales_id=sale_id,
+            created_at=created_at,
+            product_id=1,
+            quantity=2,
+            unit_price=10.0,
+        )
+    ).inserted_primary_key[0]
+    connection.commit()
+    return sale_id, item_id
+
+
+def test_archive_month_moves_its_rows_to_the_archive(connection, tmp_path):
+    archive = SalesArchive(str(tmp_path))
+    sale_id, item_id = add_sale(connection, datetime(2001, 1, 10, 12))
+
+    assert archive_month(connection, archive, MONTH)
+
+    assert month_counts(connection, MONTH) == (0, 0)
+    items, sales = archive.load_month(MONTH)
+    assert items["sale_item_id"].tolist() == [item_id]
+    assert sales["id"].tolist() == [sale_id]
+
+
+def test_backdated_sale_into_archived_month_is_archived_again(connection, tmp_path):
+    archive = SalesArchive(str(tmp_path))
+    first_sale, first_item = add_sale(connection, datetime(2001, 1, 10, 12))
+    assert archive_month(connection, archive, MONTH)
+
+    backdated_sale, backdated_item = add_sale(connection, datetime(2001, 1, 5, 9))
+    assert archive_month(connection, archive, MONTH)
+
+    assert month_counts(connection, MONTH) == (0, 0)
+    items, sales = archive.load_month(MONTH)
+    # merged in (created_at, sale id, sale item id) order
+    assert items["sale_item_id"].tolist() == [backdated_item, first_item]
+    assert sales["id"].tolist() == [backdated_sale, first_sale]
+    archive.refresh()
+    assert archive.months() == [MONTH]
+    assert len(list(tmp_path.iterdir())) == 1
+
+
+def test_sales_dated_into_an_archived_month_are_rejected(connection, tmp_path):
+    archive = SalesArchive(str(tmp_path))
+    add_sale(connection, datetime(2001, 1, 10, 12))
+    assert archive_month(connection, archive, MONTH)
+
+    db = SessionLocal()
+    try:
+        with pytest.raises(ClosedMonthError) as error:
+            ProductRepository(db).create_sales(
+                [
+                    SaleRequest(
+                        items=[{"product_id": 1, "quantity": 1}],
+                        created_at=datetime(2001, 1, 20, 8),
+                    )
+                ]
+            )
+    finally:
+        db.close()
+    assert error.value.months == [MONTH]
+    assert month_counts(connection, MONTH) == (0, 0)
@@ -0,0 +1,72 @@
+"""
+Compresses whole and streamed responses with each encoding the middleware
+negotiates. brotli comes from the development requirements.
+"""
+
+import gzip
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.testclient import TestClient
+
+from src.compression import CompressionMiddleware
+
+BODY = b"product_id,quantity\n" * 500
+
+app = FastAPI()
+app.add_middleware(CompressionMiddleware, minimum_size=1024)
+
+
+@app.get("/whole")
+def whole():
+    return PlainTextResponse(BODY)
+
+
+@app.get("/streamed")
+def streamed():
+    return StreamingResponse(iter(BODY.splitlines(keepends=True)))
+
+
+@app.get("/small")
+def small():
+    return PlainTextResponse(BODY[:100])
+
+
+def _decompress(encoding, data):
+    if encoding == "br":
+        brotli = pytest.importorskip("brotli")
+        return brotli.decompress(data)
+    return gzip.decompress(data)
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "br"])
+@pytest.mark.parametrize("path", ["/whole", "/streamed"])
+def test_responses_are_compressed(client, encoding, path):
+    if encoding == "br":
+        pytest.importorskip("brotli")
+    with client.stream("GET", path, headers={"Accept-Encoding": encoding}) as response:
+        data = b"".join(response.iter_raw())
+
+    assert response.headers["Content-Encoding"] == encoding
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert len(data) < len(BODY)
+    assert _decompress(encoding, data) == BODY
+
+
+def test_brotli_is_preferred_over_gzip(client):
+    pytest.importorskip("brotli")
+    response = client.get("/whole", headers={"Accept-Encoding": "gzip, br"})
+    assert response.headers["Content-Encoding"] == "br"
+
+
+def test_small_bodies_are_sent_as_is(client):
+    response = client.get("/small", headers={"Accept-Encoding": "gzip, br"})
+    assert "Content-Encoding" not in response.headers
+    assert response.content == BODY[:100]
@@ -0,0 +1,32 @@
+"""
+Takes the stock of a sale batch from the inventory rows of its products, a
+product can have several of them after /products/add-inventory.
+"""
+
+from collections import namedtuple
+
+import pytest
+
+from src.repositories.product_repository import InsufficientStockError, _take_stock
+
+InventoryRow = namedtuple("InventoryRow", ["id", "product_id", "current_stock"])
+
+
+def test_product_with_two_rows_that_both_cover_it_sells():
+    inventories = [InventoryRow(1, 7, 5), InventoryRow(2, 7, 5)]
+
+    assert _take_stock({7: 3}, inventories) == {1: 2}
+
+
+def test_product_with_two_rows_sells_their_summed_stock():
+    inventories = [InventoryRow(1, 7, 2), InventoryRow(2, 7, 3)]
+
+    assert _take_stock({7: 4}, inventories) == {1: 0, 2: 1}
+
+
+def test_extra_rows_of_one_product_dont_cover_another():
+    inventories = [InventoryRow(1, 7, 5), InventoryRow(2, 7, 5), InventoryRow(3, 8, 0)]
+
+    with pytest.raises(InsufficientStockError) as error:
+        _take_stock({7: 1, 8: 1, 9: 1}, inventories)
+    assert error.value.product_ids == [8, 9]
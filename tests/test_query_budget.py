@@ -0,0 +1,40 @@
+"""
+Runs the query budget check of benchmarks.query_budget against the test
+database, removing the rows it creates afterwards.
+"""
+
+import asyncio
+import time
+
+import pytest
+from sqlalchemy import event
+
+from benchmarks.query_budget import (
+    QueryCounter,
+    check,
+    count_queries,
+    create_fixture,
+    remove_fixture,
+)
+from src.database import engine, replica_engine
+
+
+@pytest.fixture(scope="module")
+def counter(database):
+    counter = QueryCounter()
+    count_queries(counter)
+    yield counter
+    for bound in {engine, replica_engine}:
+        event.remove(bound, "before_cursor_execute", counter)
+
+
+@pytest.fixture
+def fixture(database):
+    fixture = create_fixture(f"test-budget-{time.time_ns()}")
+    yield fixture
+    remove_fixture(fixture)
+
+
+def test_requests_stay_within_query_budget(counter, fixture):
+    failures = asyncio.run(check(fixture, counter))
+    assert not failures, "\n".join(failures)
@@ -0,0 +1,36 @@
+"""
+Requests the revenue endpoints from the test database.
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.main import app
+
+# a partial day at each edge, so raw sales windows are compared to midnight
+AWARE_RANGE = "start_date=2025-03-10T10:00:00Z&end_date=2025-03-20T18:30:00%2B02:00"
+NAIVE_RANGE = "start_date=2025-03-10T10:00:00&end_date=2025-03-20T18:30:00"
+
+
+@pytest.fixture(scope="module")
+def client(database):
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.mark.parametrize(
+    "path",
+    [
+        "/sales/revenue-summary",
+        "/sales/revenue-series?granularity=day",
+        "/sales/revenue-series?granularity=hour",
+    ],
+)
+def test_aware_dates_are_read_as_wall_clock_time(client, path):
+    separator = "&" if "?" in path else "?"
+
+    aware = client.get(f"{path}{separator}{AWARE_RANGE}")
+    naive = client.get(f"{path}{separator}{NAIVE_RANGE}")
+
+    assert aware.status_code == 200, aware.text
+    assert aware.json() == naive.json()